@@ -0,0 +1,192 @@
+"""
+Reavalia os veredictos do log de auditoria sem chamar a IA.
+
+Reaplica as regras de ajuste de confiança atuais (as do código em uso) e,
+opcionalmente, um novo modelo local sobre os registros gravados em
+`AUDIT_LOG_DIR`, em lotes, para medir o efeito de uma mudança antes de
+publicá-la.
+
+Uso (na pasta backend/):
+    python -m app.cli.replay_audit --log audit_log
+    python -m app.cli.replay_audit --log audit_log --model local_model_novo.npz --threshold 0.95
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Faixas de confiança do resumo: [0, 50), [50, 80), [80, 95), [95, 100]
+CONFIDENCE_BINS = np.array([0, 50, 80, 95, 101])
+BIN_LABELS = ("0-49", "50-79", "80-94", "95-100")
+
+
+def iter_batches(records, size: int, labels: tuple, skipped: dict):
+    """
+    Agrupa os registros reavaliáveis em lotes; os demais são contados em
+    `skipped` (sem texto: gravados com `AUDIT_HASH_ONLY`).
+    """
+    batch = []
+    for record in records:
+        if record.get("categoria") not in labels:
+            skipped["categoria_invalida"] += 1
+            continue
+        if not record.get("text"):
+            skipped["sem_texto"] += 1
+            continue
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def replay_batch(batch: list, model=None) -> dict:
+    """
+    Colunas do lote: confiança registrada, confiança pelas regras atuais e,
+    com `model`, a probabilidade de Produtivo segundo o modelo local.
+    """
+    from app.services.ai_service import rescore_confidence
+
+    columns = {
+        "produtivo": np.fromiter((r["categoria"] == "Produtivo" for r in batch), dtype=bool, count=len(batch)),
+        "registrada": np.fromiter((r.get("confianca_final") or 0 for r in batch), dtype=np.int16, count=len(batch)),
+        "ts": np.fromiter((r.get("ts", 0.0) for r in batch), dtype=np.float64, count=len(batch)),
+        # Requisições idênticas atendidas pela mesma chamada, registradas uma vez
+        "aguardaram": np.fromiter((r.get("aguardaram", 0) for r in batch), dtype=np.int32, count=len(batch)),
+        # O texto pode estar truncado: as regras usam o tamanho original
+        "reavaliada": np.fromiter(
+            (rescore_confidence(r["text"], r.get("text_len", len(r["text"].strip())), r["categoria"], r.get("confianca_ia", 0))
+             for r in batch),
+            dtype=np.int16, count=len(batch),
+        ),
+    }
+    if model is not None:
+        columns["proba"] = model.predict_proba_batch([r["text"] for r in batch])
+    return columns
+
+
+def summarize(columns: dict, stage_seconds: dict, threshold: float) -> dict:
+    produtivo = columns["produtivo"]
+    before = columns["registrada"].astype(np.int32)
+    after = columns["reavaliada"].astype(np.int32)
+    delta = after - before
+    changed = delta != 0
+
+    summary = {
+        "registros": int(len(before)),
+        "respostas_servidas": int(len(before) + columns["aguardaram"].sum()),
+        "periodo": [datetime.fromtimestamp(float(columns["ts"].min())).isoformat(timespec="seconds"),
+                    datetime.fromtimestamp(float(columns["ts"].max())).isoformat(timespec="seconds")],
+        "regras": {
+            "alterados": int(changed.sum()),
+            "taxa_alterados": round(float(changed.mean()), 4),
+            "aumentos": int((delta > 0).sum()),
+            "reducoes": int((delta < 0).sum()),
+            "delta_medio_alterados": round(float(delta[changed].mean()), 2) if changed.any() else 0.0,
+            "confianca_media": {"antes": round(float(before.mean()), 2), "depois": round(float(after.mean()), 2)},
+            "faixas": {
+                "antes": dict(zip(BIN_LABELS, np.histogram(before, CONFIDENCE_BINS)[0].tolist())),
+                "depois": dict(zip(BIN_LABELS, np.histogram(after, CONFIDENCE_BINS)[0].tolist())),
+            },
+            "por_categoria": {
+                categoria: {
+                    "registros": int(mask.sum()),
+                    "alterados": int(changed[mask].sum()),
+                    "confianca_media_antes": round(float(before[mask].mean()), 2) if mask.any() else 0.0,
+                    "confianca_media_depois": round(float(after[mask].mean()), 2) if mask.any() else 0.0,
+                }
+                for categoria, mask in (("Produtivo", produtivo), ("Improdutivo", ~produtivo))
+            },
+        },
+        "etapas_ms": {
+            stage: {
+                "p50": round(float(np.percentile(values, 50)) * 1000, 1),
+                "p95": round(float(np.percentile(values, 95)) * 1000, 1),
+            }
+            for stage, values in sorted(stage_seconds.items()) if values
+        },
+    }
+
+    if "proba" in columns:
+        proba = columns["proba"]
+        predicted = proba >= 0.5
+        covered = np.maximum(proba, 1.0 - proba) >= threshold
+        agree = predicted == produtivo
+        summary["modelo_local"] = {
+            "limiar": threshold,
+            "concordancia": round(float(agree.mean()), 4),
+            "cobertura_no_limiar": round(float(covered.mean()), 4),
+            "concordancia_coberta": round(float(agree[covered].mean()), 4) if covered.any() else 0.0,
+            "chamadas_evitadas": int(covered.sum()),
+        }
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reavalia o log de auditoria com as regras atuais ou um novo modelo local")
+    parser.add_argument("--log", nargs="+", required=True, help="Pastas ou segmentos do log de auditoria")
+    parser.add_argument("--model", help="Modelo local a avaliar (gerado por app.cli.train_local)")
+    parser.add_argument("--threshold", type=float, default=0.95, help="Limiar do modelo local")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--examples", type=int, default=5, help="Registros alterados pelas regras a exibir")
+    args = parser.parse_args()
+
+    # Só as regras e o modelo são usados: nada de caches, arquivos ou log novo
+    os.environ["CACHE_BACKEND"] = "none"
+    os.environ["NEAR_DUP_CACHE"] = "false"
+    os.environ["AUDIT_LOG_DIR"] = ""
+    os.environ["LOCAL_MODEL_PATH"] = ""
+
+    from app.resources import open_resources
+    from app.services.audit_log import iter_records, segment_paths
+    from app.services.local_classifier import LABELS, LocalClassifier
+
+    # Palavras-chave das regras de ajuste
+    open_resources(jobs=False)
+
+    if not segment_paths(args.log):
+        sys.exit("Nenhum segmento de auditoria encontrado")
+
+    model = LocalClassifier.load(args.model, args.threshold) if args.model else None
+
+    start = time.perf_counter()
+    parts = []
+    stage_seconds = {}
+    examples = []
+    skipped = {"sem_texto": 0, "categoria_invalida": 0}
+    for batch in iter_batches(iter_records(args.log), args.batch_size, LABELS, skipped):
+        columns = replay_batch(batch, model)
+        parts.append(columns)
+
+        for record in batch:
+            for stage, seconds in (record.get("etapas") or {}).items():
+                stage_seconds.setdefault(stage, []).append(seconds)
+
+        for i in np.flatnonzero(columns["registrada"] != columns["reavaliada"])[:args.examples - len(examples)]:
+            record = batch[i]
+            examples.append(f"{record['hash'][:12]} {record['categoria']:<11} "
+                            f"{columns['registrada'][i]:>3}% -> {columns['reavaliada'][i]:>3}%  "
+                            f"{record['text'][:70]!r}")
+
+    if not parts:
+        sys.exit(f"Nenhum registro reavaliável (ignorados: {skipped})")
+
+    columns = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+    summary = summarize(columns, stage_seconds, args.threshold)
+    summary["ignorados"] = skipped
+    summary["segundos"] = round(time.perf_counter() - start, 2)
+
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if examples:
+        print("\nAlterados pelas regras atuais:")
+        print("\n".join(examples))
+
+
+if __name__ == "__main__":
+    main()
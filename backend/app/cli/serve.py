@@ -0,0 +1,142 @@
+"""
+Servidor de produção com vários workers.
+
+Usa o gunicorn como gerenciador de processos com workers do uvicorn. Com
+`--preload` (padrão) a aplicação é importada uma única vez no processo mestre
+(FastAPI, OpenAI SDK, pypdf, numpy, modelo local, palavras-chave) e os workers
+nascem por fork já com tudo carregado: subir um worker, ou substituir um que
+morreu, leva milissegundos e as páginas de memória do código são
+compartilhadas. O que não pode atravessar o fork (pool de conexões HTTP,
+conexões SQLite, workers da fila de jobs) é criado em cada worker, no
+`lifespan` de `app.main`.
+
+Sem o gunicorn instalado, cai para `uvicorn --workers`, em que cada worker
+importa a aplicação do zero.
+
+Uso (na pasta backend/):
+    python -m app.cli.serve --workers 4 --port 8000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+
+def _prepare_metrics_dir(workers: int) -> None:
+    """
+    Com mais de um worker, as métricas do Prometheus precisam ser gravadas em
+    arquivos compartilhados (ver `app.metrics`). Precisa rodar antes de
+    importar a aplicação: o modo do prometheus_client é definido na importação.
+    """
+    if workers <= 1:
+        return
+
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        # Arquivos de uma execução anterior somariam métricas de processos mortos
+        shutil.rmtree(directory, ignore_errors=True)
+    else:
+        directory = tempfile.mkdtemp(prefix="email-classifier-metrics-")
+    os.makedirs(directory, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+
+
+def _uvicorn_worker_class() -> str:
+    try:
+        import uvicorn_worker  # noqa: F401
+
+        return "uvicorn_worker.UvicornWorker"
+    except ImportError:
+        return "uvicorn.workers.UvicornWorker"
+
+
+def _child_exit(server, worker) -> None:
+    # Remove os arquivos de gauges do worker encerrado
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def run_gunicorn(args) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{args.host}:{args.port}",
+                "workers": args.workers,
+                "worker_class": _uvicorn_worker_class(),
+                "preload_app": args.preload,
+                "timeout": args.timeout,
+                "graceful_timeout": args.timeout,
+                "keepalive": 5,
+                "max_requests": args.max_requests,
+                "max_requests_jitter": args.max_requests // 10,
+                "child_exit": _child_exit,
+                "loglevel": os.getenv("LOG_LEVEL", "info").lower(),
+                "accesslog": "-" if args.access_log else None,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+
+            return app
+
+    Server().run()
+
+
+def run_uvicorn(args) -> None:
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.timeout,
+        access_log=args.access_log,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de produção com vários workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+        help="Processos (padrão: WEB_CONCURRENCY ou número de CPUs)",
+    )
+    parser.add_argument(
+        "--no-preload", dest="preload", action="store_false",
+        help="Cada worker importa a aplicação (mais lento, mas permite reiniciar workers com código novo)",
+    )
+    parser.add_argument("--timeout", type=int, default=120, help="Segundos sem resposta até reiniciar o worker")
+    parser.add_argument(
+        "--max-requests", type=int, default=0,
+        help="Reinicia cada worker após N requisições (0 desativa)",
+    )
+    parser.add_argument("--access-log", action="store_true", help="Registra cada requisição")
+    parser.add_argument("--uvicorn", action="store_true", help="Usa uvicorn --workers mesmo com o gunicorn instalado")
+    args = parser.parse_args()
+
+    _prepare_metrics_dir(args.workers)
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        if not args.uvicorn:
+            print("gunicorn não instalado: usando uvicorn --workers (sem preload)", file=sys.stderr)
+        args.uvicorn = True
+
+    if args.uvicorn:
+        run_uvicorn(args)
+    else:
+        run_gunicorn(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Treina o classificador local a partir dos veredictos registrados da IA.
+
+Entrada: pastas ou segmentos do log de auditoria (`AUDIT_LOG_DIR`) ou
+arquivos JSONL com um objeto por linha contendo "text" e "categoria".
+Registros sem texto (`AUDIT_HASH_ONLY`) são ignorados.
+
+Uso (na pasta backend/):
+    python -m app.cli.train_local --data audit_log --out local_model.npz
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from app.services.audit_log import MAGIC, iter_records
+from app.services.local_classifier import DEFAULT_N_FEATURES, LABELS, LocalClassifier
+
+
+def _is_segment(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def iter_jsonl(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def load_examples(paths: list):
+    texts, labels = [], []
+    for path in paths:
+        records = iter_records([path]) if os.path.isdir(path) or _is_segment(path) else iter_jsonl(path)
+        for record in records:
+            if record.get("categoria") in LABELS and record.get("text"):
+                texts.append(record["text"])
+                labels.append(record["categoria"])
+    return texts, labels
+
+
+def evaluate(model: LocalClassifier, texts: list, labels: list, threshold: float) -> dict:
+    """
+    Mede acurácia geral, cobertura no limiar e acurácia das respostas cobertas.
+    """
+    predictions = [model.predict(text) for text in texts]
+    correct = np.array([pred == label for (pred, _), label in zip(predictions, labels)])
+    covered = np.array([proba >= threshold for _, proba in predictions])
+
+    start = time.perf_counter()
+    for text in texts:
+        model.predict_proba(text)
+    latency_us = (time.perf_counter() - start) / max(1, len(texts)) * 1e6
+
+    return {
+        "exemplos": len(texts),
+        "acuracia": round(float(correct.mean()), 4) if len(texts) else 0.0,
+        "cobertura_no_limiar": round(float(covered.mean()), 4) if len(texts) else 0.0,
+        "acuracia_coberta": round(float(correct[covered].mean()), 4) if covered.any() else 0.0,
+        "latencia_media_us": round(latency_us, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treina o classificador local (hashing TF-IDF + regressão logística)")
+    parser.add_argument("--data", nargs="+", required=True, help="Log de auditoria (pastas ou segmentos) ou JSONL com text/categoria")
+    parser.add_argument("--out", default="local_model.npz", help="Arquivo do modelo gerado")
+    parser.add_argument("--features", type=int, default=DEFAULT_N_FEATURES, help="Dimensão do hashing (potência de 2)")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--learning-rate", type=float, default=5.0)
+    parser.add_argument("--l2", type=float, default=1e-4)
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fração separada para validação")
+    parser.add_argument("--threshold", type=float, default=0.95, help="Limiar usado na avaliação")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.features & (args.features - 1):
+        sys.exit("--features precisa ser potência de 2")
+
+    texts, labels = load_examples(args.data)
+    if len(set(labels)) < 2:
+        sys.exit("São necessários exemplos das duas categorias para treinar")
+
+    pairs = list(zip(texts, labels))
+    random.Random(args.seed).shuffle(pairs)
+    split = int(len(pairs) * (1 - args.holdout))
+    train, test = pairs[:split], pairs[split:]
+
+    print(f"Treinando com {len(train)} exemplos (validação: {len(test)})...")
+    start = time.perf_counter()
+    model = LocalClassifier.train(
+        [t for t, _ in train], [l for _, l in train],
+        n_features=args.features, epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2,
+    )
+    print(f"Treino concluído em {time.perf_counter() - start:.1f}s")
+
+    if test:
+        metrics = evaluate(model, [t for t, _ in test], [l for _, l in test], args.threshold)
+        print(json.dumps(metrics, indent=2, ensure_ascii=False))
+
+    model.save(args.out)
+    print(f"Modelo salvo em {args.out}")
+
+
+if __name__ == "__main__":
+    main()
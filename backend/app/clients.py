@@ -0,0 +1,100 @@
+import logging
+from typing import Optional
+
+from app.config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_KEEPALIVE_EXPIRY,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    OPENAI_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MissingAPIKeyError(RuntimeError):
+    """`OPENAI_API_KEY` não configurada: apenas os caminhos locais estão disponíveis."""
+
+
+_client = None
+_async_client = None
+
+
+def _require_key() -> str:
+    if not OPENAI_API_KEY:
+        raise MissingAPIKeyError("OPENAI_API_KEY não configurada")
+    return OPENAI_API_KEY
+
+
+def get_client():
+    """
+    Cliente síncrono, mantido para scripts e uso fora do event loop.
+    Criado no primeiro uso.
+
+    Raises:
+        MissingAPIKeyError: Sem `OPENAI_API_KEY`
+    """
+    global _client
+    if _client is None:
+        from openai import OpenAI
+
+        _client = OpenAI(api_key=_require_key(), base_url=OPENAI_BASE_URL, timeout=OPENAI_TIMEOUT)
+    return _client
+
+
+def get_async_client():
+    """
+    Cliente assíncrono compartilhado: pool de conexões com keep-alive para
+    suportar centenas de classificações simultâneas por worker. As novas
+    tentativas ficam a cargo do LLMGateway (max_retries=0).
+
+    Criado no startup de cada worker (lifespan), depois do fork: o pool de
+    conexões nunca é herdado do processo mestre.
+
+    Raises:
+        MissingAPIKeyError: Sem `OPENAI_API_KEY`
+    """
+    global _async_client
+    if _async_client is None:
+        import httpx
+        from openai import AsyncOpenAI
+
+        _async_client = AsyncOpenAI(
+            api_key=_require_key(),
+            base_url=OPENAI_BASE_URL,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=5.0),
+            ),
+        )
+        logger.info("Cliente OpenAI configurado com sucesso")
+    return _async_client
+
+
+def open_clients() -> Optional[object]:
+    """
+    Cria o cliente assíncrono no startup, se houver chave, para que a
+    primeira requisição não pague a criação do pool.
+    """
+    if not OPENAI_API_KEY:
+        return None
+    return get_async_client()
+
+
+async def close_clients() -> None:
+    """
+    Fecha os pools de conexões HTTP no encerramento.
+    """
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _client is not None:
+        _client.close()
+        _client = None
@@ -1,36 +1,208 @@
 import os
 import logging
 from dotenv import load_dotenv
-from openai import OpenAI
-
-# CONFIGURAÇÃO DE LOGGING
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
 
 logger = logging.getLogger(__name__)
 
 # CARREGAMENTO DE VARIÁVEIS DE AMBIENTE
+# Só leitura de configurações: clientes e conexões são criados no startup (app/clients.py)
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Sem a chave, a API sobe normalmente e responde pelos caminhos locais
+# (cache, modelo local, pré-filtros); chamadas à OpenAI caem no modo degradado
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") or None
+
+# CONFIGURAÇÕES DO CLIENTE OPENAI
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # Permite apontar para um servidor fake local
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))  # Prazo de cada tentativa
+OPENAI_TOTAL_DEADLINE = float(os.getenv("OPENAI_TOTAL_DEADLINE", "60"))  # Prazo somando as tentativas
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "500"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "100"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
 
-if not OPENAI_API_KEY:
-    logger.error("OPENAI_API_KEY não configurada no arquivo .env")
-    raise RuntimeError("OPENAI_API_KEY ausente. Crie um arquivo .env com sua chave da OpenAI")
+# RESILIÊNCIA DAS CHAMADAS À OPENAI
+OPENAI_MAX_ATTEMPTS = int(os.getenv("OPENAI_MAX_ATTEMPTS", "4"))
+OPENAI_RETRY_BASE_DELAY = float(os.getenv("OPENAI_RETRY_BASE_DELAY", "0.5"))
+OPENAI_RETRY_MAX_DELAY = float(os.getenv("OPENAI_RETRY_MAX_DELAY", "8"))
+OPENAI_RPM_LIMIT = float(os.getenv("OPENAI_RPM_LIMIT", "3500"))  # Ajustado pelos cabeçalhos x-ratelimit-*
+OPENAI_TPM_LIMIT = float(os.getenv("OPENAI_TPM_LIMIT", "90000"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
 
-# CLIENTE OPENAI
-client = OpenAI(api_key=OPENAI_API_KEY)
-logger.info("Cliente OpenAI configurado com sucesso")
+# TENANTS (equipes que compartilham a mesma chave da OpenAI)
+# JSON com nome, chaves de API, cota de tokens por minuto e peso de cada
+# tenant. Sem o arquivo, não há autenticação: tudo vai para o tenant "default"
+TENANTS_PATH = os.getenv("TENANTS_PATH")
+TENANT_API_KEY_HEADER = os.getenv("TENANT_API_KEY_HEADER", "X-API-Key")
+TENANT_MAX_QUEUED = int(os.getenv("TENANT_MAX_QUEUED", "200"))  # Chamadas aguardando por tenant; acima disso, 429
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", str(OPENAI_MAX_CONNECTIONS)))  # Chamadas simultâneas
+LLM_BULK_SHARE = float(os.getenv("LLM_BULK_SHARE", "0.75"))  # Fração das vagas que os jobs podem ocupar
+
+# ROTEAMENTO EM DOIS NÍVEIS
+# "tiered": triagem curta (só categoria e confiança) e, apenas quando
+# necessário, uma segunda chamada que gera a razão e a resposta sugerida.
+# "single" (padrão): uma única chamada com o JSON completo
+ROUTING_MODE = os.getenv("ROUTING_MODE", "single").lower()
+ROUTING_TRIAGE_MODEL = os.getenv("ROUTING_TRIAGE_MODEL", OPENAI_MODEL)
+ROUTING_TRIAGE_MAX_TOKENS = int(os.getenv("ROUTING_TRIAGE_MAX_TOKENS", "30"))  # Por email
+ROUTING_REPLY_MODEL = os.getenv("ROUTING_REPLY_MODEL", OPENAI_MODEL)
+ROUTING_ESCALATION_THRESHOLD = int(os.getenv("ROUTING_ESCALATION_THRESHOLD", "80"))  # Confiança mínima da triagem
+ROUTING_ESCALATE_CATEGORIES = frozenset(
+    categoria.strip() for categoria in os.getenv("ROUTING_ESCALATE_CATEGORIES", "Produtivo").split(",") if categoria.strip()
+)
 
 # CONSTANTES DA APLICAÇÃO
 MAX_FILE_SIZE = 10 * 1024 * 1024
 MAX_TEXT_LENGTH = 4000
 MIN_TEXT_LENGTH = 10
 
-logger.info(f"  Configurações carregadas:")
-logger.info(f"   - MAX_FILE_SIZE: {MAX_FILE_SIZE // (1024*1024)}MB")
-logger.info(f"   - MAX_TEXT_LENGTH: {MAX_TEXT_LENGTH} chars")
-logger.info(f"   - MIN_TEXT_LENGTH: {MIN_TEXT_LENGTH} chars")
\ No newline at end of file
+# CADEIAS DE EMAILS (mensagem mais recente + resumo sem repetições das anteriores)
+THREAD_MESSAGE_CHARS = int(os.getenv("THREAD_MESSAGE_CHARS", "300"))  # Por mensagem anterior
+THREAD_HISTORY_CHARS = int(os.getenv("THREAD_HISTORY_CHARS", "1500"))  # Resumo inteiro
+# Texto lido dos arquivos antes de reduzir a cadeia, em múltiplos do corte final
+# (MAX_EXTRACT_CHARS): a extração continua parando cedo em arquivos grandes
+THREAD_RAW_FACTOR = int(os.getenv("THREAD_RAW_FACTOR", "4"))
+
+# PROMPT
+MAX_EMAIL_TOKENS = int(os.getenv("MAX_EMAIL_TOKENS", "1000"))  # Orçamento do email no prompt, após a limpeza
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING") or None  # Padrão: a codificação do modelo (tiktoken)
+
+# UPLOADS
+MAX_REQUEST_BODY_SIZE = MAX_FILE_SIZE + 64 * 1024  # Arquivo + campos do formulário
+BATCH_MAX_BODY_SIZE = int(os.getenv("BATCH_MAX_BODY_SIZE", str(50 * 1024 * 1024)))
+ENCODING_SNIFF_BYTES = 64 * 1024  # Prefixo lido para detectar tipo e codificação
+
+# EXTRAÇÃO DE TEXTO
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "50"))
+MAX_EXTRACT_CHARS = int(os.getenv("MAX_EXTRACT_CHARS", str(MAX_TEXT_LENGTH)))  # Corte do texto extraído
+
+# OCR DE PDFs DIGITALIZADOS (opcional: pacote pypdfium2 e binário do tesseract)
+# Roda só nas páginas sem camada de texto, quando o texto extraído é curto demais
+OCR_ENABLED = os.getenv("OCR_ENABLED", "false").lower() == "true"
+OCR_TESSERACT_CMD = os.getenv("OCR_TESSERACT_CMD", "tesseract")
+OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", "por+eng")
+OCR_MIN_CHARS = int(os.getenv("OCR_MIN_CHARS", "100"))  # Abaixo disso na camada de texto, tenta o OCR
+OCR_TARGET_CHARS = int(os.getenv("OCR_TARGET_CHARS", "1500"))  # Para o OCR ao juntar esta quantidade
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "5"))  # Páginas reconhecidas por documento
+OCR_PROCESSES = int(os.getenv("OCR_PROCESSES", "2"))  # Núcleos de CPU para OCR por worker
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "20"))  # Prazo por documento, incluindo a fila
+OCR_MIN_DPI = int(os.getenv("OCR_MIN_DPI", "150"))
+OCR_MAX_DPI = int(os.getenv("OCR_MAX_DPI", "300"))
+OCR_CACHE_ENTRIES = int(os.getenv("OCR_CACHE_ENTRIES", "1000"))  # Páginas reconhecidas guardadas (LRU)
+
+# EMAILS (.eml) E CAIXAS DE CORREIO (.mbox)
+# .mbox (lido em streaming). Também vale o limite de corpo da rota: BATCH_MAX_BODY_SIZE
+# em /classify/batch e JOBS_MAX_BODY_SIZE em /jobs; o padrão é o deste último
+MAX_MAILBOX_SIZE = int(os.getenv("MAX_MAILBOX_SIZE", str(200 * 1024 * 1024)))
+MAIL_MAX_MESSAGE_BYTES = int(os.getenv("MAIL_MAX_MESSAGE_BYTES", str(1024 * 1024)))  # Restante (anexos) ignorado
+MAIL_PREFILTER = os.getenv("MAIL_PREFILTER", "true").lower() == "true"  # Cabeçalhos de envio em massa -> Improdutivo
+MAIL_BULK_SENDER_DOMAINS = tuple(
+    domain.strip().lower()
+    for domain in os.getenv(
+        "MAIL_BULK_SENDER_DOMAINS", "mcsv.net,rsgsv.net,mailchimpapp.net,hubspotemail.net,mktomail.com,sendinblue.com"
+    ).split(",")
+    if domain.strip()
+)
+
+# Versão do prompt: entra na chave do cache, altere ao mudar o prompt
+PROMPT_VERSION = "3"
+
+# CACHE DE CLASSIFICAÇÃO
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()  # memory, sqlite ou none
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", "classification_cache.sqlite3")
+
+# CACHE DE QUASE-DUPLICATAS
+# Emails gerados a partir do mesmo modelo (faturas, boletos, avisos), que só
+# mudam em nomes, datas, números e valores, reaproveitam a classificação
+NEAR_DUP_CACHE = os.getenv("NEAR_DUP_CACHE", "true").lower() == "true"  # Desligado também com CACHE_BACKEND=none
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.9"))  # Similaridade de Jaccard estimada mínima
+NEAR_DUP_MAX_ENTRIES = int(os.getenv("NEAR_DUP_MAX_ENTRIES", "20000"))
+NEAR_DUP_PATH = os.getenv("NEAR_DUP_PATH", "near_duplicates.sqlite3")  # Vazio: só em memória
+
+# CLASSIFICAÇÃO EM LOTE
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))  # Emails por requisição
+BATCH_ITEMS_PER_PROMPT = int(os.getenv("BATCH_ITEMS_PER_PROMPT", "10"))
+BATCH_MAX_CHARS_PER_PROMPT = int(os.getenv("BATCH_MAX_CHARS_PER_PROMPT", "6000"))
+BATCH_SHORT_TEXT_LENGTH = int(os.getenv("BATCH_SHORT_TEXT_LENGTH", "1500"))  # Acima disso vai sozinho
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# FILA DE JOBS (classificações longas e em massa, sem broker externo)
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite3")
+JOBS_SPOOL_DIR = os.getenv("JOBS_SPOOL_DIR", "job_files")  # Arquivos aguardando extração
+JOBS_MAX_ITEMS = int(os.getenv("JOBS_MAX_ITEMS", "10000"))  # Emails por job
+JOBS_MAX_BODY_SIZE = int(os.getenv("JOBS_MAX_BODY_SIZE", str(200 * 1024 * 1024)))
+JOBS_QUEUE_SIZE = int(os.getenv("JOBS_QUEUE_SIZE", "100"))  # Jobs aguardando; acima disso, 503
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))  # Jobs processados em paralelo
+JOBS_EXTRACT_PROCESSES = int(os.getenv("JOBS_EXTRACT_PROCESSES", "2"))  # Pool de extração de PDF
+JOBS_LLM_CONCURRENCY = int(os.getenv("JOBS_LLM_CONCURRENCY", "4"))  # Chamadas à OpenAI por job
+JOBS_CHUNK_SIZE = int(os.getenv("JOBS_CHUNK_SIZE", "100"))  # Emails gravados por vez (progresso)
+JOBS_RETENTION_SECONDS = float(os.getenv("JOBS_RETENTION_SECONDS", str(7 * 24 * 60 * 60)))  # Jobs terminados; 0 guarda para sempre
+JOBS_PRUNE_INTERVAL = float(os.getenv("JOBS_PRUNE_INTERVAL", "3600"))  # Segundos entre limpezas
+# Posse de um job em execução, renovada pelo worker a cada terço do prazo: vencida
+# (worker morto ou travado), o job volta para a fila
+JOBS_LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS", "60"))
+
+# PALAVRAS-CHAVE DO PÓS-PROCESSAMENTO
+KEYWORDS_PATH = os.getenv("KEYWORDS_PATH", os.path.join(os.path.dirname(__file__), "data", "keywords.json"))
+KEYWORDS_RELOAD_INTERVAL = float(os.getenv("KEYWORDS_RELOAD_INTERVAL", "30"))  # Segundos entre verificações
+
+# CLASSIFICADOR LOCAL (caminho rápido sem rede)
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "local_model.npz")
+LOCAL_MODEL_THRESHOLD = float(os.getenv("LOCAL_MODEL_THRESHOLD", "0.95"))  # Probabilidade mínima
+
+# LOG DE AUDITORIA (veredictos da IA para reavaliação offline, ver app.cli.replay_audit)
+# Desligado por padrão: ligado, grava em disco o texto dos emails (dados pessoais)
+AUDIT_LOG_DIR = os.getenv("AUDIT_LOG_DIR", "")  # Vazio desliga o log
+AUDIT_HASH_ONLY = os.getenv("AUDIT_HASH_ONLY", "false").lower() == "true"  # Guarda só o hash do texto
+AUDIT_TEXT_CHARS = int(os.getenv("AUDIT_TEXT_CHARS", str(MAX_TEXT_LENGTH)))  # Texto guardado por registro
+AUDIT_SEGMENT_BYTES = int(os.getenv("AUDIT_SEGMENT_BYTES", str(32 * 1024 * 1024)))  # Rotação por tamanho
+AUDIT_MAX_SEGMENTS = int(os.getenv("AUDIT_MAX_SEGMENTS", "32"))  # Segmentos mantidos (0: sem limite)
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))  # Registros aguardando gravação
+
+# LOGGING
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def configure_logging() -> None:
+    """
+    Configura o logging da aplicação. Chamada uma única vez, pelo ponto de
+    entrada (`app.main` ou `app.cli.serve`).
+    """
+    logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+
+
+def log_settings() -> None:
+    """
+    Registra as configurações efetivas na inicialização.
+    """
+    logger.info(f"  Configurações carregadas:")
+    logger.info(f"   - MAX_FILE_SIZE: {MAX_FILE_SIZE // (1024*1024)}MB")
+    logger.info(f"   - MAX_TEXT_LENGTH: {MAX_TEXT_LENGTH} chars")
+    logger.info(f"   - MIN_TEXT_LENGTH: {MIN_TEXT_LENGTH} chars")
+    logger.info(f"   - MAX_EMAIL_TOKENS: {MAX_EMAIL_TOKENS} tokens")
+    logger.info(f"   - THREAD_HISTORY_CHARS: {THREAD_HISTORY_CHARS} chars ({THREAD_MESSAGE_CHARS} por mensagem anterior)")
+    logger.info(f"   - MAX_PDF_PAGES: {MAX_PDF_PAGES}")
+    logger.info(f"   - OCR_ENABLED: {OCR_ENABLED} ({OCR_PROCESSES} processos, até {OCR_MAX_PAGES} páginas em {OCR_TIMEOUT:.0f}s)")
+    logger.info(f"   - MAIL_PREFILTER: {MAIL_PREFILTER} ({len(MAIL_BULK_SENDER_DOMAINS)} domínios de envio em massa)")
+    logger.info(f"   - MAX_MAILBOX_SIZE: {MAX_MAILBOX_SIZE // (1024*1024)}MB")
+    if MAX_MAILBOX_SIZE > max(BATCH_MAX_BODY_SIZE, JOBS_MAX_BODY_SIZE):
+        logger.warning(f"MAX_MAILBOX_SIZE acima do corpo aceito pelas rotas: caixas com mais de "
+                       f"{max(BATCH_MAX_BODY_SIZE, JOBS_MAX_BODY_SIZE) // (1024*1024)}MB são recusadas com 413")
+    logger.info(f"   - OPENAI_MODEL: {OPENAI_MODEL}")
+    logger.info(f"   - ROUTING_MODE: {ROUTING_MODE} (triagem: {ROUTING_TRIAGE_MODEL}, resposta: {ROUTING_REPLY_MODEL})")
+    logger.info(f"   - OPENAI_MAX_CONNECTIONS: {OPENAI_MAX_CONNECTIONS}")
+    logger.info(f"   - LLM_MAX_CONCURRENCY: {LLM_MAX_CONCURRENCY} (jobs: até {LLM_BULK_SHARE:.0%})")
+    logger.info(f"   - TENANTS_PATH: {TENANTS_PATH or 'não configurado (sem autenticação)'}")
+    logger.info(f"   - CACHE_BACKEND: {CACHE_BACKEND}")
+    logger.info(f"   - NEAR_DUP_CACHE: {NEAR_DUP_CACHE} (limiar: {NEAR_DUP_THRESHOLD}, até {NEAR_DUP_MAX_ENTRIES} emails)")
+    logger.info(f"   - AUDIT_LOG_DIR: {AUDIT_LOG_DIR or 'desligado'}{' (só hash do texto)' if AUDIT_LOG_DIR and AUDIT_HASH_ONLY else ''}")
+    logger.info(f"   - JOBS_WORKERS: {JOBS_WORKERS} (extração: {JOBS_EXTRACT_PROCESSES} processos)")
+    if not OPENAI_API_KEY:
+        logger.warning("OPENAI_API_KEY não configurada: apenas caminhos locais (cache, modelo local, pré-filtros); "
+                       "chamadas à OpenAI respondem em modo degradado")
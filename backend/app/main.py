@@ -1,16 +1,59 @@
+import logging
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import router
-import logging
+from app.clients import close_clients, open_clients
+from app.config import BATCH_MAX_BODY_SIZE, JOBS_MAX_BODY_SIZE, MAX_REQUEST_BODY_SIZE, configure_logging, log_settings
+from app.middleware import BodySizeLimitMiddleware
+from app.metrics import metrics_endpoint
+from app.resources import close_resources, open_resources
+from app.services.ocr_service import ocr_service
+from app.services.prompt_builder import init_tokenizer
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Configuração de logging (uma vez, no processo que importa a aplicação;
+# com gunicorn --preload, no mestre, antes do fork)
+configure_logging()
+log_settings()
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Inicialização e encerramento de cada worker.
+
+    Tudo que tem estado é criado aqui, depois do fork, e não na importação:
+    o pool de conexões do cliente OpenAI, os caches e a fila de jobs (SQLite),
+    o modelo local, os tenants, as palavras-chave e o log de auditoria (ver
+    `app.resources`, guardados em `app.state.resources`). O tokenizador
+    também é carregado aqui, fora do caminho das requisições.
+    """
+    open_clients()
+    app.state.resources = await run_in_threadpool(open_resources)
+    await run_in_threadpool(init_tokenizer)
+    # Confere as dependências do OCR agora: se faltarem, o aviso sai no startup
+    ocr_service.available
+    # Workers da fila de jobs (retoma jobs pendentes gravados no SQLite)
+    await app.state.resources.job_manager.start()
+    logger.info("API Classificador de Emails iniciada (pid %s)", os.getpid())
+    logger.info("Documentação disponível em: /api/docs")
+
+    yield
+
+    # Para a fila de jobs, grava os registros de auditoria ainda na fila e
+    # fecha os arquivos SQLite
+    await close_resources()
+    ocr_service.shutdown()
+    # Fecha os pools de conexões HTTP dos clientes OpenAI
+    await close_clients()
+    logger.info("API Classificador de Emails encerrada (pid %s)", os.getpid())
+
+
 # Inicialização da aplicação
 app = FastAPI(
     title="Classificador Inteligente de Emails API",
@@ -18,7 +61,8 @@ app = FastAPI(
     version="2.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    lifespan=lifespan,
 )
 
 # Configuração CORS - Ambientes permitidos
@@ -41,9 +85,19 @@ app.add_middleware(
     max_age=3600,
 )
 
+# Limite de tamanho aplicado enquanto o corpo é recebido
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    default_limit=MAX_REQUEST_BODY_SIZE,
+    limits={"/api/v1/classify/batch": BATCH_MAX_BODY_SIZE, "/api/v1/jobs": JOBS_MAX_BODY_SIZE},
+)
+
 # Registrar rotas com prefixo /api
 app.include_router(router, prefix="/api/v1", tags=["classificacao"])
 
+# Métricas no formato do Prometheus (fora do prefixo /api, como de costume)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
 # Health check na raiz
 @app.get("/", tags=["sistema"])
 async def root():
@@ -68,16 +122,6 @@ async def health_check():
         "version": "2.0.0"
     }
 
-# Event handlers
-@app.on_event("startup")
-async def startup_event():
-    logger.info("API Classificador de Emails iniciada")
-    logger.info("Documentação disponível em: /api/docs")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("API Classificador de Emails encerrada")
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
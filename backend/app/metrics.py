@@ -0,0 +1,250 @@
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    REGISTRY,
+)
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Etapas do caminho de classificação medidas em `email_classifier_stage_seconds`
+STAGES = (
+    "upload_read",      # validação do upload e detecção de tipo/codificação
+    "extract_text",     # extração do texto do PDF/TXT
+    "ocr",              # OCR das páginas digitalizadas (inclui a fila do pool)
+    "prompt_build",     # montagem do prompt
+    "openai_request",   # ida e volta à OpenAI (incluindo novas tentativas)
+    "parse_json",       # clean_and_parse_json
+    "post_process",     # regras de ajuste de confiança
+)
+
+# Do sub-milissegundo (pós-processamento) às dezenas de segundos (OpenAI)
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "email_classifier_stage_seconds",
+    "Latência de cada etapa da classificação",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+OPENAI_TOKENS = Counter(
+    "email_classifier_openai_tokens_total",
+    "Tokens consumidos na OpenAI",
+    ["kind"],
+)
+
+CLASSIFICATIONS = Counter(
+    "email_classifier_classifications_total",
+    "Classificações devolvidas, por categoria e origem da resposta",
+    ["categoria", "source"],
+)
+
+FAILOVERS = Counter(
+    "email_classifier_failover_total",
+    "Respostas de failover para texto vazio ou insuficiente",
+)
+
+ERRORS = Counter(
+    "email_classifier_errors_total",
+    "Falhas por etapa",
+    ["stage"],
+)
+
+# Roteamento em dois níveis: tier "triage" (só classificação), "reply" (razão
+# e resposta, apenas para os emails escalados) e "single" (chamada única)
+TIER_TOKENS = Counter(
+    "email_classifier_tier_tokens_total",
+    "Tokens consumidos na OpenAI por nível do roteamento",
+    ["tier", "kind"],
+)
+
+TIER_SECONDS = Histogram(
+    "email_classifier_tier_seconds",
+    "Latência das chamadas à OpenAI por nível do roteamento",
+    ["tier"],
+    buckets=LATENCY_BUCKETS,
+)
+
+ESCALATIONS = Counter(
+    "email_classifier_escalations_total",
+    "Emails enviados da triagem para o nível de resposta, por motivo",
+    ["reason"],
+)
+
+# Tenants: consumo e espera na fila do escalonador, por prioridade
+TENANT_TOKENS = Counter(
+    "email_classifier_tenant_tokens_total",
+    "Tokens consumidos na OpenAI por tenant",
+    ["tenant", "kind"],
+)
+
+TENANT_QUEUE_SECONDS = Histogram(
+    "email_classifier_tenant_queue_seconds",
+    "Espera por capacidade da OpenAI no escalonador, por tenant e prioridade",
+    ["tenant", "priority"],
+    buckets=LATENCY_BUCKETS,
+)
+
+TENANT_REJECTIONS = Counter(
+    "email_classifier_tenant_rejections_total",
+    "Requisições recusadas (429) por cota ou fila cheia, por tenant",
+    ["tenant"],
+)
+
+OCR_PAGES = Counter(
+    "email_classifier_ocr_pages_total",
+    "Páginas sem camada de texto enviadas ao OCR, por resultado",
+    ["result"],
+)
+
+AUDIT_RECORDS = Counter(
+    "email_classifier_audit_records_total",
+    "Registros do log de auditoria, por resultado (written, dropped, error)",
+    ["result"],
+)
+
+# Respostas sem chamada à OpenAI: caches (exato e quase-duplicatas), modelo
+# local e deduplicação de requisições idênticas simultâneas
+CACHE_LOOKUPS = Counter(
+    "email_classifier_cache_lookups_total",
+    "Consultas aos caches de classificação, por camada (exact, near_duplicate) e resultado (hit, miss)",
+    ["layer", "result"],
+)
+
+LOCAL_MODEL_DECISIONS = Counter(
+    "email_classifier_local_model_total",
+    "Emails avaliados pelo modelo local, por resultado (answered: chamada evitada, deferred: abaixo do limiar)",
+    ["result"],
+)
+
+SINGLEFLIGHT_CALLS = Counter(
+    "email_classifier_singleflight_total",
+    "Requisições à OpenAI pela deduplicação, por resultado (leader: chamada feita, coalesced: aguardou outra)",
+    ["result"],
+)
+
+# Filhos dos rótulos resolvidos uma única vez: evita a busca por rótulo a cada uso
+_stage_timers = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
+_prompt_tokens = OPENAI_TOKENS.labels("prompt")
+_completion_tokens = OPENAI_TOKENS.labels("completion")
+
+
+# Durações por etapa da classificação em andamento (ver `stage_timings`)
+_current_timings: ContextVar[Optional[dict]] = ContextVar("stage_timings", default=None)
+
+
+class _StageTimer:
+    """
+    Observa a duração no histograma da etapa e a soma às durações da
+    classificação em andamento, se houver.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self._start
+        _stage_timers[self.stage].observe(elapsed)
+
+        timings = _current_timings.get()
+        if timings is not None:
+            timings[self.stage] = timings.get(self.stage, 0.0) + elapsed
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _StageTimer(self.stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def timed(stage: str):
+    """
+    Mede a duração de uma etapa. Serve como gerenciador de contexto
+    (`with timed("parse_json"):`) ou decorador (`@timed("post_process")`).
+    """
+    return _StageTimer(stage)
+
+
+def current_stage_timings() -> dict:
+    """
+    Cópia das durações coletadas até agora pelo `stage_timings` em andamento.
+    """
+    return dict(_current_timings.get() or {})
+
+
+@contextmanager
+def stage_timings():
+    """
+    Coleta as durações (em segundos) das etapas medidas por `timed` dentro do
+    bloco, inclusive em threads e tarefas criadas nele, que herdam o contexto.
+
+    O valor anterior é restaurado com `set`, e não com o token, para que o
+    bloco possa atravessar os `yield` de um gerador assíncrono.
+    """
+    timings = {}
+    previous = _current_timings.get()
+    _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.set(previous)
+
+
+def record_tokens(response) -> None:
+    """
+    Soma os tokens informados em `response.usage`, se presentes.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+
+    _prompt_tokens.inc(getattr(usage, "prompt_tokens", 0) or 0)
+    _completion_tokens.inc(getattr(usage, "completion_tokens", 0) or 0)
+
+
+def record_classification(result: dict, source: str) -> dict:
+    """
+    Conta a classificação devolvida e retorna o próprio resultado.
+    """
+    CLASSIFICATIONS.labels(result.get("categoria", "Indefinido"), source).inc()
+    return result
+
+
+def _registry():
+    """
+    Com vários workers (PROMETHEUS_MULTIPROC_DIR definido), agrega as métricas
+    gravadas por todos os processos; caso contrário usa o registro padrão.
+    """
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """
+    Exposição das métricas no formato texto do Prometheus.
+    """
+    return Response(generate_latest(_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,100 @@
+import json
+import logging
+from starlette.exceptions import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+class _BodyTooLarge(HTTPException):
+    """
+    Levantada dentro do `receive`; como é uma HTTPException, vira 413 mesmo
+    quando o parser de corpo do FastAPI a intercepta.
+    """
+
+    def __init__(self, limit: int):
+        super().__init__(
+            status_code=413,
+            detail=f"Arquivo muito grande. Tamanho máximo: {limit // (1024*1024)}MB"
+        )
+
+
+class BodySizeLimitMiddleware:
+    """
+    Middleware ASGI que limita o tamanho do corpo das requisições.
+
+    Rejeita pelo `Content-Length` antes de ler qualquer byte e, para uploads
+    sem esse cabeçalho (chunked), conta os bytes à medida que os chunks chegam,
+    interrompendo a leitura assim que o limite é ultrapassado. Assim uploads
+    grandes demais não chegam a ser bufferizados em memória ou disco.
+
+    Args:
+        default_limit (int): Limite em bytes para qualquer rota
+        limits (dict): Limites específicos por caminho (prefixo mais longo vence)
+    """
+
+    def __init__(self, app, default_limit: int, limits: dict = None):
+        self.app = app
+        self.default_limit = default_limit
+        self.limits = sorted((limits or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _limit_for(self, path: str) -> int:
+        for prefix, limit in self.limits:
+            if path.startswith(prefix):
+                return limit
+        return self.default_limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = self._limit_for(scope["path"])
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    if int(value) > limit:
+                        await self._reject(send, limit)
+                        return
+                except ValueError:
+                    pass
+                break
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _BodyTooLarge(limit)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if response_started:
+                raise
+            await self._reject(send, limit)
+
+    async def _reject(self, send, limit: int) -> None:
+        logger.warning("Requisição rejeitada: corpo acima de %s bytes", limit)
+        body = json.dumps({"detail": _BodyTooLarge(limit).detail}, ensure_ascii=False).encode("utf-8")
+
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
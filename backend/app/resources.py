@@ -0,0 +1,100 @@
+"""
+Objetos com estado de cada worker: caches, modelo local, tenants,
+palavras-chave, log de auditoria e fila de jobs.
+
+Nada disso é criado na importação: importar a aplicação não abre arquivos
+SQLite nem carrega modelos. `open_resources()` roda no startup de cada worker
+(lifespan), depois do fork do gunicorn, e o resultado fica em
+`app.state.resources`. Scripts que chamam os serviços diretamente (CLIs,
+benchmarks, testes) chamam `open_resources(jobs=False)` antes.
+"""
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Resources:
+    """
+    Objetos com estado de um worker, criados por `open_resources`.
+    """
+
+    def __init__(self, keywords, tenants, classification_cache, near_duplicate_cache,
+                 local_classifier, audit_log, job_manager):
+        self.keywords = keywords
+        self.tenants = tenants
+        self.classification_cache = classification_cache
+        self.near_duplicate_cache = near_duplicate_cache
+        self.local_classifier = local_classifier
+        self.audit_log = audit_log
+        self.job_manager = job_manager
+
+
+_resources: Optional[Resources] = None
+
+
+def open_resources(jobs: bool = True) -> Resources:
+    """
+    Cria os objetos com estado conforme a configuração.
+
+    Args:
+        jobs (bool): Abre também o banco da fila de jobs (`JOBS_DB_PATH`); os
+            workers da fila só rodam depois de `job_manager.start()`
+
+    Returns:
+        Resources: Os objetos criados, também devolvidos por `get_resources`
+    """
+    global _resources
+    # Importados aqui: os serviços leem `get_resources()` e importam este módulo
+    from app.config import JOBS_DB_PATH, KEYWORDS_PATH
+    from app.services.audit_log import build_audit_log
+    from app.services.cache_service import build_cache
+    from app.services.job_service import JobManager, JobStore
+    from app.services.keyword_service import MatcherHolder
+    from app.services.local_classifier import load_local_classifier
+    from app.services.near_duplicate_cache import build_near_duplicate_cache
+    from app.services.tenant_service import load_tenants
+
+    _resources = Resources(
+        keywords=MatcherHolder(KEYWORDS_PATH),
+        tenants=load_tenants(),
+        classification_cache=build_cache(),
+        near_duplicate_cache=build_near_duplicate_cache(),
+        local_classifier=load_local_classifier(),
+        audit_log=build_audit_log(),
+        job_manager=JobManager(JobStore(JOBS_DB_PATH)) if jobs else None,
+    )
+    return _resources
+
+
+def get_resources() -> Resources:
+    """
+    Objetos do worker atual.
+
+    Raises:
+        RuntimeError: Antes de `open_resources`
+    """
+    if _resources is None:
+        raise RuntimeError("Recursos não inicializados: chame open_resources() (feito no lifespan da aplicação)")
+    return _resources
+
+
+async def close_resources() -> None:
+    """
+    Para a fila de jobs, grava os registros de auditoria pendentes e fecha os
+    arquivos SQLite.
+    """
+    global _resources
+    if _resources is None:
+        return
+
+    resources, _resources = _resources, None
+    if resources.job_manager is not None:
+        await resources.job_manager.stop()
+        resources.job_manager.store.close()
+    if resources.audit_log is not None:
+        resources.audit_log.close()
+    if resources.near_duplicate_cache is not None:
+        resources.near_duplicate_cache.close()
+    if resources.classification_cache is not None:
+        resources.classification_cache.close()
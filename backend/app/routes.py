@@ -1,12 +1,48 @@
-from typing import Optional
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status
-from fastapi.responses import JSONResponse
+import json
+import math
+from itertools import islice
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Request, UploadFile, File, Form, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import logging
 
-from app.services.file_service import extract_text_from_file
-from app.services.ai_service import analyze_with_gpt
-from app.config import MAX_FILE_SIZE, MIN_TEXT_LENGTH
+from app.services.file_service import extract_message_async
+from app.services.mail_service import MailMessage, iter_mailbox
+from app.services.upload_service import UploadError, prepare_upload
+from app.services.ai_service import (
+    analyze_with_gpt_async,
+    analyze_with_gpt_stream,
+    bulk_mail_result,
+    inflight_requests,
+    insufficient_text_result,
+)
+from app.services.batch_service import classify_batch
+from app.services.ocr_service import ocr_service
+from app.services.job_service import (
+    JOB_PRIORITIES,
+    JobItem,
+    JobQueueFull,
+    discard_spool,
+    spool_mailbox,
+    spool_upload,
+)
+from app.services.llm_gateway import llm_gateway
+from app.services.tenant_service import (
+    BATCH,
+    INTERACTIVE,
+    Tenant,
+    TenantAuthError,
+    TenantQuotaExceeded,
+    tenant_context,
+)
+from app.services import model_router
+from app.services import local_classifier
+from app.resources import Resources
+from app.config import BATCH_MAX_ITEMS, JOBS_MAX_ITEMS, MIN_TEXT_LENGTH, TENANT_API_KEY_HEADER
+from app.metrics import ERRORS
+from app.utils.email_cleaner import collapse_thread
 
 logger = logging.getLogger(__name__)
 
@@ -20,11 +56,171 @@ class ClassificationResponse(BaseModel):
     razao: str = Field(..., description="Explicação técnica da classificação")
     resposta_sugerida: str = Field(..., description="Resposta sugerida para o email")
 
+class BatchItemResult(ClassificationResponse):
+    """Resultado de um email dentro do lote"""
+    id: str = Field(..., description="ID do email (enviado pelo cliente ou posição na lista)")
+
+
+class BatchClassificationResponse(BaseModel):
+    """Modelo de resposta da classificação em lote"""
+    total: int = Field(..., description="Quantidade de emails classificados")
+    resultados: List[BatchItemResult] = Field(..., description="Resultados na ordem de entrada")
+
+class JobCreatedResponse(BaseModel):
+    """Modelo de resposta da criação de um job"""
+    job_id: str = Field(..., description="Identificador do job")
+    status: str = Field(..., description="Situação inicial (queued)")
+    priority: str = Field(..., description="Prioridade: high, normal ou low")
+    total: int = Field(..., description="Quantidade de emails no job")
+    status_url: str = Field(..., description="Endpoint para acompanhar o job")
+
+
+class JobResponse(BaseModel):
+    """Modelo de resposta da consulta de um job"""
+    id: str = Field(..., description="Identificador do job")
+    status: str = Field(..., description="queued, running, completed ou failed")
+    priority: str = Field(..., description="Prioridade: high, normal ou low")
+    tenant: Optional[str] = Field(None, description="Tenant dono do job")
+    total: int = Field(..., description="Quantidade de emails no job")
+    processed: int = Field(..., description="Emails já classificados")
+    error: Optional[str] = Field(None, description="Motivo da falha, se houver")
+    created_at: float = Field(..., description="Criação (epoch)")
+    started_at: Optional[float] = Field(None, description="Início do processamento (epoch)")
+    finished_at: Optional[float] = Field(None, description="Fim do processamento (epoch)")
+    resultados: Optional[List[BatchItemResult]] = Field(None, description="Resultados, quando concluído")
+
+
 class ErrorResponse(BaseModel):
     """Modelo de resposta de erro"""
     detail: str = Field(..., description="Descrição do erro")
     status_code: int = Field(..., description="Código HTTP do erro")
 
+def _resources(request: Request) -> Resources:
+    """
+    Objetos com estado do worker, criados no lifespan (ver `app.resources`).
+    """
+    return request.app.state.resources
+
+
+async def _tenant(request: Request) -> Tenant:
+    """
+    Identifica o tenant pela chave de API (cabeçalho `TENANT_API_KEY_HEADER`
+    ou `Authorization: Bearer`). Sem tenants configurados, devolve o padrão.
+    """
+    api_key = request.headers.get(TENANT_API_KEY_HEADER)
+    if api_key is None:
+        scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+        api_key = credentials.strip() if scheme.lower() == "bearer" else None
+
+    try:
+        return _resources(request).tenants.authenticate(api_key)
+    except TenantAuthError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def _admit(request: Request, tenant: Tenant) -> None:
+    """
+    Recusa com 429 quando a cota de tokens do tenant está esgotada ou a fila
+    de chamadas dele está cheia.
+    """
+    try:
+        _resources(request).tenants.admit(tenant)
+    except TenantQuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
+
+
+def _prepare_upload(file: UploadFile, name: Optional[str] = None):
+    """
+    Valida tamanho e tipo do arquivo enviado (magic bytes).
+    """
+    try:
+        return prepare_upload(file)
+    except UploadError as e:
+        ERRORS.labels("upload_read").inc()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{name}: {e}" if name else str(e)
+        )
+
+
+def _mail_input(message: MailMessage) -> tuple:
+    """
+    Texto do email e, se o pré-filtro de cabeçalhos o identificou como envio
+    em massa, o resultado já definido.
+    """
+    return message.text, bulk_mail_result(message.bulk_reason) if message.bulk_reason else None
+
+
+async def _extract_upload(file: UploadFile, max_messages: int = 1) -> list:
+    """
+    Valida o arquivo enviado e extrai seus emails: um por PDF, TXT ou .eml;
+    até `max_messages` de uma caixa .mbox, lida em streaming.
+
+    Returns:
+        list: Tuplas (texto, resultado do pré-filtro de cabeçalhos ou None)
+    """
+    upload = _prepare_upload(file)
+
+    if upload.kind == "mbox":
+        if max_messages <= 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Caixas .mbox têm vários emails: use /classify/batch ou /jobs"
+            )
+        messages = await run_in_threadpool(lambda: list(islice(iter_mailbox(upload.stream), max_messages)))
+        return [_mail_input(message) for message in messages]
+
+    return [_mail_input(await extract_message_async(upload))]
+
+
+async def _read_classify_input(text: Optional[str], file: Optional[UploadFile]) -> tuple:
+    """
+    Valida a entrada de `/classify` e devolve o texto a classificar.
+
+    Returns:
+        tuple: (texto, resultado do pré-filtro de cabeçalhos de um .eml ou None)
+    """
+    # 1. Validação de entrada
+    if not text and not file:
+        logger.warning("Requisição sem texto nem arquivo")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Por favor, envie um texto ou selecione um arquivo (.txt, .pdf ou .eml)"
+        )
+    
+    # 2. Extração de texto
+    final_text = ""
+    preset = None
+    
+    try:
+        if file:
+            final_text, preset = (await _extract_upload(file))[0]
+            
+        elif text:
+            final_text = (await run_in_threadpool(_collapse_texts, [text]))[0]
+            logger.info("Texto recebido: %s caracteres (%s após reduzir a cadeia)", len(text), len(final_text))
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Erro ao processar entrada: %s", str(e))
+        ERRORS.labels("extract_text").inc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao processar entrada: {str(e)}"
+        )
+
+    return final_text, preset
+
+
 @router.post(
     "/classify",
     response_model=ClassificationResponse,
@@ -46,6 +242,7 @@ class ErrorResponse(BaseModel):
     description="Analisa e classifica um email usando IA (GPT-3.5-turbo)"
 )
 async def classify_email(
+    request: Request,
     text: Optional[str] = Form(
         None, 
         description="Texto do email a ser classificado",
@@ -53,8 +250,9 @@ async def classify_email(
     ),
     file: Optional[UploadFile] = File(
         None,
-        description="Arquivo PDF ou TXT contendo o email"
-    )
+        description="Arquivo PDF, TXT ou EML contendo o email"
+    ),
+    tenant: Tenant = Depends(_tenant)
 ):
     """
     ## Classificação Inteligente de Emails
@@ -67,7 +265,9 @@ async def classify_email(
     
     ### Parâmetros:
     - **text**: Texto do email (opcional se enviar arquivo)
-    - **file**: Arquivo PDF ou TXT (opcional se enviar texto)
+    - **file**: Arquivo PDF, TXT ou EML (opcional se enviar texto). Emails .eml
+      em massa ou automáticos (List-Unsubscribe, Auto-Submitted, remetente)
+      são classificados pelos cabeçalhos, sem a IA
     
     ### Retorno:
     ```json
@@ -81,80 +281,33 @@ async def classify_email(
     """
     
     logger.info("Nova requisição de classificação recebida")
+    _admit(request, tenant)
     
-    # 1. Validação de entrada
-    if not text and not file:
-        logger.warning("Requisição sem texto nem arquivo")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Por favor, envie um texto ou selecione um arquivo (.txt ou .pdf)"
-        )
-    
-    # 2. Extração de texto
-    final_text = ""
-    
-    try:
-        if file:
-            # Validação do tipo de arquivo
-            allowed_extensions = [".pdf", ".txt"]
-            file_ext = file.filename.split(".")[-1].lower()
-            
-            if f".{file_ext}" not in allowed_extensions:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Tipo de arquivo não suportado. Use: {', '.join(allowed_extensions)}"
-                )
-            
-            # Validação do tamanho
-            file.file.seek(0, 2)
-            size = file.file.tell()
-            file.file.seek(0)
-            
-            logger.info(f"Arquivo recebido: {file.filename} ({size} bytes)")
-            
-            if size > MAX_FILE_SIZE:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Arquivo muito grande. Tamanho máximo: {MAX_FILE_SIZE // (1024*1024)}MB"
-                )
-            
-            final_text = extract_text_from_file(file)
-            
-        elif text:
-            final_text = text.strip()
-            logger.info(f"Texto recebido: {len(final_text)} caracteres")
-    
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Erro ao processar entrada: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erro ao processar entrada: {str(e)}"
+    # 1-2. Validação de entrada e extração de texto
+    final_text, preset = await _read_classify_input(text, file)
+
+    if preset is not None:
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content=preset
         )
     
     # 3. Tratamento de texto insuficiente (Failover)
     if not final_text or len(final_text) < MIN_TEXT_LENGTH:
         logger.warning("Texto insuficiente - Ativando failover")
         
-        failover_response = {
-            "categoria": "Improdutivo",
-            "confianca": 100,
-            "razao": "O conteúdo enviado não contém texto suficiente para análise. Pode ser uma imagem digitalizada ou arquivo sem texto selecionável.",
-            "resposta_sugerida": "O sistema não conseguiu extrair texto do arquivo. Por favor, verifique o conteúdo e tente novamente com um arquivo que contenha texto selecionável."
-        }
-        
         return JSONResponse(
             status_code=status.HTTP_200_OK,
-            content=failover_response
+            content=insufficient_text_result()
         )
     
     # 4. Processamento com IA
     try:
         logger.info("Enviando para análise da IA...")
-        result = analyze_with_gpt(final_text)
+        with tenant_context(tenant, INTERACTIVE):
+            result = await analyze_with_gpt_async(final_text)
         
-        logger.info(f"Classificação concluída: {result['categoria']} ({result['confianca']}%)")
+        logger.info("Classificação concluída: %s (%s%%)", result['categoria'], result['confianca'])
         
         return JSONResponse(
             status_code=status.HTTP_200_OK,
@@ -162,8 +315,519 @@ async def classify_email(
         )
         
     except Exception as e:
-        logger.error(f"Erro na análise IA: {str(e)}")
+        logger.error("Erro na análise IA: %s", str(e))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao processar com IA. Verifique sua API Key da OpenAI e tente novamente."
-        )
\ No newline at end of file
+        )
+
+
+def _sse(event: str, data: dict) -> str:
+    """
+    Formata um evento no padrão server-sent events.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post(
+    "/classify/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Eventos SSE: categoria, confianca, razao, resposta_sugerida e result",
+            "content": {"text/event-stream": {}}
+        },
+        400: {
+            "description": "Dados de entrada inválidos",
+            "model": ErrorResponse
+        }
+    },
+    summary="Classificar Email (streaming)",
+    description="Mesma classificação de /classify, enviada em server-sent events à medida que a IA responde"
+)
+async def classify_email_stream(
+    request: Request,
+    text: Optional[str] = Form(
+        None,
+        description="Texto do email a ser classificado",
+        max_length=5000
+    ),
+    file: Optional[UploadFile] = File(
+        None,
+        description="Arquivo PDF, TXT ou EML contendo o email"
+    ),
+    tenant: Tenant = Depends(_tenant)
+):
+    """
+    ## Classificação em Streaming
+
+    Aceita as mesmas entradas de `/classify` e responde em `text/event-stream`:
+
+    - `categoria`: `{"categoria": "Produtivo"}`, assim que decodificada
+    - `confianca`: `{"confianca": 90}`, já ajustada pelas regras de pós-processamento
+    - `razao` e `resposta_sugerida`: `{"delta": "..."}`, trechos do texto gerado
+    - `result`: resultado completo (mesmo formato de `/classify`), sempre o último evento
+    """
+    logger.info("Nova requisição de classificação em streaming recebida")
+    _admit(request, tenant)
+
+    final_text, preset = await _read_classify_input(text, file)
+
+    async def events():
+        if preset is not None:
+            yield _sse("result", preset)
+            return
+
+        if not final_text or len(final_text) < MIN_TEXT_LENGTH:
+            logger.warning("Texto insuficiente - Ativando failover")
+            yield _sse("result", insufficient_text_result())
+            return
+
+        # O gerador roda depois do retorno da rota: o contexto do tenant é definido aqui
+        with tenant_context(tenant, INTERACTIVE):
+            async for event, data in analyze_with_gpt_stream(final_text):
+                yield _sse(event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Sem cache e sem buffer em proxies (nginx), para os eventos chegarem na hora
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _read_json_items(request: Request) -> list:
+    """
+    Lê os emails de um corpo JSON: lista de strings, `{"emails": [...]}` ou
+    itens `{"id", "text"}`.
+
+    Returns:
+        list: Lista de tuplas (id, texto)
+    """
+    try:
+        payload = await request.json()
+    except json.JSONDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="JSON inválido"
+        )
+
+    if isinstance(payload, dict):
+        payload = payload.get("emails")
+
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Envie uma lista de emails ou um objeto {"emails": [...]}'
+        )
+
+    items = []
+    for position, entry in enumerate(payload):
+        if isinstance(entry, str):
+            items.append((str(position), entry))
+        elif isinstance(entry, dict) and isinstance(entry.get("text"), str):
+            items.append((str(entry.get("id", position)), entry["text"]))
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Item {position} inválido: use uma string ou {{\"id\", \"text\"}}"
+            )
+    return items
+
+
+def _collapse_texts(texts: list) -> list:
+    """
+    Reduz a cadeia de respostas de cada texto (ver `collapse_thread`). Roda no
+    thread pool: um lote pode ter até `BATCH_MAX_BODY_SIZE` bytes de texto.
+    """
+    return [collapse_thread(text).strip() for text in texts]
+
+
+async def _read_batch_items(request: Request) -> tuple:
+    """
+    Lê os emails do lote a partir de JSON ou multipart. Uma caixa .mbox
+    vira um item por email ("arquivo#1", "arquivo#2", ...). Textos e arquivos
+    saem com a cadeia de respostas reduzida (ver `collapse_thread`).
+
+    Returns:
+        tuple: (lista de tuplas (id, texto), resultados do pré-filtro de cabeçalhos por posição)
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("application/json"):
+        items = await _read_json_items(request)
+        texts = await run_in_threadpool(_collapse_texts, [text for _, text in items])
+        return [(item_id, text) for (item_id, _), text in zip(items, texts)], {}
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        texts = await run_in_threadpool(_collapse_texts, [entry for entry in form.getlist("texts") if isinstance(entry, str)])
+        items = [(str(position), text) for position, text in enumerate(texts)]
+        presets = {}
+
+        for entry in form.getlist("files"):
+            if isinstance(entry, str):
+                continue
+
+            name = entry.filename or str(len(items))
+            extracted = await _extract_upload(entry, max_messages=BATCH_MAX_ITEMS + 1)
+            for number, (text, preset) in enumerate(extracted, 1):
+                if preset is not None:
+                    presets[len(items)] = preset
+                items.append((f"{name}#{number}" if len(extracted) > 1 else name, text))
+        return items, presets
+
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Use application/json ou multipart/form-data"
+    )
+
+
+@router.post(
+    "/classify/batch",
+    response_model=BatchClassificationResponse,
+    responses={
+        400: {
+            "description": "Dados de entrada inválidos",
+            "model": ErrorResponse
+        }
+    },
+    summary="Classificar Emails em Lote",
+    description="Classifica vários emails agrupando os curtos em poucas chamadas à IA"
+)
+async def classify_email_batch(request: Request, tenant: Tenant = Depends(_tenant)):
+    """
+    ## Classificação em Lote
+
+    Aceita:
+    - **JSON**: `["texto 1", "texto 2"]`, `{"emails": [...]}` ou itens `{"id": "...", "text": "..."}`
+    - **multipart/form-data**: campos `texts` (repetidos) e/ou `files` (PDF/TXT/EML ou caixas .mbox, repetidos)
+
+    Emails curtos são empacotados no mesmo prompt com IDs por item e os blocos são
+    enviados em paralelo. Os resultados voltam na ordem de entrada.
+    """
+    _admit(request, tenant)
+    items, presets = await _read_batch_items(request)
+
+    if not items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nenhum email enviado"
+        )
+
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Lote muito grande. Máximo: {BATCH_MAX_ITEMS} emails"
+        )
+
+    logger.info("Nova requisição de classificação em lote: %s emails", len(items))
+
+    with tenant_context(tenant, BATCH):
+        results = await classify_batch([text for _, text in items], presets=presets)
+
+    return {
+        "total": len(results),
+        "resultados": [{"id": item_id, **result} for (item_id, _), result in zip(items, results)]
+    }
+
+
+@router.get(
+    "/cache/stats",
+    summary="Estatísticas do Cache",
+    description="Contadores de hits, misses e evições do cache de classificação e do cache de quase-duplicatas"
+)
+async def cache_stats(resources: Resources = Depends(_resources)):
+    """
+    Retorna as estatísticas do cache de classificação, com as do cache de
+    quase-duplicatas em `near_duplicate`.
+    """
+    if resources.classification_cache is None:
+        return {"backend": "none"}
+
+    near_duplicate_cache = resources.near_duplicate_cache
+    stats = resources.classification_cache.stats()
+    stats["near_duplicate"] = near_duplicate_cache.stats() if near_duplicate_cache is not None else None
+    return stats
+
+
+@router.get(
+    "/audit/stats",
+    summary="Estatísticas do Log de Auditoria",
+    description="Registros de veredictos gravados, descartados (fila cheia) e com erro neste worker"
+)
+async def audit_stats(resources: Resources = Depends(_resources)):
+    """
+    Retorna os contadores do log de auditoria.
+    """
+    if resources.audit_log is None:
+        return {"enabled": False}
+    return {"enabled": True, **resources.audit_log.stats()}
+
+
+@router.get(
+    "/ocr/stats",
+    summary="Estatísticas do OCR",
+    description="Disponibilidade do OCR, páginas reconhecidas, acertos do cache e prazos esgotados"
+)
+async def ocr_stats():
+    """
+    Retorna os contadores do OCR de PDFs digitalizados deste worker.
+    """
+    return ocr_service.stats()
+
+
+@router.get(
+    "/local-model/stats",
+    summary="Estatísticas do Modelo Local",
+    description="Quantas classificações o modelo local respondeu sem chamar a IA"
+)
+async def local_model_stats(resources: Resources = Depends(_resources)):
+    """
+    Retorna os contadores do classificador local.
+    """
+    return local_classifier.stats.as_dict(resources.local_classifier)
+
+
+@router.get(
+    "/coalescing/stats",
+    summary="Estatísticas de Deduplicação",
+    description="Chamadas à IA em andamento e requisições idênticas que aguardaram uma chamada compartilhada"
+)
+async def coalescing_stats():
+    """
+    Retorna os contadores da deduplicação de requisições simultâneas.
+    """
+    return inflight_requests.stats()
+
+
+@router.get(
+    "/llm/stats",
+    summary="Estatísticas da OpenAI",
+    description="Chamadas, novas tentativas, limites de taxa e estado do circuit breaker da integração com a OpenAI"
+)
+async def llm_stats():
+    """
+    Retorna os contadores do gateway de chamadas à OpenAI.
+    """
+    return llm_gateway.stats()
+
+
+@router.get(
+    "/routing/stats",
+    summary="Estatísticas do roteamento entre modelos",
+    description="Chamadas, tokens e latência por nível (triagem e resposta), taxa de escalada e economia estimada"
+)
+async def routing_stats():
+    """
+    Retorna os contadores do roteamento em dois níveis.
+    """
+    return model_router.routing_stats.stats()
+
+
+@router.get(
+    "/usage",
+    summary="Uso do Tenant",
+    description="Chamadas, tokens, cota restante e espera na fila do tenant da chave de API"
+)
+async def tenant_usage(tenant: Tenant = Depends(_tenant)):
+    """
+    Retorna o uso do tenant autenticado neste processo.
+    """
+    return tenant.usage()
+
+
+@router.get(
+    "/tenants/stats",
+    summary="Estatísticas dos Tenants",
+    description="Uso de cada tenant e estado do escalonador que divide a capacidade da OpenAI"
+)
+async def tenants_stats(resources: Resources = Depends(_resources)):
+    """
+    Retorna o uso de todos os tenants e os contadores do escalonador.
+    """
+    return {
+        "authentication": resources.tenants.enabled,
+        "scheduler": llm_gateway.scheduler.stats(),
+        "tenants": resources.tenants.usage(),
+    }
+
+
+async def _read_job_items(request: Request, job_id: str) -> list:
+    """
+    Lê os emails de um job a partir de JSON ou multipart.
+
+    Diferente do lote síncrono, os arquivos não são extraídos na requisição:
+    são validados, salvos no spool do job e extraídos depois pelo pool de processos.
+    Caixas .mbox são separadas em um arquivo por email, sem carregá-las inteiras.
+
+    Returns:
+        list: Lista de `JobItem`
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("application/json"):
+        return [JobItem(item_id, text=text) for item_id, text in await _read_json_items(request)]
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        items = []
+
+        for entry in form.getlist("texts"):
+            if isinstance(entry, str):
+                items.append(JobItem(str(len(items)), text=entry))
+
+        for entry in form.getlist("files"):
+            if isinstance(entry, str):
+                continue
+
+            upload = _prepare_upload(entry, entry.filename)
+
+            if upload.kind == "mbox":
+                # Um arquivo por email no spool, lidos em streaming
+                paths = await run_in_threadpool(
+                    spool_mailbox, job_id, len(items), upload.stream, JOBS_MAX_ITEMS + 1
+                )
+                name = entry.filename or str(len(items))
+                items.extend(
+                    JobItem(f"{name}#{number}", file_path=path, kind="eml") for number, path in enumerate(paths, 1)
+                )
+                continue
+
+            path = await run_in_threadpool(spool_upload, job_id, len(items), upload.stream)
+            items.append(JobItem(
+                entry.filename or str(len(items)), file_path=path, kind=upload.kind, encoding=upload.encoding
+            ))
+        return items
+
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Use application/json ou multipart/form-data"
+    )
+
+
+def _queue_full() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Fila de jobs cheia. Tente novamente em instantes.",
+        headers={"Retry-After": "30"}
+    )
+
+
+@router.post(
+    "/jobs",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobCreatedResponse,
+    responses={
+        400: {
+            "description": "Dados de entrada inválidos",
+            "model": ErrorResponse
+        },
+        503: {
+            "description": "Fila de jobs cheia (tente novamente após Retry-After)",
+            "model": ErrorResponse
+        }
+    },
+    summary="Criar Job de Classificação",
+    description="Enfileira uma classificação longa ou em massa e devolve o ID para acompanhamento"
+)
+async def create_job(
+    request: Request,
+    priority: str = Query("normal", description="Prioridade na fila: high, normal ou low"),
+    tenant: Tenant = Depends(_tenant),
+    resources: Resources = Depends(_resources)
+):
+    """
+    ## Job de Classificação
+
+    Aceita as mesmas entradas de `/classify/batch` (JSON ou multipart com
+    `texts` e `files`), mas responde na hora com o ID do job. O processamento
+    continua mesmo se o cliente desconectar; acompanhe por `GET /jobs/{id}`.
+    """
+    if priority not in JOB_PRIORITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Prioridade inválida. Use: {', '.join(JOB_PRIORITIES)}"
+        )
+
+    # Contrapressão: recusa antes de ler o corpo
+    job_manager = resources.job_manager
+    if not job_manager.accepting():
+        raise _queue_full()
+
+    job_id = job_manager.new_job_id()
+
+    try:
+        items = await _read_job_items(request, job_id)
+
+        if not items:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Nenhum email enviado"
+            )
+
+        if len(items) > JOBS_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Job muito grande. Máximo: {JOBS_MAX_ITEMS} emails"
+            )
+
+        await job_manager.submit(job_id, items, JOB_PRIORITIES[priority], tenant.name)
+
+    except JobQueueFull:
+        discard_spool(job_id)
+        raise _queue_full()
+    except Exception:
+        discard_spool(job_id)
+        raise
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "priority": priority,
+        "total": len(items),
+        "status_url": f"{request.url.path.rstrip('/')}/{job_id}"
+    }
+
+
+@router.get(
+    "/jobs/stats",
+    summary="Estatísticas da Fila de Jobs",
+    description="Jobs na fila deste processo, workers e contagem de jobs por situação"
+)
+async def jobs_stats(resources: Resources = Depends(_resources)):
+    """
+    Retorna os contadores da fila de jobs.
+    """
+    return await run_in_threadpool(resources.job_manager.stats)
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobResponse,
+    responses={
+        404: {
+            "description": "Job não encontrado",
+            "model": ErrorResponse
+        }
+    },
+    summary="Consultar Job",
+    description="Situação, progresso e, quando concluído, os resultados do job"
+)
+async def get_job(job_id: str, tenant: Tenant = Depends(_tenant), resources: Resources = Depends(_resources)):
+    """
+    Retorna o job; `resultados` vem preenchido (na ordem de entrada) quando
+    `status` é `completed`. Com tenants configurados, só o dono vê o job.
+    """
+    job = await run_in_threadpool(resources.job_manager.store.get, job_id)
+
+    if job is not None and resources.tenants.enabled and job["tenant"] != tenant.name:
+        job = None
+
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job não encontrado"
+        )
+
+    return job
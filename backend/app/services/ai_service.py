@@ -1,195 +1,812 @@
+import json
 import logging
-import re
-from app.config import client, MAX_TEXT_LENGTH
+import time
+from typing import Optional
+from app.clients import MissingAPIKeyError, get_client
+from app.metrics import (
+    CACHE_LOOKUPS,
+    ERRORS,
+    FAILOVERS,
+    SINGLEFLIGHT_CALLS,
+    current_stage_timings,
+    record_classification,
+    record_tokens,
+    stage_timings,
+    timed,
+)
+from app.resources import get_resources
+from app.services.cache_service import make_cache_key
+from app.services.keyword_service import score_text
+from app.services.llm_gateway import LLMUnavailableError, llm_gateway
+from app.services.local_classifier import classify_locally
+from app.services.model_router import (
+    REPLY_TIER,
+    SINGLE_TIER,
+    TIER_MODELS,
+    TRIAGE_TIER,
+    escalation_reason,
+    routing_stats,
+    tiered_routing,
+    triage_max_tokens,
+)
+from app.services.prompt_builder import build_batch_messages, build_messages
+from app.utils.json_stream import IncrementalJSONParser
 from app.utils.json_utils import clean_and_parse_json
+from app.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
-def analyze_with_gpt(text: str) -> dict:
+# Chamadas à OpenAI em andamento, deduplicadas pela chave do cache (trecho do prompt)
+inflight_requests = SingleFlight(SINGLEFLIGHT_CALLS)
+
+
+SHORT_IMPRODUTIVO_REPLY = "Nenhuma ação necessária."
+GENERIC_PRODUTIVO_REPLY = "Olá! Recebemos sua mensagem e ela será encaminhada à equipe responsável. Retornaremos em breve."
+TRIAGE_REASON = "Classificação feita pela triagem rápida, sem indícios de solicitação ou ação necessária."
+NEAR_DUPLICATE_REASON = "Classificação reaproveitada de um email quase idêntico (mesmo modelo, com outros nomes, datas ou valores)."
+
+
+def _is_short_improdutivo(categoria: str, text_len: int) -> bool:
+    return categoria == "Improdutivo" and text_len < 30
+
+
+def _adjust_confidence(text_len: int, categoria: str, confianca: int, scores: dict) -> tuple:
     """
-    Analisa o texto do email usando GPT-3.5-turbo e retorna a classificação.
-    
+    Regras de ajuste de confiança. Dependem só do texto, da categoria e da
+    confiança, então podem ser aplicadas antes de a razão e a resposta chegarem.
+
     Args:
-        text (str): Texto do email a ser analisado
-        
+        text_len (int): Tamanho do texto sem espaços nas pontas
+        categoria (str): Categoria devolvida pela IA
+        confianca (int): Confiança devolvida pela IA
+        scores (dict): Resultado de `score_text`
+
     Returns:
-        dict: Dicionário com categoria, confianca, razao e resposta_sugerida
+        tuple: (confiança ajustada, texto a acrescentar à razão)
     """
+    # Lógica de Análise Semântica
+    score_acao = scores.get("acao", 0)
+    score_tecnico = scores.get("tecnico", 0)
+    score_financeiro = scores.get("financeiro", 0)
+    score_urgencia = scores.get("urgencia", 0)
+    score_total = scores["total"]
     
-    # 1. Preparação do Texto
-    truncated = text[:MAX_TEXT_LENGTH]
-    text_len = len(text.strip())
+    logger.info("Análise semântica: ação=%s, técnico=%s, financeiro=%s, urgência=%s, total=%s",
+                score_acao, score_tecnico, score_financeiro, score_urgencia, score_total)
+    
+    tem_valor_monetario = scores["tem_valor_monetario"]
+    tem_data = scores["tem_data"]
+    
+    # REGRAS DE AJUSTE DE CONFIANÇA        
+    ajuste_aplicado = False
+    razao_ajuste = ""
     
-    logger.info(f"Analisando texto com {text_len} caracteres (truncado: {len(truncated)})")
+    # REGRA 1: Texto curto MAS com conteúdo relevante
+    if text_len < 50:
+        if score_total >= 2 or tem_valor_monetario or (score_acao >= 1 and score_tecnico >= 1):
+            # Texto curto mas objetivo e claro
+            if confianca < 85:
+                confianca_antiga = confianca
+                confianca = 85
+                ajuste_aplicado = True
+                razao_ajuste = f" (Confiança aumentada de {confianca_antiga}% para {confianca}% devido a termos específicos e objetivos apesar da brevidade)"
+                logger.info("BOOST aplicado: %s%% → %s%% (texto curto mas objetivo)", confianca_antiga, confianca)
+        
+        elif score_total == 0 and confianca > 20:
+            # Texto curto E genérico
+            confianca_antiga = confianca
+            confianca = 20
+            ajuste_aplicado = True
+            razao_ajuste = f" (Confiança ajustada de {confianca_antiga}% para {confianca}% devido à brevidade e falta de contexto)"
+            logger.info("Penalidade aplicada: %s%% → %s%% (texto curto e genérico)", confianca_antiga, confianca)
+    
+    # REGRA 2: Produtivo com múltiplos indicadores fortes
+    elif categoria == "Produtivo" and (score_total >= 3 or (tem_valor_monetario and score_acao >= 1)):
+        if confianca < 90:
+            confianca_antiga = confianca
+            confianca = min(95, confianca + 15)  # Boost mas com teto
+            ajuste_aplicado = True
+            razao_ajuste = f" (Confiança aumentada de {confianca_antiga}% para {confianca}% devido a múltiplos indicadores de importância)"
+            logger.info("BOOST aplicado: %s%% → %s%% (múltiplos indicadores)", confianca_antiga, confianca)
+    
+    # REGRA 3: Produtivo com urgência explícita
+    elif categoria == "Produtivo" and score_urgencia >= 1:
+        if confianca < 90:
+            confianca_antiga = confianca
+            confianca = max(90, confianca)
+            ajuste_aplicado = True
+            razao_ajuste = f" (Confiança ajustada para {confianca}% devido a indicadores de urgência)"
+            logger.info("Urgência detectada: confiança → %s%%", confianca)
+    
+    # REGRA 4: Improdutivo muito curto
+    if categoria == "Improdutivo" and text_len < 30:
+        if confianca < 95:
+            confianca = 95
+            ajuste_aplicado = True
+            logger.info("Improdutivo curto confirmado: confiança → %s%%", confianca)
+    
+    return confianca, razao_ajuste if ajuste_aplicado else ""
+
 
-    # 2. Engenharia de Prompt APRIMORADA
-    prompt = f"""
-    Você é um classificador sênior de emails corporativos. Analise o texto abaixo.
+def rescore_confidence(text: str, text_len: int, categoria: str, confianca: int) -> int:
+    """
+    Confiança final segundo as regras de ajuste atuais, para reavaliar
+    veredictos do log de auditoria (cujo texto pode estar truncado, daí o
+    tamanho original em `text_len`).
+    """
+    adjusted, _ = _adjust_confidence(text_len, categoria, confianca, score_text(text))
+    return min(100, max(0, adjusted))
 
-    TEXTO:
-    \"\"\"{truncated}\"\"\"
 
-    REGRAS DE CLASSIFICAÇÃO:
-    - "Produtivo": Requer ação, suporte, dúvidas, pagamentos, relatórios, solicitações técnicas, testes de API/sistema, desenvolvimento.
-    - "Improdutivo": Apenas saudações, spam, agradecimentos vagos ou conteúdo ilegível.
+@timed("post_process")
+def _post_process(text: str, parsed: dict) -> dict:
+    """
+    Aplica as regras de ajuste de confiança sobre a resposta da IA.
+
+    Args:
+        text (str): Texto original do email
+        parsed (dict): JSON retornado pela IA já convertido em dicionário
 
-    CRITÉRIOS DE CONFIANÇA APRIMORADOS (0-100%):
+    Returns:
+        dict: Resultado normalizado com categoria, confianca, razao e resposta_sugerida
+    """
+    text_len = len(text.strip())
+
+    # Lógica de Pós-Processamento INTELIGENTE
+    categoria = parsed.get("categoria", "Indefinido")
+    confianca = int(parsed.get("confianca", 0))
+    
+    logger.info("Classificação inicial: %s (%s%%)", categoria, confianca)
     
-    ALTA CONFIANÇA (85-100%):
-    - Verbos de ação claros: "Pagar", "Resolver", "Testar", "Desenvolver", "Implementar", "Corrigir"
-    - Termos técnicos específicos: "API", "código", "bug", "erro", "sistema", "banco de dados"
-    - Valores monetários ou datas específicas
-    - Solicitações explícitas mesmo que curtas
+    # Palavras-chave que indicam ALTA importância mesmo em textos curtos
+    # (lista em app/data/keywords.json, contadas em uma única passada)
+    confianca, razao_ajuste = _adjust_confidence(text_len, categoria, confianca, score_text(text))
+    
+    # Adicionar razão do ajuste se aplicado
+    if razao_ajuste:
+        parsed["razao"] += razao_ajuste
+
+    # Ajustar resposta sugerida para Improdutivos muito curtos
+    if _is_short_improdutivo(categoria, text_len):
+        parsed["resposta_sugerida"] = SHORT_IMPRODUTIVO_REPLY
+
+    # Retorno Normalizado
+    result = {
+        "categoria": categoria,
+        "confianca": min(100, max(0, confianca)),  # Garante 0-100
+        "razao": parsed.get("razao", "Sem explicação."),
+        "resposta_sugerida": parsed.get("resposta_sugerida", "Analisar manualmente.")
+    }
     
-    MÉDIA CONFIANÇA (60-84%):
-    - Contexto financeiro/corporativo sem ação explícita
-    - Menção a processos sem urgência clara
-    - Termos genéricos de negócio
+    logger.info("Classificação final: %s (%s%%)", result['categoria'], result['confianca'])
     
-    BAIXA CONFIANÇA (0-59%):
-    - Apenas fragmentos sem contexto ("Segue anexo", "Ok")
-    - Texto ambíguo ou ilegível
-    - Saudações isoladas
+    return result
 
-    IMPORTANTE: 
-    - Textos curtos (menos de 50 chars) MAS com termos técnicos específicos ou ações claras DEVEM ter confiança ALTA (85%+)
-    - A brevidade não é problema se o conteúdo é claro e objetivo
-    - "Testar API", "corrigir bug", "pagar fatura" são exemplos de textos curtos mas com alta confiança
 
-    Retorne APENAS JSON:
-    {{
-      "categoria": "Produtivo" ou "Improdutivo",
-      "confianca": (inteiro 0-100),
-      "razao": "Explicação técnica e direta.",
-      "resposta_sugerida": "Resposta formal e direta."
-    }}
+def insufficient_text_result() -> dict:
+    """
+    Resposta de failover para textos vazios ou curtos demais para análise.
     """
+    FAILOVERS.inc()
+    return record_classification({
+        "categoria": "Improdutivo",
+        "confianca": 100,
+        "razao": "O conteúdo enviado não contém texto suficiente para análise. Pode ser uma imagem digitalizada ou arquivo sem texto selecionável.",
+        "resposta_sugerida": "O sistema não conseguiu extrair texto do arquivo. Por favor, verifique o conteúdo e tente novamente com um arquivo que contenha texto selecionável."
+    }, "failover")
 
-    try:
-        logger.info("Enviando requisição para OpenAI GPT-3.5-turbo...")
-        
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
+
+# Confiança das classificações feitas só pelos cabeçalhos do email
+BULK_MAIL_CONFIDENCE = 95
+
+
+def bulk_mail_result(reason: str) -> dict:
+    """
+    Resposta do pré-filtro de cabeçalhos (.eml/.mbox): emails em massa ou
+    automáticos são Improdutivos sem consulta à IA.
+    """
+    logger.info("Email em massa pelos cabeçalhos: %s - consulta à OpenAI evitada", reason)
+    return record_classification({
+        "categoria": "Improdutivo",
+        "confianca": BULK_MAIL_CONFIDENCE,
+        "razao": f"Email em massa ou automático, identificado pelos cabeçalhos: {reason}.",
+        "resposta_sugerida": SHORT_IMPRODUTIVO_REPLY
+    }, "header_filter")
+
+
+def _error_result(e: Exception) -> dict:
+    """
+    Resposta padrão quando a consulta à IA falha.
+    """
+    logger.error("Erro ao processar com IA: %s", str(e))
+    ERRORS.labels("openai_request").inc()
+    return record_classification({
+        "categoria": "Erro",
+        "confianca": 0,
+        "razao": f"Falha técnica na consulta à IA: {str(e)}",
+        "resposta_sugerida": "Tente novamente mais tarde ou verifique a configuração da API."
+    }, "error")
+
+
+# Teto de confiança das respostas provisórias dadas sem a IA
+DEGRADED_MAX_CONFIDENCE = 60
+
+
+def degraded_result(text: str, reason: str) -> dict:
+    """
+    Resposta provisória quando a OpenAI está indisponível (circuito aberto,
+    limite de taxa ou tentativas esgotadas).
+
+    Usa o modelo local, se carregado, ignorando o limiar; sem ele, decide pelas
+    palavras-chave. A confiança fica limitada a `DEGRADED_MAX_CONFIDENCE`.
+    """
+    logger.warning("Resposta degradada: %s", reason)
+
+    local_classifier = get_resources().local_classifier
+    if local_classifier is not None:
+        categoria, proba = local_classifier.predict(text)
+        confianca = int(round(proba * 100))
+    else:
+        scores = score_text(text)
+        produtivo = scores["total"] >= 1 or scores["tem_valor_monetario"]
+        categoria = "Produtivo" if produtivo else "Improdutivo"
+        confianca = 50 + min(scores["total"], 10)
+
+    resposta = GENERIC_PRODUTIVO_REPLY if categoria == "Produtivo" else SHORT_IMPRODUTIVO_REPLY
+
+    return record_classification({
+        "categoria": categoria,
+        "confianca": min(DEGRADED_MAX_CONFIDENCE, confianca),
+        "razao": "Classificação provisória feita localmente: a IA está indisponível no momento. Revise manualmente.",
+        "resposta_sugerida": resposta
+    }, "degraded")
+
+
+def triage_result(triage: dict) -> dict:
+    """
+    Resposta final para emails que não precisam do nível de resposta: a
+    categoria e a confiança da triagem com razão e resposta padrão.
+    """
+    categoria = triage["categoria"]
+    return {
+        "categoria": categoria,
+        "confianca": triage.get("confianca", 0),
+        "razao": TRIAGE_REASON,
+        "resposta_sugerida": GENERIC_PRODUTIVO_REPLY if categoria == "Produtivo" else SHORT_IMPRODUTIVO_REPLY,
+    }
+
+
+def near_duplicate_result(text: str):
+    """
+    Retorna o resultado de um email quase idêntico já classificado, se houver.
+
+    Razão e resposta sugerida vêm reescritas com os valores do novo email;
+    quando não podem ser reescritas (citam um valor ou nome do email antigo),
+    são trocadas pelas padrão.
+    """
+    near_duplicate_cache = get_resources().near_duplicate_cache
+    if near_duplicate_cache is None:
+        return None
+
+    parsed = near_duplicate_cache.get(text)
+    CACHE_LOOKUPS.labels("near_duplicate", "miss" if parsed is None else "hit").inc()
+    if parsed is None:
+        return None
+
+    if parsed.get("razao") is None:
+        parsed["razao"] = NEAR_DUPLICATE_REASON
+    if parsed.get("resposta_sugerida") is None:
+        produtivo = parsed.get("categoria") == "Produtivo"
+        parsed["resposta_sugerida"] = GENERIC_PRODUTIVO_REPLY if produtivo else SHORT_IMPRODUTIVO_REPLY
+
+    logger.info("Quase-duplicata - consulta à OpenAI evitada")
+    return record_classification(_post_process(text, parsed), "near_duplicate")
+
+
+def cached_result(text: str):
+    """
+    Retorna o resultado pós-processado a partir do cache, se existir: primeiro
+    pelo texto exato, depois por um email quase idêntico.
+    """
+    classification_cache = get_resources().classification_cache
+    if classification_cache is None:
+        return None
+
+    parsed = classification_cache.get(text)
+    CACHE_LOOKUPS.labels("exact", "miss" if parsed is None else "hit").inc()
+    if parsed is None:
+        return near_duplicate_result(text)
+
+    logger.info("Cache hit - consulta à OpenAI evitada")
+    return record_classification(_post_process(text, parsed), "cache")
+
+
+def fast_path_result(text: str):
+    """
+    Tenta responder sem chamar a OpenAI: primeiro o cache, depois o modelo local.
+    """
+    cached = cached_result(text)
+    if cached is not None:
+        return cached
+
+    local = classify_locally(text)
+    if local is not None:
+        logger.info("Classificação local: %s (%s%%) - consulta à OpenAI evitada", local['categoria'], local['confianca'])
+        record_classification(local, "local")
+    return local
+
+
+def _store_result(text: str, parsed: dict) -> None:
+    """
+    Guarda a resposta da IA nos caches (respostas com erro não são guardadas).
+    O veredicto vai para o log de auditoria em `_openai_result`, que também
+    serve de base de treino do modelo local.
+    """
+    if parsed.get("categoria") not in ("Produtivo", "Improdutivo"):
+        return
+
+    resources = get_resources()
+    if resources.classification_cache is not None:
+        resources.classification_cache.set(text, parsed)
+    if resources.near_duplicate_cache is not None:
+        resources.near_duplicate_cache.set(text, parsed)
+
+
+def _openai_result(text: str, parsed: dict, raw: str, timings: dict, batch_size: int = 1,
+                   callers: Optional[int] = 1) -> dict:
+    """
+    Pós-processa a resposta da IA e registra o veredicto no log de auditoria.
+
+    `callers` é o número de requisições atendidas pela mesma chamada à IA
+    (deduplicação de chamadas simultâneas); só uma delas recebe o número e
+    grava o registro, as demais recebem None.
+    """
+    result = record_classification(_post_process(text, dict(parsed)), "openai")
+    audit_log = get_resources().audit_log
+    if audit_log is not None and callers is not None:
+        audit_log.record(text, raw, parsed, result, timings, batch_size, callers - 1)
+    return result
+
+
+@timed("prompt_build")
+def _prepare(text: str, tier: str = SINGLE_TIER, triage: dict = None) -> list:
+    """
+    Monta as mensagens do nível: as da triagem ou as completas (com a
+    classificação preliminar da triagem, se houver).
+    """
+    messages = build_messages(text, triage_only=tier == TRIAGE_TIER, triage=triage)
+
+    logger.info("Analisando texto com %s caracteres (%s após limpeza e corte)", len(text), len(messages[-1]["content"]))
+    return messages
+
+
+def _parse(raw_content: str) -> dict:
+    with timed("parse_json"):
+        return clean_and_parse_json(raw_content)
+
+
+def _route(triage: dict) -> tuple:
+    """
+    Registra a decisão da triagem.
+
+    Returns:
+        tuple: (motivo da escalada ou None, triagem a informar ao nível de
+        resposta ou None se inválida)
+    """
+    reason = escalation_reason(triage)
+    routing_stats.record_route(reason)
+
+    if reason is None:
+        logger.info("Triagem suficiente: %s (%s%%) - resposta não gerada", triage["categoria"], triage.get("confianca"))
+        return None, triage
+
+    logger.info("Escalando para %s: %s", TIER_MODELS[REPLY_TIER], reason)
+    return reason, None if reason == "invalid_triage" else triage
+
+
+def _complete(tier: str, messages: list, **options) -> str:
+    """
+    Chamada síncrona à OpenAI com o modelo do nível; devolve o conteúdo da resposta.
+    """
+    logger.info("Enviando requisição para OpenAI %s (%s)...", TIER_MODELS[tier], tier)
+
+    start = time.perf_counter()
+    with timed("openai_request"):
+        response = get_client().chat.completions.create(
+            model=TIER_MODELS[tier],
+            messages=messages,
             temperature=0.0,
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            **options
         )
+    record_tokens(response)
+    routing_stats.record_call(tier, response.usage, time.perf_counter() - start)
 
-        raw_content = response.choices[0].message.content
-        logger.info(f"Resposta recebida da OpenAI")
-        
-        parsed = clean_and_parse_json(raw_content)
+    logger.info("Resposta recebida da OpenAI")
+    return response.choices[0].message.content
 
-        # 3. Lógica de Pós-Processamento INTELIGENTE
-        categoria = parsed.get("categoria", "Indefinido")
-        confianca = int(parsed.get("confianca", 0))
-        
-        logger.info(f"Classificação inicial: {categoria} ({confianca}%)")
-        
-        # Lógica de Análise Semântica
-        # Palavras-chave que indicam ALTA importância mesmo em textos curtos
-        keywords_alta_importancia = {
-            'acao': ['pagar', 'resolver', 'corrigir', 'implementar', 'desenvolver', 'testar', 
-                     'configurar', 'instalar', 'atualizar', 'revisar', 'analisar', 'verificar'],
-            'tecnico': ['api', 'bug', 'erro', 'sistema', 'código', 'deploy', 'servidor', 
-                        'banco', 'dados', 'endpoint', 'request', 'response', 'integração'],
-            'financeiro': ['pagar', 'fatura', 'boleto', 'pagamento', 'valor', 'r$', 'reais', 
-                          'débito', 'crédito', 'cobrança', 'pendência'],
-            'urgencia': ['urgente', 'imediato', 'asap', 'prioritário', 'crítico', 'bloqueio']
-        }
-        
-        texto_lower = text.lower()
-        
-        # Contadores de palavras-chave por categoria
-        score_acao = sum(1 for word in keywords_alta_importancia['acao'] if word in texto_lower)
-        score_tecnico = sum(1 for word in keywords_alta_importancia['tecnico'] if word in texto_lower)
-        score_financeiro = sum(1 for word in keywords_alta_importancia['financeiro'] if word in texto_lower)
-        score_urgencia = sum(1 for word in keywords_alta_importancia['urgencia'] if word in texto_lower)
-        
-        score_total = score_acao + score_tecnico + score_financeiro + score_urgencia
-        
-        logger.info(f"Análise semântica: ação={score_acao}, técnico={score_tecnico}, "
-                   f"financeiro={score_financeiro}, urgência={score_urgencia}, total={score_total}")
-        
-        # Detectar valores monetários
-        tem_valor_monetario = bool(re.search(r'r\$\s*\d+|reais|\d+[.,]\d+', texto_lower))
-        
-        # Detectar datas
-        tem_data = bool(re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}/\d{1,2}', texto_lower))
-        
-        # REGRAS DE AJUSTE DE CONFIANÇA        
-        ajuste_aplicado = False
-        razao_ajuste = ""
-        
-        # REGRA 1: Texto curto MAS com conteúdo relevante
-        if text_len < 50:
-            if score_total >= 2 or tem_valor_monetario or (score_acao >= 1 and score_tecnico >= 1):
-                # Texto curto mas objetivo e claro
-                if confianca < 85:
-                    confianca_antiga = confianca
-                    confianca = 85
-                    ajuste_aplicado = True
-                    razao_ajuste = f" (Confiança aumentada de {confianca_antiga}% para {confianca}% devido a termos específicos e objetivos apesar da brevidade)"
-                    logger.info(f"BOOST aplicado: {confianca_antiga}% → {confianca}% (texto curto mas objetivo)")
-            
-            elif score_total == 0 and confianca > 20:
-                # Texto curto E genérico
-                confianca_antiga = confianca
-                confianca = 20
-                ajuste_aplicado = True
-                razao_ajuste = f" (Confiança ajustada de {confianca_antiga}% para {confianca}% devido à brevidade e falta de contexto)"
-                logger.info(f"Penalidade aplicada: {confianca_antiga}% → {confianca}% (texto curto e genérico)")
-        
-        # REGRA 2: Produtivo com múltiplos indicadores fortes
-        elif categoria == "Produtivo" and (score_total >= 3 or (tem_valor_monetario and score_acao >= 1)):
-            if confianca < 90:
-                confianca_antiga = confianca
-                confianca = min(95, confianca + 15)  # Boost mas com teto
-                ajuste_aplicado = True
-                razao_ajuste = f" (Confiança aumentada de {confianca_antiga}% para {confianca}% devido a múltiplos indicadores de importância)"
-                logger.info(f"BOOST aplicado: {confianca_antiga}% → {confianca}% (múltiplos indicadores)")
-        
-        # REGRA 3: Produtivo com urgência explícita
-        elif categoria == "Produtivo" and score_urgencia >= 1:
-            if confianca < 90:
-                confianca_antiga = confianca
-                confianca = max(90, confianca)
-                ajuste_aplicado = True
-                razao_ajuste = f" (Confiança ajustada para {confianca}% devido a indicadores de urgência)"
-                logger.info(f"Urgência detectada: confiança → {confianca}%")
-        
-        # REGRA 4: Improdutivo muito curto
-        if categoria == "Improdutivo" and text_len < 30:
-            if confianca < 95:
-                confianca = 95
-                ajuste_aplicado = True
-                logger.info(f"Improdutivo curto confirmado: confiança → {confianca}%")
-        
-        # Adicionar razão do ajuste se aplicado
-        if ajuste_aplicado and razao_ajuste:
-            parsed["razao"] += razao_ajuste
-
-        # Ajustar resposta sugerida para Improdutivos muito curtos
-        if categoria == "Improdutivo" and text_len < 30:
-            parsed["resposta_sugerida"] = "Nenhuma ação necessária."
-
-        # Retorno Normalizado
-        result = {
-            "categoria": categoria,
-            "confianca": min(100, max(0, confianca)),  # Garante 0-100
-            "razao": parsed.get("razao", "Sem explicação."),
-            "resposta_sugerida": parsed.get("resposta_sugerida", "Analisar manualmente.")
-        }
+
+async def _complete_async(tier: str, messages: list, emails: int = 1, **options) -> str:
+    """
+    Versão assíncrona de `_complete`, via `llm_gateway`.
+    """
+    logger.info("Enviando requisição assíncrona para OpenAI %s (%s)...", TIER_MODELS[tier], tier)
+
+    start = time.perf_counter()
+    with timed("openai_request"):
+        response = await llm_gateway.create(
+            model=TIER_MODELS[tier],
+            messages=messages,
+            temperature=0.0,
+            response_format={"type": "json_object"},
+            **options
+        )
+    record_tokens(response)
+    routing_stats.record_call(tier, response.usage, time.perf_counter() - start, emails)
+
+    logger.info("Resposta recebida da OpenAI")
+    return response.choices[0].message.content
+
+
+def _request_completion(text: str) -> tuple:
+    """
+    Consulta a OpenAI e devolve o JSON da resposta, antes do pós-processamento,
+    com a saída bruta do modelo que o gerou: `(parsed, raw)`.
+
+    No roteamento em dois níveis, a triagem decide se a chamada de resposta
+    (razão e resposta sugerida) é necessária.
+    """
+    if not tiered_routing:
+        raw = _complete(SINGLE_TIER, _prepare(text))
+        parsed = _parse(raw)
+    else:
+        raw = _complete(TRIAGE_TIER, _prepare(text, TRIAGE_TIER), max_tokens=triage_max_tokens())
+        triage = _parse(raw)
+        reason, hint = _route(triage)
+        if reason is None:
+            parsed = triage_result(triage)
+        else:
+            raw = _complete(REPLY_TIER, _prepare(text, REPLY_TIER, hint))
+            parsed = _parse(raw)
+
+    _store_result(text, parsed)
+    return parsed, raw
+
+
+def analyze_with_gpt(text: str) -> dict:
+    """
+    Analisa o texto do email com os modelos configurados e retorna a classificação.
+
+    Versão síncrona: bloqueia a thread atual. Dentro de rotas assíncronas use
+    `analyze_with_gpt_async`.
+    
+    Args:
+        text (str): Texto do email a ser analisado
         
-        logger.info(f"Classificação final: {result['categoria']} ({result['confianca']}%)")
+    Returns:
+        dict: Dicionário com categoria, confianca, razao e resposta_sugerida
+    """
+    fast = fast_path_result(text)
+    if fast is not None:
+        return fast
+
+    try:
+        with stage_timings() as timings:
+            parsed, raw = _request_completion(text)
+            return _openai_result(text, parsed, raw, timings)
+
+    except MissingAPIKeyError as e:
+        return degraded_result(text, str(e))
+
+    except Exception as e:
+        return _error_result(e)
+
+
+async def _request_completion_async(text: str) -> tuple:
+    """
+    Versão assíncrona de `_request_completion`.
+    """
+    if not tiered_routing:
+        raw = await _complete_async(SINGLE_TIER, _prepare(text))
+        parsed = _parse(raw)
+    else:
+        raw = await _complete_async(TRIAGE_TIER, _prepare(text, TRIAGE_TIER), max_tokens=triage_max_tokens())
+        triage = _parse(raw)
+        reason, hint = _route(triage)
+        if reason is None:
+            parsed = triage_result(triage)
+        else:
+            raw = await _complete_async(REPLY_TIER, _prepare(text, REPLY_TIER, hint))
+            parsed = _parse(raw)
+
+    _store_result(text, parsed)
+    return parsed, raw
+
+
+async def analyze_with_gpt_async(text: str) -> dict:
+    """
+    Versão assíncrona de `analyze_with_gpt`.
+
+    Usa o cliente `AsyncOpenAI` compartilhado, via `llm_gateway` (limite de
+    taxa, novas tentativas e circuit breaker), liberando o event loop
+    enquanto a resposta da OpenAI não chega. Requisições simultâneas com o
+    mesmo trecho no prompt compartilham uma única chamada à OpenAI. Se a
+    OpenAI estiver indisponível, devolve uma resposta local provisória.
+    
+    Args:
+        text (str): Texto do email a ser analisado
         
-        return result
+    Returns:
+        dict: Dicionário com categoria, confianca, razao e resposta_sugerida
+    """
+    fast = fast_path_result(text)
+    if fast is not None:
+        return fast
+
+    try:
+        with stage_timings() as timings:
+            # A chamada compartilhada herda o contexto de quem a iniciou: as
+            # requisições que só aguardaram não somam o tempo da OpenAI
+            (parsed, raw), callers = await inflight_requests.do_claim(
+                make_cache_key(text), lambda: _request_completion_async(text)
+            )
+            # `_openai_result` pós-processa uma cópia: o resultado é compartilhado
+            return _openai_result(text, parsed, raw, timings, callers=callers)
+
+    except LLMUnavailableError as e:
+        return degraded_result(text, str(e))
 
     except Exception as e:
-        logger.error(f"Erro ao processar com IA: {str(e)}")
-        return {
-            "categoria": "Erro",
-            "confianca": 0,
-            "razao": f"Falha técnica na consulta à IA: {str(e)}",
-            "resposta_sugerida": "Tente novamente mais tarde ou verifique a configuração da API."
-        }
\ No newline at end of file
+        return _error_result(e)
+
+
+async def analyze_with_gpt_stream(text: str):
+    """
+    Versão em streaming de `analyze_with_gpt_async`.
+
+    Pede a resposta da OpenAI em streaming e a decodifica incrementalmente,
+    gerando eventos assim que cada campo fica disponível:
+
+    - `("categoria", {"categoria": ...})`
+    - `("confianca", {"confianca": ...})`, já com as regras de ajuste aplicadas
+    - `("razao", {"delta": ...})` e `("resposta_sugerida", {"delta": ...})`,
+      trechos do texto à medida que são gerados
+    - `("result", {...})`, sempre o último: o resultado completo, idêntico ao
+      de `analyze_with_gpt_async`
+
+    No roteamento em dois níveis, categoria e confiança saem logo após a
+    triagem e só a chamada de resposta é feita em streaming; se ela corrigir a
+    triagem, os eventos `categoria` e `confianca` são enviados de novo.
+
+    Respostas do cache, do modelo local, degradadas ou de erro geram apenas o
+    evento `result`.
+
+    Args:
+        text (str): Texto do email a ser analisado
+
+    Yields:
+        tuple: (nome do evento, dados)
+    """
+    fast = fast_path_result(text)
+    if fast is not None:
+        yield "result", fast
+        return
+
+    text_len = len(text.strip())
+    scores = score_text(text)
+    sent = {}
+    parsed = None
+    raw = None
+
+    with stage_timings() as timings:
+        try:
+            tier = SINGLE_TIER
+            hint = None
+
+            if tiered_routing:
+                raw = await _complete_async(TRIAGE_TIER, _prepare(text, TRIAGE_TIER), max_tokens=triage_max_tokens())
+                triage = _parse(raw)
+                reason, hint = _route(triage)
+
+                if hint is not None:
+                    adjusted, _ = _adjust_confidence(text_len, triage["categoria"], int(triage.get("confianca", 0)), scores)
+                    sent["categoria"] = triage["categoria"]
+                    sent["confianca"] = min(100, max(0, adjusted))
+                    yield "categoria", {"categoria": sent["categoria"]}
+                    yield "confianca", {"confianca": sent["confianca"]}
+
+                if reason is None:
+                    parsed = triage_result(triage)
+                tier = REPLY_TIER
+
+            if parsed is None:
+                parser = IncrementalJSONParser()
+                raw_parts = []
+
+                categoria = None
+                confianca = None
+                razao_ajuste = None
+                razao_done = False
+                suffix_sent = False
+
+                messages = _prepare(text, tier, hint)
+                logger.info("Enviando requisição em streaming para OpenAI %s (%s)...", TIER_MODELS[tier], tier)
+
+                start = time.perf_counter()
+                with timed("openai_request"):
+                    stream = await llm_gateway.create(
+                        model=TIER_MODELS[tier],
+                        messages=messages,
+                        temperature=0.0,
+                        response_format={"type": "json_object"},
+                        stream=True,
+                        stream_options={"include_usage": True},
+                    )
+
+                    # A vaga do escalonador e o prazo valem até o fim do corpo
+                    async with stream:
+                        async for chunk in stream:
+                            # O uso de tokens chega no último pedaço, sem `choices`
+                            record_tokens(chunk)
+                            if not chunk.choices:
+                                continue
+
+                            content = chunk.choices[0].delta.content
+                            if not content:
+                                continue
+                            raw_parts.append(content)
+
+                            for kind, key, value in parser.feed(content):
+                                if kind == "delta":
+                                    if key == "razao":
+                                        yield "razao", {"delta": value}
+                                    elif key == "resposta_sugerida" and not _is_short_improdutivo(categoria, text_len):
+                                        yield "resposta_sugerida", {"delta": value}
+                                    continue
+
+                                if key == "categoria":
+                                    categoria = value
+                                    if sent.get("categoria") != categoria:
+                                        sent["categoria"] = categoria
+                                        yield "categoria", {"categoria": categoria}
+                                elif key == "confianca":
+                                    confianca = value
+                                elif key == "razao":
+                                    razao_done = True
+
+                                # As regras de ajuste só precisam da categoria e da confiança
+                                if razao_ajuste is None and categoria is not None and confianca is not None:
+                                    adjusted, razao_ajuste = _adjust_confidence(text_len, categoria, int(confianca), scores)
+                                    adjusted = min(100, max(0, adjusted))
+                                    if sent.get("confianca") != adjusted:
+                                        sent["confianca"] = adjusted
+                                        yield "confianca", {"confianca": adjusted}
+
+                                if razao_done and razao_ajuste and not suffix_sent:
+                                    suffix_sent = True
+                                    yield "razao", {"delta": razao_ajuste}
+
+                # O gateway repassa o mesmo uso à cota do tenant
+                routing_stats.record_call(tier, stream.usage, time.perf_counter() - start)
+                logger.info("Resposta em streaming recebida da OpenAI")
+
+                raw = "".join(raw_parts)
+                with timed("parse_json"):
+                    parsed = parser.result if parser.done else clean_and_parse_json(raw)
+
+            _store_result(text, parsed)
+            result = _openai_result(text, parsed, raw, timings)
+
+        except LLMUnavailableError as e:
+            result = degraded_result(text, str(e))
+
+        except Exception as e:
+            result = _error_result(e)
+
+    yield "result", result
+
+
+def _packed_items(parsed: dict, texts: dict) -> dict:
+    """
+    Extrai os itens da resposta em lote, por ID, descartando IDs desconhecidos.
+    """
+    resultados = parsed.get("resultados")
+    if not isinstance(resultados, list):
+        logger.warning("Resposta em lote sem lista de resultados")
+        return {}
+
+    items = {}
+    for item in resultados:
+        if not isinstance(item, dict):
+            continue
+
+        item_id = str(item.get("id", ""))
+        if item_id in texts:
+            items[item_id] = {key: value for key, value in item.items() if key != "id"}
+    return items
+
+
+async def _analyze_packed_tier(texts: dict, items: list, tier: str, triages: dict = None) -> dict:
+    """
+    Chamada em lote com o prompt completo (tier "single" ou "reply").
+    """
+    with timed("prompt_build"):
+        messages = build_batch_messages(items, triages=triages)
+
+    logger.info("Enviando lote com %s emails para OpenAI %s (%s)...", len(items), TIER_MODELS[tier], tier)
+    parsed = _parse(await _complete_async(tier, messages, emails=len(items)))
+
+    # Etapas da chamada em lote, comuns a todos os itens
+    timings = current_stage_timings()
+    results = {}
+    for item_id, item in _packed_items(parsed, texts).items():
+        if item.get("categoria") not in ("Produtivo", "Improdutivo"):
+            continue
+
+        _store_result(texts[item_id], item)
+        # Saída bruta do item: a resposta em lote traz todos os emails juntos
+        raw = json.dumps(item, ensure_ascii=False)
+        results[item_id] = _openai_result(texts[item_id], item, raw, timings, len(items))
+    return results
+
+
+async def analyze_packed_async(texts: dict) -> dict:
+    """
+    Classifica vários emails curtos em uma única chamada à OpenAI.
+
+    No roteamento em dois níveis, uma triagem em lote vem antes e só os
+    emails escalados seguem, juntos, para a chamada de resposta.
+
+    Os itens que o modelo não devolver (ou devolver inválidos) ficam de fora
+    do resultado; cabe a quem chamou reprocessá-los individualmente.
+
+    Args:
+        texts (dict): Mapa id -> texto do email
+
+    Returns:
+        dict: Mapa id -> resultado pós-processado, apenas para os itens válidos
+    """
+    items = list(texts.items())
+
+    with stage_timings():
+        return await _analyze_packed(texts, items)
+
+
+async def _analyze_packed(texts: dict, items: list) -> dict:
+    """
+    Corpo de `analyze_packed_async`, dentro da coleta das durações das etapas.
+    """
+    if not tiered_routing:
+        results = await _analyze_packed_tier(texts, items, SINGLE_TIER)
+        logger.info("Lote processado: %s/%s itens válidos", len(results), len(items))
+        return results
+
+    with timed("prompt_build"):
+        messages = build_batch_messages(items, triage_only=True)
+
+    logger.info("Triagem em lote de %s emails...", len(items))
+    raw_content = await _complete_async(TRIAGE_TIER, messages, emails=len(items), max_tokens=triage_max_tokens(len(items)))
+    triages = _packed_items(_parse(raw_content), texts)
+    timings = current_stage_timings()
+
+    results = {}
+    escalated = []
+    hints = {}
+    for item_id, text in items:
+        reason, hint = _route(triages.get(item_id))
+        if reason is None:
+            parsed = triage_result(triages[item_id])
+            _store_result(texts[item_id], parsed)
+            raw = json.dumps(triages[item_id], ensure_ascii=False)
+            results[item_id] = _openai_result(texts[item_id], parsed, raw, timings, len(items))
+            continue
+
+        escalated.append((item_id, text))
+        if hint is not None:
+            hints[item_id] = hint
+
+    if escalated:
+        results.update(await _analyze_packed_tier(texts, escalated, REPLY_TIER, hints))
+
+    logger.info("Lote processado: %s/%s itens válidos (%s escalados)", len(results), len(items), len(escalated))
+    return results
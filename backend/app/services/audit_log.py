@@ -0,0 +1,305 @@
+"""
+Log de auditoria dos veredictos da IA.
+
+Cada classificação respondida pela OpenAI vira um registro com o hash e o
+texto (truncado) do email, a saída bruta do modelo, a confiança antes e
+depois das regras de ajuste e a duração de cada etapa. Os registros permitem
+medir deriva e reavaliar regras ou um novo modelo local sem pagar as chamadas
+de novo (ver `app.cli.replay_audit`).
+
+Formato: segmentos só de acréscimo em `AUDIT_LOG_DIR`, um por processo, com
+rotação por tamanho. Cada segmento começa com `MAGIC` mais o codec e segue
+com quadros de 4 bytes de tamanho (big-endian) mais o registro codificado
+em msgpack. Sem o pacote (instalação antiga), grava em JSON no mesmo
+formato de quadros; o codec fica no cabeçalho e o leitor aceita os dois.
+
+A gravação roda em uma thread própria: a requisição só enfileira o
+registro e, se a fila estiver cheia, ele é descartado (e contado).
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+
+from app.config import (
+    AUDIT_HASH_ONLY,
+    AUDIT_LOG_DIR,
+    AUDIT_MAX_SEGMENTS,
+    AUDIT_QUEUE_SIZE,
+    AUDIT_SEGMENT_BYTES,
+    AUDIT_TEXT_CHARS,
+)
+from app.metrics import AUDIT_RECORDS
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MAGIC = b"EMAUDIT1"
+CODEC_MSGPACK = b"M"
+CODEC_JSON = b"J"
+SEGMENT_GLOB = "audit-*.seg"
+
+_frame = struct.Struct(">I")
+_STOP = object()
+
+
+def _encoder(codec: bytes):
+    if codec == CODEC_MSGPACK:
+        return lambda record: msgpack.packb(record, use_bin_type=True)
+    return lambda record: json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decoder(codec: bytes):
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("segmento em msgpack: instale o pacote msgpack para lê-lo")
+        return lambda payload: msgpack.unpackb(payload, raw=False)
+    if codec == CODEC_JSON:
+        return lambda payload: json.loads(payload)
+    raise ValueError(f"codec desconhecido: {codec!r}")
+
+
+def text_hash(text: str) -> str:
+    """
+    Hash do texto completo (SHA-256, 128 bits em hexadecimal): identifica o
+    email mesmo com o texto guardado truncado.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class AuditLog:
+    """
+    Gravador dos segmentos de auditoria.
+
+    Cada worker cria o seu no startup (ver `app.resources`): a thread de
+    gravação não existiria em um processo criado por fork.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int, max_segments: int,
+                 text_chars: int, queue_size: int, hash_only: bool = False):
+        self.directory = directory
+        self.hash_only = hash_only
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.text_chars = text_chars
+        self.codec = CODEC_MSGPACK if msgpack is not None else CODEC_JSON
+        self._encode = _encoder(self.codec)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._segment_seq = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self._thread.start()
+
+    def record(self, text: str, raw: str, parsed: dict, result: dict,
+               timings: dict, batch_size: int = 1, coalesced: int = 0) -> None:
+        """
+        Enfileira o registro de um veredicto da IA. Não bloqueia.
+
+        Args:
+            text (str): Texto do email (completo)
+            raw (str): Saída bruta do modelo (em lotes, o item deste email)
+            parsed (dict): Resposta do modelo, antes do pós-processamento
+            result (dict): Resultado devolvido ao cliente
+            timings (dict): Duração de cada etapa, em segundos
+            batch_size (int): Emails na mesma chamada à OpenAI
+            coalesced (int): Outras requisições idênticas atendidas pela mesma
+                chamada (registradas só aqui)
+        """
+        try:
+            confianca_ia = int(parsed.get("confianca", 0))
+        except (TypeError, ValueError):
+            confianca_ia = 0
+
+        # Hash e corte do texto ficam para a thread de gravação
+        entry = {
+            "ts": time.time(),
+            "text": text,
+            "raw": raw,
+            "categoria": result.get("categoria"),
+            "confianca_ia": confianca_ia,
+            "confianca_final": result.get("confianca"),
+            "etapas": {stage: round(seconds, 6) for stage, seconds in timings.items()},
+            "lote": batch_size,
+            "aguardaram": coalesced,
+        }
+
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            AUDIT_RECORDS.labels("dropped").inc()
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                break
+
+            # Grava tudo o que já está na fila antes do flush
+            batch = [entry]
+            while len(batch) < 1000:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    self._write(batch)
+                    self._close_segment()
+                    return
+                batch.append(entry)
+
+            self._write(batch)
+
+        self._close_segment()
+
+    def _write(self, batch: list) -> None:
+        try:
+            if self._file is None or self._file.tell() >= self.segment_bytes:
+                self._open_segment()
+
+            for entry in batch:
+                text = entry["text"]
+                entry.update(
+                    hash=text_hash(text),
+                    text="" if self.hash_only else text[:self.text_chars],
+                    text_len=len(text.strip()),
+                )
+                payload = self._encode(entry)
+                self._file.write(_frame.pack(len(payload)) + payload)
+            self._file.flush()
+
+            self.written += len(batch)
+            AUDIT_RECORDS.labels("written").inc(len(batch))
+
+        except Exception as e:
+            self.errors += len(batch)
+            AUDIT_RECORDS.labels("error").inc(len(batch))
+            logger.warning("Falha ao gravar o log de auditoria: %s", e)
+            self._close_segment()
+
+    def _open_segment(self) -> None:
+        self._close_segment()
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._segment_seq += 1
+        name = f"audit-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._segment_seq:04d}.seg"
+        self._file = open(os.path.join(self.directory, name), "ab")
+        self._file.write(MAGIC + self.codec)
+        logger.info("Log de auditoria: novo segmento %s", name)
+
+        self._prune()
+
+    def _close_segment(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def _prune(self) -> None:
+        """
+        Mantém só os `max_segments` segmentos mais recentes da pasta (de
+        todos os processos).
+        """
+        if self.max_segments <= 0:
+            return
+
+        segments = sorted(glob.glob(os.path.join(self.directory, SEGMENT_GLOB)), key=os.path.getmtime)
+        for path in segments[:-self.max_segments]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Grava os registros pendentes e fecha o segmento atual.
+        """
+        if not self._thread.is_alive():
+            return
+
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "codec": "msgpack" if self.codec == CODEC_MSGPACK else "json",
+            "hash_only": self.hash_only,
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "pending": self._queue.qsize(),
+        }
+
+
+def segment_paths(paths: Iterable[str]) -> list:
+    """
+    Expande pastas nos seus segmentos, em ordem de gravação.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(glob.glob(os.path.join(path, SEGMENT_GLOB)))
+        elif os.path.isfile(path):
+            found.append(path)
+    return sorted(found, key=os.path.getmtime)
+
+
+def iter_records(paths: Iterable[str]) -> Iterator[dict]:
+    """
+    Lê os registros dos segmentos (arquivos ou pastas). Um quadro incompleto
+    no fim do segmento (gravação em andamento ou interrompida) é ignorado.
+    """
+    for path in segment_paths(paths):
+        with open(path, "rb") as f:
+            header = f.read(len(MAGIC) + 1)
+            if header[:len(MAGIC)] != MAGIC:
+                logger.warning("Ignorando %s: não é um segmento de auditoria", path)
+                continue
+            decode = _decoder(header[len(MAGIC):])
+
+            while True:
+                prefix = f.read(_frame.size)
+                if len(prefix) < _frame.size:
+                    break
+                size = _frame.unpack(prefix)[0]
+                payload = f.read(size)
+                if len(payload) < size:
+                    break
+                yield decode(payload)
+
+
+def build_audit_log() -> Optional[AuditLog]:
+    """
+    Cria o log conforme `AUDIT_LOG_DIR` (vazio: desligado). Chamado por
+    `app.resources.open_resources`, no startup do worker.
+    """
+    if not AUDIT_LOG_DIR:
+        logger.info("Log de auditoria desabilitado")
+        return None
+
+    if msgpack is None:
+        logger.warning("msgpack não instalado (ver requirements.txt): log de auditoria em JSON")
+    if not AUDIT_HASH_ONLY:
+        logger.warning("Log de auditoria grava o texto dos emails em %s (AUDIT_HASH_ONLY=true guarda só o hash)", AUDIT_LOG_DIR)
+    return AuditLog(AUDIT_LOG_DIR, AUDIT_SEGMENT_BYTES, AUDIT_MAX_SEGMENTS, AUDIT_TEXT_CHARS, AUDIT_QUEUE_SIZE,
+                    AUDIT_HASH_ONLY)
+
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+
+from app.config import (
+    BATCH_CONCURRENCY,
+    BATCH_ITEMS_PER_PROMPT,
+    BATCH_MAX_CHARS_PER_PROMPT,
+    BATCH_SHORT_TEXT_LENGTH,
+    MAX_TEXT_LENGTH,
+    MIN_TEXT_LENGTH,
+)
+from app.services.ai_service import (
+    analyze_packed_async,
+    analyze_with_gpt_async,
+    degraded_result,
+    fast_path_result,
+    insufficient_text_result,
+)
+from app.services.llm_gateway import LLMUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+def pack_items(texts: list, indexes: list) -> list:
+    """
+    Agrupa os índices em blocos que cabem em um único prompt.
+
+    Emails longos (acima de `BATCH_SHORT_TEXT_LENGTH`) ficam sozinhos no bloco;
+    os curtos são empacotados até `BATCH_ITEMS_PER_PROMPT` itens ou
+    `BATCH_MAX_CHARS_PER_PROMPT` caracteres.
+
+    Args:
+        texts (list): Textos de todos os emails
+        indexes (list): Índices que precisam ir para a IA
+
+    Returns:
+        list: Lista de blocos (listas de índices)
+    """
+    chunks = []
+    current = []
+    current_chars = 0
+
+    for index in indexes:
+        size = min(len(texts[index]), MAX_TEXT_LENGTH)
+
+        if size > BATCH_SHORT_TEXT_LENGTH:
+            chunks.append([index])
+            continue
+
+        if current and (len(current) >= BATCH_ITEMS_PER_PROMPT or current_chars + size > BATCH_MAX_CHARS_PER_PROMPT):
+            chunks.append(current)
+            current = []
+            current_chars = 0
+
+        current.append(index)
+        current_chars += size
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+async def classify_batch(texts: list, concurrency: int = BATCH_CONCURRENCY, presets: dict = None) -> list:
+    """
+    Classifica uma lista de emails, preservando a ordem de entrada.
+
+    Os textos chegam com a cadeia de respostas já reduzida na entrada (ver
+    `collapse_thread`).
+    Textos curtos demais recebem o failover, respostas do cache e do modelo
+    local são reaproveitadas e o restante é empacotado em poucos prompts
+    enviados em paralelo (até `concurrency` chamadas simultâneas). Itens
+    que o modelo não devolver são reprocessados um a um.
+
+    Args:
+        texts (list): Textos dos emails
+        concurrency (int): Chamadas simultâneas à OpenAI
+        presets (dict): Resultados já definidos por posição (ex.: pré-filtro de
+            cabeçalhos dos emails .eml/.mbox), que não passam pela IA
+
+    Returns:
+        list: Resultados na mesma ordem de `texts`
+    """
+    results = [None] * len(texts)
+    presets = presets or {}
+    pending = []
+
+    for index, text in enumerate(texts):
+        if index in presets:
+            results[index] = presets[index]
+            continue
+
+        if len(text) < MIN_TEXT_LENGTH:
+            results[index] = insufficient_text_result()
+            continue
+
+        fast = fast_path_result(text)
+        if fast is not None:
+            results[index] = fast
+        else:
+            pending.append(index)
+
+    chunks = pack_items(texts, pending)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    logger.info("Lote com %s emails: %s para a IA em %s chamadas", len(texts), len(pending), len(chunks))
+
+    async def classify_single(index: int) -> None:
+        async with semaphore:
+            results[index] = await analyze_with_gpt_async(texts[index])
+
+    async def classify_chunk(chunk: list) -> None:
+        if len(chunk) == 1:
+            await classify_single(chunk[0])
+            return
+
+        async with semaphore:
+            try:
+                packed = await analyze_packed_async({str(index): texts[index] for index in chunk})
+            except LLMUnavailableError as e:
+                # Reprocessar um a um só multiplicaria as chamadas a uma API fora do ar
+                for index in chunk:
+                    results[index] = degraded_result(texts[index], str(e))
+                return
+            except Exception as e:
+                logger.warning("Falha no lote de %s emails, reprocessando individualmente: %s", len(chunk), e)
+                packed = {}
+
+        missing = []
+        for index in chunk:
+            if str(index) in packed:
+                results[index] = packed[str(index)]
+            else:
+                missing.append(index)
+
+        if missing:
+            logger.info("%s itens ausentes na resposta em lote, reprocessando individualmente", len(missing))
+            await asyncio.gather(*(classify_single(index) for index in missing))
+
+    await asyncio.gather(*(classify_chunk(chunk) for chunk in chunks))
+
+    return results
@@ -0,0 +1,312 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import (
+    CACHE_BACKEND,
+    CACHE_MAX_BYTES,
+    CACHE_MAX_ENTRIES,
+    CACHE_SQLITE_PATH,
+    CACHE_TTL_SECONDS,
+    OPENAI_MODEL,
+    PROMPT_VERSION,
+    ROUTING_MODE,
+    ROUTING_REPLY_MODEL,
+    ROUTING_TRIAGE_MODEL,
+)
+from app.services.prompt_builder import prepare_email
+
+logger = logging.getLogger(__name__)
+
+# Modelos que produzem a resposta: mudar o roteamento invalida o cache
+if ROUTING_MODE == "tiered":
+    _MODELS = f"{ROUTING_TRIAGE_MODEL}>{ROUTING_REPLY_MODEL}"
+else:
+    _MODELS = OPENAI_MODEL
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza o texto para fins de cache: Unicode NFC e espaços colapsados.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def prompt_text(text: str) -> str:
+    """
+    Trecho do email que vai para o prompt (ver `prepare_email`), normalizado.
+
+    É o que a IA recebe: dois emails com o mesmo trecho recebem a mesma
+    resposta, e emails com trechos diferentes nunca compartilham uma entrada
+    dos caches nem uma chamada em andamento.
+    """
+    return normalize_text(prepare_email(text))
+
+
+def cache_namespace() -> str:
+    """
+    Versão do prompt e modelos que produziram as respostas guardadas: mudar
+    qualquer um deles invalida os caches.
+    """
+    return f"{PROMPT_VERSION}\0{_MODELS}"
+
+
+def make_cache_key(text: str) -> str:
+    """
+    Gera a chave de cache a partir do trecho do email enviado ao modelo (ver
+    `prompt_text`), versão do prompt e modelos.
+
+    Args:
+        text (str): Texto do email (sem limpar nem truncar)
+
+    Returns:
+        str: Hash SHA-256 em hexadecimal
+    """
+    payload = f"{cache_namespace()}\0{prompt_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """
+    Cache LRU em memória com TTL e limite de bytes.
+
+    Os valores são guardados serializados, o que permite medir o tamanho
+    ocupado e devolver uma cópia nova a cada leitura.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._data = OrderedDict()  # key -> (expires_at, raw, bytes em UTF-8)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            expires_at, raw, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.evictions += 1
+                return None
+
+            self._data.move_to_end(key)
+            return raw
+
+    def set(self, key: str, raw: str) -> None:
+        # Bytes, não caracteres: textos em português têm muitos acentos
+        size = len(raw.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+            self._data[key] = (time.monotonic() + self.ttl, raw, size)
+            self._bytes += size
+
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "evictions": self.evictions,
+            }
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteCacheBackend:
+    """
+    Cache em disco (SQLite) compartilhado entre os workers do uvicorn.
+
+    Cada worker cria o seu no startup (a conexão não atravessa o fork do
+    gunicorn). Usa WAL para permitir leituras concorrentes entre processos. A limpeza de
+    entradas expiradas e o corte por LRU rodam a cada `PRUNE_EVERY` escritas.
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: str, ttl: float, max_entries: int, max_bytes: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS classification_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_last_access ON classification_cache (last_access)"
+        )
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM classification_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at = row
+            if expires_at < now:
+                self._conn.execute("DELETE FROM classification_cache WHERE key = ?", (key,))
+                self.evictions += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE classification_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            return value
+
+    def set(self, key: str, raw: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO classification_cache (key, value, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, raw, len(raw.encode("utf-8")), now + self.ttl, now),
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        cur = self._conn.execute("DELETE FROM classification_cache WHERE expires_at < ?", (now,))
+        self.evictions += cur.rowcount
+
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM classification_cache"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        # Remove as entradas menos acessadas até voltar aos limites
+        removed = 0
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM classification_cache ORDER BY last_access"
+        ).fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM classification_cache WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            removed += 1
+        self.evictions += removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM classification_cache"
+            ).fetchone()
+        return {
+            "entries": count,
+            "bytes": total,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ClassificationCache:
+    """
+    Cache de respostas da IA endereçado pelo conteúdo do email.
+
+    Guarda o JSON cru retornado pelo modelo (antes do pós-processamento), de
+    forma que as regras de ajuste continuem sendo aplicadas a cada leitura.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> Optional[dict]:
+        raw = self.backend.get(make_cache_key(text))
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, text: str, parsed: dict) -> None:
+        try:
+            self.backend.set(make_cache_key(text), json.dumps(parsed, ensure_ascii=False))
+        except Exception as e:
+            logger.warning("Falha ao gravar no cache: %s", e)
+
+    def stats(self) -> dict:
+        stats = self.backend.stats()
+        total = self.hits + self.misses
+        stats.update({
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        })
+        return stats
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def build_cache() -> Optional[ClassificationCache]:
+    """
+    Cria o cache de acordo com `CACHE_BACKEND` (memory, sqlite ou none).
+    Chamado por `app.resources.open_resources`, no startup do worker.
+    """
+    if CACHE_BACKEND == "none":
+        logger.info("Cache de classificação desabilitado")
+        return None
+
+    if CACHE_BACKEND == "sqlite":
+        backend = SQLiteCacheBackend(CACHE_SQLITE_PATH, CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES)
+    else:
+        backend = MemoryCacheBackend(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES)
+
+    logger.info(f"Cache de classificação ativo: {type(backend).__name__}")
+    return ClassificationCache(backend)
+
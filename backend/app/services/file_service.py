@@ -1,39 +1,174 @@
+import codecs
 import logging
+from typing import Iterator, List, Optional
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 from pypdf import PdfReader
 from pypdf.errors import PdfReadError
 
+from app.config import MAIL_MAX_MESSAGE_BYTES, MAX_EXTRACT_CHARS, MAX_PDF_PAGES, OCR_MIN_CHARS, THREAD_RAW_FACTOR
+from app.metrics import ERRORS, timed
+from app.services.mail_service import MailMessage, parse_email
+from app.services.ocr_service import ocr_service
+from app.services.upload_service import PreparedUpload, UploadError, prepare_upload
+from app.utils.email_cleaner import collapse_thread
+
 logger = logging.getLogger(__name__)
 
-def extract_text_from_file(file: UploadFile) -> str:
-    try:
-        file.file.seek(0)
 
-        if file.filename.lower().endswith(".pdf"):
-            reader = PdfReader(file.file)
-            text = ""
+def iter_pdf_text(stream, max_pages: int = MAX_PDF_PAGES, textless: Optional[List] = None) -> Iterator[str]:
+    """
+    Gera o texto das páginas do PDF sob demanda, até `max_pages` páginas.
 
-            for page in reader.pages:
-                content = page.extract_text()
-                if content:
-                    text += content + "\n"
+    O `PdfReader` só interpreta uma página quando ela é acessada, então parar
+    a iteração cedo evita processar o restante do documento. As páginas sem
+    camada de texto (digitalizadas) são acrescentadas a `textless`, se
+    informada, para o OCR.
+    """
+    reader = PdfReader(stream)
 
-            return text.strip()
+    for page_number, page in enumerate(reader.pages):
+        if page_number >= max_pages:
+            logger.info("Limite de %s páginas atingido - restante do PDF ignorado", max_pages)
+            break
 
-        elif file.filename.lower().endswith(".txt"):
-            raw = file.file.read()
-            for enc in ("utf-8", "latin-1", "cp1252"):
-                try:
-                    return raw.decode(enc).strip()
-                except UnicodeDecodeError:
-                    continue
-            return ""
+        content = page.extract_text()
+        if content and content.strip():
+            yield content
+        elif textless is not None:
+            textless.append(page)
 
-        return ""
+
+def iter_text_chunks(stream, encoding: str, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """
+    Decodifica o arquivo de texto em blocos, sem carregá-lo inteiro.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield decoder.decode(chunk)
+
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def collect_text(parts: Iterator[str], max_chars: int = MAX_EXTRACT_CHARS, separator: str = "\n") -> str:
+    """
+    Junta os trechos em uma única passada, parando ao atingir `max_chars`.
+    """
+    collected = []
+    total = 0
+
+    for part in parts:
+        collected.append(part)
+        total += len(part) + len(separator)
+        if total >= max_chars:
+            break
+
+    return separator.join(collected).strip()
+
+
+@timed("extract_text")
+def extract_message(
+    stream,
+    kind: str,
+    encoding: Optional[str] = None,
+    max_chars: int = MAX_EXTRACT_CHARS,
+    inline_ocr: bool = False,
+) -> MailMessage:
+    """
+    Extrai o texto de um buffer já validado. Cadeias de respostas são
+    reduzidas à mensagem mais recente mais o resumo sem repetições das
+    anteriores (ver `collapse_thread`) sobre até `max_chars *
+    THREAD_RAW_FACTOR` caracteres; só o resultado é cortado em `max_chars`.
+
+    PDFs cuja camada de texto rende menos de `OCR_MIN_CHARS` caracteres têm
+    as páginas sem texto enviadas ao OCR (ver `ocr_service`), se disponível.
+
+    Args:
+        stream: Buffer binário posicionado no início (ex.: SpooledTemporaryFile)
+        kind (str): Tipo detectado pelos magic bytes ("pdf", "txt" ou "eml")
+        encoding (str): Codificação detectada, para arquivos de texto
+        max_chars (int): Limite de caracteres extraídos
+        inline_ocr (bool): Roda o OCR no próprio processo (pool dos jobs)
+
+    Returns:
+        MailMessage: Texto extraído (vazio em caso de erro) e, para .eml, o
+        motivo do pré-filtro de cabeçalhos, se houver
+    """
+    try:
+        stream.seek(0)
+        raw_chars = max_chars * THREAD_RAW_FACTOR
+
+        if kind == "pdf":
+            textless = []
+            text = collect_text(iter_pdf_text(stream, textless=textless), raw_chars)
+            if len(text) < OCR_MIN_CHARS and textless:
+                recognized = ocr_service.recognize(textless, inline=inline_ocr)
+                text = collect_text(filter(None, (text, recognized)), raw_chars)
+            return MailMessage(collapse_thread(text)[:max_chars].strip())
+
+        elif kind == "txt":
+            # Blocos de um mesmo arquivo de texto são contíguos: sem separador
+            text = collect_text(iter_text_chunks(stream, encoding or "utf-8"), raw_chars, separator="")
+            return MailMessage(collapse_thread(text)[:max_chars].strip())
+
+        elif kind == "eml":
+            # Caixas .mbox têm vários emails: ver `mail_service.iter_mailbox`
+            return parse_email(stream.read(MAIL_MAX_MESSAGE_BYTES), max_chars)
+
+        return MailMessage("")
 
     except PdfReadError:
         logger.error("Erro ao ler PDF")
-        return ""
+        ERRORS.labels("extract_text").inc()
+        return MailMessage("")
     except Exception as e:
-        logger.error(f"Erro arquivo: {e}")
+        logger.error("Erro arquivo: %s", e)
+        ERRORS.labels("extract_text").inc()
+        return MailMessage("")
+
+
+def extract_text(stream, kind: str, encoding: Optional[str] = None, max_chars: int = MAX_EXTRACT_CHARS) -> str:
+    """
+    Só o texto de `extract_message` (sem o motivo do pré-filtro dos .eml).
+    """
+    return extract_message(stream, kind, encoding, max_chars).text
+
+
+def extract_message_from_path(path: str, kind: str, encoding: Optional[str] = None) -> MailMessage:
+    """
+    Extrai o texto de um arquivo salvo em disco.
+
+    Função de módulo (serializável) para rodar no pool de processos dos jobs;
+    o OCR, se necessário, roda no mesmo processo.
+    """
+    with open(path, "rb") as stream:
+        return extract_message(stream, kind, encoding, inline_ocr=True)
+
+
+def extract_text_from_file(file: UploadFile) -> str:
+    """
+    Valida o upload e extrai seu texto (tipo detectado pelos magic bytes).
+
+    Returns:
+        str: Texto extraído ou string vazia se o arquivo for inválido
+    """
+    try:
+        upload = prepare_upload(file)
+    except UploadError as e:
+        logger.warning("Arquivo rejeitado: %s", e)
         return ""
+
+    return extract_text(upload.stream, upload.kind, upload.encoding)
+
+
+async def extract_message_async(upload: PreparedUpload) -> MailMessage:
+    """
+    Executa `extract_message` no thread pool para não bloquear o event loop.
+    """
+    return await run_in_threadpool(extract_message, upload.stream, upload.kind, upload.encoding)
@@ -0,0 +1,631 @@
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import (
+    JOBS_CHUNK_SIZE,
+    JOBS_EXTRACT_PROCESSES,
+    JOBS_LEASE_SECONDS,
+    JOBS_LLM_CONCURRENCY,
+    JOBS_PRUNE_INTERVAL,
+    JOBS_QUEUE_SIZE,
+    JOBS_RETENTION_SECONDS,
+    JOBS_SPOOL_DIR,
+    JOBS_WORKERS,
+)
+from app.resources import get_resources
+from app.services.ai_service import bulk_mail_result
+from app.services.batch_service import classify_batch
+from app.services.file_service import extract_message_from_path
+from app.services.mail_service import iter_mbox_messages
+from app.services.tenant_service import BULK, tenant_context
+from app.utils.email_cleaner import collapse_thread
+
+logger = logging.getLogger(__name__)
+
+# Prioridade informada na API -> posição na fila (menor sai primeiro)
+JOB_PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """A fila de jobs está cheia: o cliente deve tentar de novo mais tarde."""
+
+
+class JobLeaseLost(Exception):
+    """A posse do job venceu e ele voltou para a fila (ou está com outro worker)."""
+
+
+class JobItem:
+    """
+    Email de um job: texto já disponível ou arquivo salvo aguardando extração.
+    """
+
+    def __init__(self, item_id: str, text: Optional[str] = None, file_path: Optional[str] = None,
+                 kind: Optional[str] = None, encoding: Optional[str] = None):
+        self.item_id = item_id
+        self.text = text
+        self.file_path = file_path
+        self.kind = kind
+        self.encoding = encoding
+
+
+class JobStore:
+    """
+    Persistência dos jobs e de seus resultados em SQLite (WAL).
+
+    Os resultados são gravados em blocos à medida que ficam prontos, então um
+    job interrompido por um restart continua de onde parou.
+
+    Um job em execução pertence a um dono (`JobManager.owner`) até
+    `lease_until`; o dono renova a posse enquanto está vivo (`renew`) e, se
+    ela vencer, o job volta para a fila (`requeue_expired`). O pid não serve
+    para isso: depois de um restart do contêiner, os workers costumam
+    receber os mesmos pids.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                total INTEGER NOT NULL,
+                processed INTEGER NOT NULL DEFAULT 0,
+                owner INTEGER,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                item_id TEXT NOT NULL,
+                text TEXT,
+                file_path TEXT,
+                kind TEXT,
+                encoding TEXT,
+                result TEXT,
+                PRIMARY KEY (job_id, position)
+            );
+            """
+        )
+        # Bancos criados antes dos tenants
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "tenant" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN tenant TEXT")
+        # Bancos criados antes da posse com prazo: jobs sem prazo contam como vencidos
+        if "lease_until" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+        return conn
+
+    def create(self, job_id: str, priority: int, items: list, tenant: Optional[str] = None) -> None:
+        rows = [
+            (job_id, position, item.item_id, item.text, item.file_path, item.kind, item.encoding)
+            for position, item in enumerate(items)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO job_items (job_id, position, item_id, text, file_path, kind, encoding) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute(
+                    "INSERT INTO jobs (id, status, priority, total, tenant, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, QUEUED, priority, len(items), tenant, time.time()),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, job_id: str, owner: str, lease_seconds: float = JOBS_LEASE_SECONDS) -> bool:
+        """
+        Marca o job como em execução por `owner`, se ainda estiver na fila.
+        Com vários workers do uvicorn, só um deles consegue o job.
+        """
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, lease_until = ?, started_at = COALESCE(started_at, ?) "
+                "WHERE id = ? AND status = ?",
+                (RUNNING, owner, now + lease_seconds, now, job_id, QUEUED),
+            )
+            return cur.rowcount == 1
+
+    def renew(self, owner: str, lease_seconds: float = JOBS_LEASE_SECONDS) -> int:
+        """
+        Renova a posse dos jobs em execução por `owner`.
+
+        Returns:
+            int: Jobs renovados
+        """
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE status = ? AND owner = ?",
+                (time.time() + lease_seconds, RUNNING, owner),
+            )
+            return cur.rowcount
+
+    def release(self, owner: str) -> int:
+        """
+        Devolve à fila os jobs em execução por `owner` (encerramento do worker).
+
+        Returns:
+            int: Jobs devolvidos
+        """
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL WHERE status = ? AND owner = ?",
+                (QUEUED, RUNNING, owner),
+            )
+            return cur.rowcount
+
+    def requeue_expired(self) -> list:
+        """
+        Devolve à fila os jobs em execução cuja posse venceu (dono morto ou travado).
+
+        Returns:
+            list: Tuplas (id, prioridade) dos jobs devolvidos, em ordem de criação
+        """
+        now = time.time()
+        requeued = []
+        with self._lock:
+            for job_id, priority in self._conn.execute(
+                "SELECT id, priority FROM jobs WHERE status = ? AND (lease_until IS NULL OR lease_until < ?) "
+                "ORDER BY created_at",
+                (RUNNING, now),
+            ).fetchall():
+                # Outro worker pode ter devolvido e reivindicado o job entre as duas consultas
+                cur = self._conn.execute(
+                    "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL "
+                    "WHERE id = ? AND status = ? AND (lease_until IS NULL OR lease_until < ?)",
+                    (QUEUED, job_id, RUNNING, now),
+                )
+                if cur.rowcount == 1:
+                    requeued.append((job_id, priority))
+        if requeued:
+            logger.warning("%s jobs com a posse vencida voltaram para a fila", len(requeued))
+        return requeued
+
+    def pending_items(self, job_id: str) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position, item_id, text, file_path, kind, encoding FROM job_items "
+                "WHERE job_id = ? AND result IS NULL ORDER BY position",
+                (job_id,),
+            ).fetchall()
+        return [(row[0], JobItem(*row[1:])) for row in rows]
+
+    def save_results(self, job_id: str, owner: str, results: list) -> None:
+        """
+        Grava os resultados de um bloco de emails e avança o progresso.
+
+        Args:
+            owner (str): Dono do job (ver `claim`)
+            results (list): Tuplas (posição, resultado)
+
+        Raises:
+            JobLeaseLost: Se o job não estiver mais em execução por `owner`
+        """
+        rows = [(json.dumps(result, ensure_ascii=False), job_id, position) for position, result in results]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cur = self._conn.execute(
+                    "UPDATE jobs SET processed = processed + ? WHERE id = ? AND status = ? AND owner = ?",
+                    (len(results), job_id, RUNNING, owner),
+                )
+                if cur.rowcount != 1:
+                    raise JobLeaseLost(f"Job {job_id} não está mais em execução por este worker")
+                self._conn.executemany(
+                    "UPDATE job_items SET result = ?, text = NULL WHERE job_id = ? AND position = ?", rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None, owner: Optional[str] = None) -> bool:
+        """
+        Marca o job como terminado. Com `owner`, só se ainda estiver em execução por ele.
+
+        Returns:
+            bool: Se o job foi marcado
+        """
+        query = "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?"
+        params = (status, error, time.time(), job_id)
+        if owner is not None:
+            query += " AND status = ? AND owner = ?"
+            params += (RUNNING, owner)
+        with self._lock:
+            return self._conn.execute(query, params).rowcount == 1
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, priority, total, processed, error, tenant, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            job = dict(zip(
+                ("id", "status", "priority", "total", "processed", "error", "tenant",
+                 "created_at", "started_at", "finished_at"),
+                row,
+            ))
+            job["priority"] = next(name for name, value in JOB_PRIORITIES.items() if value == job["priority"])
+
+            job["resultados"] = None
+            if job["status"] == COMPLETED:
+                job["resultados"] = [
+                    {"id": item_id, **json.loads(result)}
+                    for item_id, result in self._conn.execute(
+                        "SELECT item_id, result FROM job_items WHERE job_id = ? ORDER BY position", (job_id,)
+                    )
+                ]
+        return job
+
+    def tenant(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT tenant FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def recover(self) -> list:
+        """
+        Devolve os jobs a (re)enfileirar na inicialização: os que estavam na fila
+        e os que estavam em execução com a posse vencida.
+
+        Returns:
+            list: Tuplas (id, prioridade) em ordem de criação
+        """
+        self.requeue_expired()
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, priority FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+
+    def prune(self, finished_before: float) -> list:
+        """
+        Apaga os jobs terminados (concluídos ou com falha) antes de
+        `finished_before` (time.time), com seus itens e resultados.
+
+        Returns:
+            list: IDs apagados, para remover também o spool
+        """
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (COMPLETED, FAILED, finished_before),
+            ).fetchall()]
+            if not ids:
+                return ids
+
+            self._conn.execute("BEGIN")
+            try:
+                for offset in range(0, len(ids), 500):
+                    batch = ids[offset:offset + 500]
+                    marks = ",".join("?" * len(batch))
+                    self._conn.execute(f"DELETE FROM job_items WHERE job_id IN ({marks})", batch)
+                    self._conn.execute(f"DELETE FROM jobs WHERE id IN ({marks})", batch)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobManager:
+    """
+    Fila de jobs em processo, sem broker externo.
+
+    - Fila limitada por prioridade (`JOBS_QUEUE_SIZE`): cheia, novos jobs são
+      recusados (`JobQueueFull`) em vez de acumular memória.
+    - `JOBS_WORKERS` tarefas asyncio consomem a fila e chamam a OpenAI com
+      concorrência própria (`JOBS_LLM_CONCURRENCY`), separada das rotas
+      interativas.
+    - A extração de PDF e .eml roda em um pool de processos, fora do event loop e do GIL.
+    - Estado e resultados ficam no SQLite (`JobStore`); as chamadas ao banco
+      rodam no thread pool, fora do event loop.
+    - Jobs terminados há mais de `JOBS_RETENTION_SECONDS` são apagados, com
+      resultados e spool, a cada `JOBS_PRUNE_INTERVAL` segundos.
+    - A posse dos jobs em execução é renovada a cada terço de
+      `JOBS_LEASE_SECONDS`; na mesma passada, jobs de outros workers com a
+      posse vencida voltam para a fila.
+    """
+
+    def __init__(self, store: JobStore):
+        self.store = store
+        # Único por processo e por inicialização, ao contrário do pid
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self.queue = None
+        self.completed = 0
+        self.failed = 0
+        self.pruned = 0
+        self.requeued = 0
+        self.lost = 0
+        self._workers = []
+        self._pruner_task = None
+        self._heartbeat_task = None
+        self._pool = None
+        self._sequence = itertools.count()
+
+    async def start(self) -> None:
+        # O limite é conferido em `submit`: jobs recuperados sempre voltam para a fila
+        self.queue = asyncio.PriorityQueue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(JOBS_WORKERS)]
+        if JOBS_RETENTION_SECONDS > 0:
+            self._pruner_task = asyncio.create_task(self._pruner())
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+        recovered = await run_in_threadpool(self.store.recover)
+        for job_id, priority in recovered:
+            self.queue.put_nowait((priority, next(self._sequence), job_id))
+        if recovered:
+            logger.info("%s jobs recuperados do SQLite", len(recovered))
+
+    async def stop(self) -> None:
+        tasks = self._workers + [task for task in (self._pruner_task, self._heartbeat_task) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._pruner_task = None
+        self._heartbeat_task = None
+
+        # Os jobs interrompidos voltam para a fila sem esperar a posse vencer
+        released = await run_in_threadpool(self.store.release, self.owner)
+        if released:
+            logger.info("%s jobs em execução devolvidos à fila", released)
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def accepting(self) -> bool:
+        return self.queue is not None and self.queue.qsize() < JOBS_QUEUE_SIZE
+
+    @staticmethod
+    def new_job_id() -> str:
+        return uuid.uuid4().hex
+
+    async def submit(self, job_id: str, items: list, priority: int, tenant: Optional[str] = None) -> None:
+        """
+        Registra um job e o coloca na fila.
+
+        Args:
+            job_id (str): ID gerado por `new_job_id` (usado também no spool de arquivos)
+            items (list): Lista de `JobItem`
+            priority (int): Valor de `JOB_PRIORITIES`
+            tenant (str): Tenant dono do job, a quem as chamadas à OpenAI são atribuídas
+
+        Raises:
+            JobQueueFull: Se a fila estiver cheia
+        """
+        if not self.accepting():
+            raise JobQueueFull("Fila de jobs cheia. Tente novamente em instantes.")
+
+        # Inserir milhares de itens leva alguns ms: fora do event loop
+        await run_in_threadpool(self.store.create, job_id, priority, items, tenant)
+        self.queue.put_nowait((priority, next(self._sequence), job_id))
+
+        logger.info("Job %s enfileirado: %s emails (prioridade %s)", job_id, len(items), priority)
+
+    def _extract_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: o processo da API tem threads (thread pool, SQLite) e fork não é seguro
+            self._pool = ProcessPoolExecutor(
+                max_workers=JOBS_EXTRACT_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def _item_input(self, item: JobItem) -> tuple:
+        """
+        Texto do email e, para .eml identificados pelo pré-filtro de
+        cabeçalhos, o resultado já definido.
+        """
+        if item.file_path is None:
+            # Arquivos têm a cadeia reduzida na extração; textos, aqui
+            return collapse_thread(item.text or "").strip(), None
+
+        loop = asyncio.get_running_loop()
+        message = await loop.run_in_executor(
+            self._extract_pool(), extract_message_from_path, item.file_path, item.kind, item.encoding
+        )
+        return message.text, bulk_mail_result(message.bulk_reason) if message.bulk_reason else None
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self.queue.get()
+            try:
+                if await run_in_threadpool(self.store.claim, job_id, self.owner):
+                    await self._run(job_id)
+            finally:
+                self.queue.task_done()
+
+    def prune(self) -> int:
+        """
+        Apaga os jobs terminados há mais de `JOBS_RETENTION_SECONDS` e o que
+        restar do spool deles.
+
+        Returns:
+            int: Jobs apagados
+        """
+        ids = self.store.prune(time.time() - JOBS_RETENTION_SECONDS)
+        for job_id in ids:
+            discard_spool(job_id)
+        self.pruned += len(ids)
+        if ids:
+            logger.info("%s jobs terminados apagados (retenção de %.0fs)", len(ids), JOBS_RETENTION_SECONDS)
+        return len(ids)
+
+    async def _pruner(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(self.prune)
+            except Exception as e:
+                logger.warning("Falha ao apagar jobs antigos: %s", e)
+            await asyncio.sleep(JOBS_PRUNE_INTERVAL)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(JOBS_LEASE_SECONDS / 3)
+            try:
+                await run_in_threadpool(self.store.renew, self.owner)
+                expired = await run_in_threadpool(self.store.requeue_expired)
+            except Exception as e:
+                logger.warning("Falha ao renovar a posse dos jobs: %s", e)
+                continue
+
+            for job_id, priority in expired:
+                self.queue.put_nowait((priority, next(self._sequence), job_id))
+            self.requeued += len(expired)
+
+    async def _run(self, job_id: str) -> None:
+        start = time.perf_counter()
+        try:
+            pending = await run_in_threadpool(self.store.pending_items, job_id)
+            tenant = get_resources().tenants.get(await run_in_threadpool(self.store.tenant, job_id))
+
+            for offset in range(0, len(pending), JOBS_CHUNK_SIZE):
+                chunk = pending[offset:offset + JOBS_CHUNK_SIZE]
+                inputs = await asyncio.gather(*(self._item_input(item) for _, item in chunk))
+                presets = {index: preset for index, (_, preset) in enumerate(inputs) if preset is not None}
+                # Chamadas bulk: cedem a vez às interativas e respeitam a cota do tenant
+                with tenant_context(tenant, BULK):
+                    results = await classify_batch(
+                        [text for text, _ in inputs], concurrency=JOBS_LLM_CONCURRENCY, presets=presets
+                    )
+                await run_in_threadpool(
+                    self.store.save_results, job_id, self.owner,
+                    [(position, result) for (position, _), result in zip(chunk, results)],
+                )
+
+        except asyncio.CancelledError:
+            # Encerramento: `stop` devolve o job à fila
+            raise
+
+        except JobLeaseLost as e:
+            # Outro worker continua o job: o spool fica com ele
+            logger.warning("%s", e)
+            self.lost += 1
+            return
+
+        except Exception as e:
+            logger.error("Job %s falhou: %s", job_id, e)
+            if not await run_in_threadpool(self.store.finish, job_id, FAILED, str(e), self.owner):
+                self.lost += 1
+                return
+            self.failed += 1
+
+        else:
+            if not await run_in_threadpool(self.store.finish, job_id, COMPLETED, None, self.owner):
+                logger.warning("Job %s não está mais em execução por este worker", job_id)
+                self.lost += 1
+                return
+            self.completed += 1
+            logger.info("Job %s concluído em %.1fs", job_id, time.perf_counter() - start)
+
+        await run_in_threadpool(discard_spool, job_id)
+
+    def stats(self) -> dict:
+        return {
+            "queued_in_memory": self.queue.qsize() if self.queue is not None else 0,
+            "queue_size": JOBS_QUEUE_SIZE,
+            "workers": len(self._workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "pruned": self.pruned,
+            "requeued": self.requeued,
+            "lost": self.lost,
+            "lease_seconds": JOBS_LEASE_SECONDS,
+            "retention_seconds": JOBS_RETENTION_SECONDS,
+            "jobs_by_status": self.store.counts(),
+        }
+
+
+def spool_upload(job_id: str, position: int, stream) -> str:
+    """
+    Copia o arquivo enviado para o spool do job, onde fica até ser extraído.
+
+    Returns:
+        str: Caminho do arquivo salvo
+    """
+    directory = os.path.join(JOBS_SPOOL_DIR, job_id)
+    os.makedirs(directory, exist_ok=True)
+
+    path = os.path.join(directory, str(position))
+    stream.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(stream, out)
+    return path
+
+
+def spool_mailbox(job_id: str, first_position: int, stream, max_messages: int) -> list:
+    """
+    Separa uma caixa .mbox em um arquivo por email no spool do job, lendo-a
+    em streaming (ver `iter_mbox_messages`).
+
+    Args:
+        first_position (int): Posição do primeiro email no job (nome do arquivo)
+        max_messages (int): Para de separar ao atingir esta quantidade
+
+    Returns:
+        list: Caminhos dos arquivos salvos, na ordem da caixa
+    """
+    directory = os.path.join(JOBS_SPOOL_DIR, job_id)
+    os.makedirs(directory, exist_ok=True)
+
+    paths = []
+    stream.seek(0)
+    for position, raw in enumerate(islice(iter_mbox_messages(stream), max_messages), first_position):
+        path = os.path.join(directory, str(position))
+        with open(path, "wb") as out:
+            out.write(raw)
+        paths.append(path)
+    return paths
+
+
+def discard_spool(job_id: str) -> None:
+    shutil.rmtree(os.path.join(JOBS_SPOOL_DIR, job_id), ignore_errors=True)
+
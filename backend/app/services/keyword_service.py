@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from app.config import KEYWORDS_PATH, KEYWORDS_RELOAD_INTERVAL, MAX_TEXT_LENGTH
+from app.resources import get_resources
+
+logger = logging.getLogger(__name__)
+
+# Sinais numéricos (valores monetários e datas)
+# Em vez de varrer o texto inteiro com cada regex, uma única varredura acha os
+# trechos numéricos e as regex de valor e data rodam só sobre eles
+NUMBER_SPAN_RE = re.compile(r'\d[\d/.,-]*')
+CURRENCY_RE = re.compile(r'r\$\s*\d')
+DECIMAL_RE = re.compile(r'\d[.,]\d')
+DATE_RE = re.compile(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}/\d{1,2}')
+
+
+class KeywordMatcher:
+    """
+    Contador de palavras-chave por categoria em uma única passada.
+
+    O texto é quebrado em palavras uma única vez por uma regex compilada e
+    cada palavra é consultada em um dicionário com todas as formas aceitas
+    (singular e plural simples, como "erros" e "servidores"). Isso evita
+    falsos positivos de substring ("api" dentro de "rapidamente"). Termos que
+    terminam em símbolo, como "r$", fazem parte do token. Expressões com mais
+    de uma palavra usam uma regex própria.
+
+    Args:
+        categories (dict): Mapa categoria -> lista de palavras-chave
+    """
+
+    TOKEN_RE = re.compile(r"\w+\$?")
+
+    def __init__(self, categories: dict):
+        self.categories = {name: [word.lower() for word in words] for name, words in categories.items()}
+
+        self._categories_by_word = {}
+        for name, words in self.categories.items():
+            for word in words:
+                self._categories_by_word.setdefault(word, []).append(name)
+
+        # Forma encontrada no texto -> palavra-chave canônica
+        self._forms = {}
+        phrases = []
+        for word in self._categories_by_word:
+            if " " in word:
+                phrases.append(word)
+            elif word[-1].isalnum():
+                for form in (word, word + "s", word + "es"):
+                    self._forms.setdefault(form, word)
+            else:
+                self._forms[word] = word
+
+        self._phrase_re = None
+        if phrases:
+            alternatives = "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True))
+            self._phrase_re = re.compile(rf"(?<!\w)({alternatives})(?!\w)")
+
+    def count(self, text_lower: str) -> dict:
+        """
+        Conta quantas palavras distintas de cada categoria aparecem no texto.
+
+        Args:
+            text_lower (str): Texto já em minúsculas
+
+        Returns:
+            dict: Mapa categoria -> quantidade de palavras encontradas
+        """
+        tokens = set(self.TOKEN_RE.findall(text_lower))
+        found = {self._forms[token] for token in tokens.intersection(self._forms)}
+
+        if self._phrase_re is not None:
+            found.update(self._phrase_re.findall(text_lower))
+
+        counts = dict.fromkeys(self.categories, 0)
+        for word in found:
+            for name in self._categories_by_word[word]:
+                counts[name] += 1
+        return counts
+
+
+def load_matcher(path: str = KEYWORDS_PATH) -> KeywordMatcher:
+    with open(path, encoding="utf-8") as f:
+        return KeywordMatcher(json.load(f))
+
+
+class MatcherHolder:
+    """
+    Mantém o matcher atual e o recarrega quando o arquivo de palavras-chave
+    muda (verificado no máximo a cada `KEYWORDS_RELOAD_INTERVAL` segundos).
+
+    Criado por `app.resources.open_resources`, no startup do worker.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.matcher = load_matcher(path)
+        self._mtime = os.path.getmtime(path)
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def get(self) -> KeywordMatcher:
+        now = time.monotonic()
+        if now - self._checked_at >= KEYWORDS_RELOAD_INTERVAL:
+            with self._lock:
+                if now - self._checked_at >= KEYWORDS_RELOAD_INTERVAL:
+                    self._checked_at = now
+                    self._reload_if_changed()
+        return self.matcher
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return
+            self.matcher = load_matcher(self.path)
+            self._mtime = mtime
+            logger.info(f"Palavras-chave recarregadas de {self.path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Falha ao recarregar palavras-chave, mantendo as atuais: {e}")
+
+
+def get_matcher() -> KeywordMatcher:
+    return get_resources().keywords.get()
+
+
+def numeric_signals(text_lower: str):
+    """
+    Detecta valores monetários e datas no texto.
+
+    Returns:
+        tuple: (tem_valor_monetario, tem_data)
+    """
+    tem_valor_monetario = "reais" in text_lower or CURRENCY_RE.search(text_lower) is not None
+    tem_data = False
+
+    for span in NUMBER_SPAN_RE.findall(text_lower):
+        if not tem_valor_monetario and DECIMAL_RE.search(span):
+            tem_valor_monetario = True
+        if not tem_data and DATE_RE.search(span):
+            tem_data = True
+        if tem_valor_monetario and tem_data:
+            break
+
+    return tem_valor_monetario, tem_data
+
+
+def score_text(text: str) -> dict:
+    """
+    Calcula os sinais usados nas regras de ajuste de confiança.
+
+    Analisa apenas o trecho enviado à IA (`MAX_TEXT_LENGTH`).
+
+    Returns:
+        dict: Contagens por categoria, "total", "tem_valor_monetario" e "tem_data"
+    """
+    texto_lower = text[:MAX_TEXT_LENGTH].lower()
+
+    scores = get_matcher().count(texto_lower)
+    scores["total"] = sum(scores.values())
+    scores["tem_valor_monetario"], scores["tem_data"] = numeric_signals(texto_lower)
+    return scores
@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import time
+
+import openai
+
+from app.clients import MissingAPIKeyError, get_async_client
+from app.config import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    LLM_BULK_SHARE,
+    LLM_MAX_CONCURRENCY,
+    OPENAI_MAX_ATTEMPTS,
+    OPENAI_RETRY_BASE_DELAY,
+    OPENAI_RETRY_MAX_DELAY,
+    OPENAI_RPM_LIMIT,
+    OPENAI_TIMEOUT,
+    OPENAI_TOTAL_DEADLINE,
+    OPENAI_TPM_LIMIT,
+)
+from app.services.tenant_service import BULK, FairScheduler, current_tenant
+from app.utils.resilience import (
+    AdaptiveRateLimiter,
+    CircuitBreaker,
+    RateLimitWaitTimeout,
+    backoff_delay,
+    parse_duration,
+)
+
+logger = logging.getLogger(__name__)
+
+# Falhas transitórias: vale a pena tentar de novo
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    asyncio.TimeoutError,
+)
+
+# Tokens reservados para a resposta quando `max_tokens` não é informado
+DEFAULT_COMPLETION_TOKENS = 400
+
+
+class LLMUnavailableError(Exception):
+    """
+    A OpenAI está indisponível para esta chamada: circuito aberto, limite de
+    taxa sem capacidade dentro do prazo ou tentativas esgotadas em falhas
+    transitórias. Quem chama deve cair para uma resposta local degradada.
+    """
+
+
+def estimate_tokens(messages: list, max_tokens: int = None) -> int:
+    """
+    Estimativa grosseira (4 caracteres por token) usada para reservar TPM.
+    """
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    return prompt_chars // 4 + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+class GatewayStream:
+    """
+    Resposta em streaming devolvida por `LLMGateway.create(stream=True)`.
+
+    A chamada só termina quando o corpo é lido até o fim: até lá a vaga do
+    escalonador continua ocupada e cada pedaço precisa chegar dentro do prazo
+    total. O uso de tokens do último pedaço (`stream_options.include_usage`)
+    vai para o limitador e para a cota do tenant ao final. Use com `async with`
+    para devolver a vaga mesmo se a leitura for interrompida.
+    """
+
+    def __init__(self, gateway: "LLMGateway", stream, slot, tenant, estimated: int, deadline: float):
+        self._gateway = gateway
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+        self._slot = slot
+        self._tenant = tenant
+        self._estimated = estimated
+        self._deadline = deadline
+        self._closed = False
+        self.usage = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+
+        try:
+            chunk = await asyncio.wait_for(
+                self._iterator.__anext__(), timeout=max(0.0, self._deadline - time.monotonic())
+            )
+        except StopAsyncIteration:
+            self._finish(success=True)
+            raise
+        except (asyncio.TimeoutError, openai.APITimeoutError, openai.APIConnectionError) as e:
+            # Eventos já podem ter sido enviados: não há nova tentativa no meio do corpo
+            if isinstance(e, (asyncio.TimeoutError, openai.APITimeoutError)):
+                self._gateway.timeouts += 1
+            self._gateway.unavailable += 1
+            self._finish(success=False)
+            raise LLMUnavailableError(f"{type(e).__name__} durante o streaming") from e
+        except BaseException:
+            self._finish(success=None)
+            raise
+
+        self.usage = getattr(chunk, "usage", None) or self.usage
+        return chunk
+
+    def _finish(self, success) -> None:
+        """
+        Devolve a vaga e registra o uso (uma única vez). `success` None: a
+        leitura foi interrompida por quem chamou, sem culpa da OpenAI.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._gateway.scheduler.release(self._slot)
+
+        self._gateway.limiter.record_usage(self._estimated, getattr(self.usage, "total_tokens", None))
+        self._tenant.record_usage(self._estimated, self.usage)
+        if success is True:
+            self._gateway.breaker.record_success()
+        elif success is False:
+            self._gateway.breaker.record_failure()
+        else:
+            self._gateway.breaker.release()
+
+    async def aclose(self) -> None:
+        if self._closed:
+            return
+        self._finish(success=None)
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            await close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+def _retry_after(error: Exception):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    milliseconds = response.headers.get("retry-after-ms")
+    if milliseconds:
+        try:
+            return float(milliseconds) / 1000
+        except ValueError:
+            pass
+    return parse_duration(response.headers.get("retry-after"))
+
+
+class LLMGateway:
+    """
+    Ponto único de chamadas de chat completion à OpenAI.
+
+    Aplica, nesta ordem: circuit breaker, escalonador justo entre tenants
+    (sobre o limitador adaptativo de RPM/TPM, ver `FairScheduler`), prazo por
+    tentativa (`OPENAI_TIMEOUT`), prazo total (`OPENAI_TOTAL_DEADLINE`) e novas
+    tentativas com espera exponencial e jitter para falhas transitórias.
+
+    O tenant e a prioridade vêm do contexto da requisição (`tenant_context`).
+    Chamadas bulk (jobs) esperam pela vez sem prazo: o prazo total só começa
+    a contar quando a primeira tentativa é liberada.
+    """
+
+    def __init__(self, client=None):
+        # Sem cliente explícito, usa o cliente compartilhado criado no startup
+        self._client = client
+        self.limiter = AdaptiveRateLimiter(OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT)
+        self.scheduler = FairScheduler(self.limiter, LLM_MAX_CONCURRENCY, LLM_BULK_SHARE)
+        self.breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.unavailable = 0
+
+    async def create(self, **kwargs):
+        """
+        Executa `chat.completions.create` com as proteções do gateway.
+
+        Args:
+            **kwargs: Parâmetros repassados à API (model, messages, ...)
+
+        Returns:
+            ChatCompletion: Resposta da OpenAI, ou `GatewayStream` com
+            `stream=True` (a vaga e o prazo valem até o fim da leitura)
+
+        Raises:
+            LLMUnavailableError: Quando a chamada não pôde ser concluída por
+                indisponibilidade (ver classe)
+            openai.APIStatusError: Erros não transitórios (ex.: 400, 401)
+        """
+        try:
+            client = self._client or get_async_client()
+        except MissingAPIKeyError as e:
+            self.unavailable += 1
+            raise LLMUnavailableError(str(e)) from e
+
+        tenant, priority = current_tenant()
+        estimated = estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+        deadline = None if priority == BULK else time.monotonic() + OPENAI_TOTAL_DEADLINE
+        attempt = 0
+
+        while True:
+            if not self.breaker.allow():
+                self.unavailable += 1
+                raise LLMUnavailableError("Circuito aberto: OpenAI indisponível no momento")
+
+            try:
+                slot = await self.scheduler.acquire(tenant, priority, estimated, deadline)
+            except RateLimitWaitTimeout as e:
+                self.breaker.release()  # Nada foi enviado; libera a sonda do meio-aberto
+                self.unavailable += 1
+                raise LLMUnavailableError(str(e)) from e
+
+            if deadline is None:
+                deadline = time.monotonic() + OPENAI_TOTAL_DEADLINE
+            timeout = min(OPENAI_TIMEOUT, max(0.0, deadline - time.monotonic()))
+            self.calls += 1
+
+            try:
+                streaming = False
+                try:
+                    raw = await asyncio.wait_for(
+                        client.chat.completions.with_raw_response.create(**kwargs),
+                        timeout=timeout,
+                    )
+                    self.limiter.update_from_headers(raw.headers)
+                    completion = raw.parse()
+                    # Em streaming a resposta só chegou até os cabeçalhos: a vaga
+                    # passa para o `GatewayStream`, que a devolve no fim do corpo
+                    streaming = bool(kwargs.get("stream"))
+                finally:
+                    # A vaga vale só para a ida e volta, não para a espera entre tentativas
+                    if not streaming:
+                        self.scheduler.release(slot)
+
+                if streaming:
+                    return GatewayStream(self, completion, slot, tenant, estimated, deadline)
+
+                usage = getattr(completion, "usage", None)
+                self.limiter.record_usage(estimated, getattr(usage, "total_tokens", None))
+                tenant.record_usage(estimated, usage)
+                self.breaker.record_success()
+                return completion
+
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, openai.RateLimitError):
+                    # 429 não é indisponibilidade: o limitador segura as próximas chamadas
+                    self.breaker.record_success()
+                    self.rate_limited += 1
+                    self.limiter.penalize(_retry_after(e))
+                else:
+                    self.breaker.record_failure()
+                    if isinstance(e, (asyncio.TimeoutError, openai.APITimeoutError)):
+                        self.timeouts += 1
+
+                attempt += 1
+                delay = max(backoff_delay(attempt, OPENAI_RETRY_BASE_DELAY, OPENAI_RETRY_MAX_DELAY), _retry_after(e) or 0.0)
+
+                if attempt >= OPENAI_MAX_ATTEMPTS or time.monotonic() + delay >= deadline:
+                    self.unavailable += 1
+                    logger.warning("OpenAI indisponível após %s tentativa(s): %s", attempt, type(e).__name__)
+                    raise LLMUnavailableError(f"{type(e).__name__} após {attempt} tentativa(s)") from e
+
+                self.retries += 1
+                logger.info("Falha transitória na OpenAI (%s), nova tentativa em %.2fs", type(e).__name__, delay)
+                await asyncio.sleep(delay)
+
+            except openai.APIStatusError:
+                # A API respondeu: o serviço está no ar, o erro é da requisição
+                self.breaker.record_success()
+                raise
+
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "timeouts": self.timeouts,
+            "unavailable": self.unavailable,
+            "circuit": self.breaker.stats(),
+            "rate_limiter": self.limiter.stats(),
+            "scheduler": self.scheduler.stats(),
+        }
+
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,259 @@
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from app.config import LOCAL_MODEL_PATH, LOCAL_MODEL_THRESHOLD, MAX_TEXT_LENGTH
+from app.metrics import LOCAL_MODEL_DECISIONS
+from app.resources import get_resources
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+DEFAULT_N_FEATURES = 2 ** 18
+
+LABELS = ("Improdutivo", "Produtivo")
+
+
+def extract_features(text: str, n_features: int):
+    """
+    Converte o texto em índices e contagens de features por hashing.
+
+    Usa unigramas e bigramas do texto truncado; o índice de cada termo é o
+    CRC32 módulo `n_features` (potência de 2), estável entre processos.
+
+    Returns:
+        tuple: (índices únicos, contagens) como arrays NumPy
+    """
+    tokens = TOKEN_RE.findall(text[:MAX_TEXT_LENGTH].lower())
+    terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if not terms:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    mask = n_features - 1
+    hashes = np.fromiter((zlib.crc32(term.encode("utf-8")) & mask for term in terms), dtype=np.int64, count=len(terms))
+    indices, counts = np.unique(hashes, return_counts=True)
+    return indices, counts.astype(np.float32)
+
+
+def _tfidf(indices, counts, idf):
+    """
+    TF sublinear * IDF, normalizado por L2.
+    """
+    values = (1.0 + np.log(counts)) * idf[indices]
+    norm = np.sqrt(np.dot(values, values))
+    if norm > 0:
+        values /= norm
+    return values
+
+
+class LocalClassifier:
+    """
+    Classificador linear local (hashing TF-IDF + regressão logística).
+
+    Treinado a partir de veredictos da IA, responde sem rede quando a
+    probabilidade da classe prevista passa de `threshold`.
+    """
+
+    def __init__(self, weights, bias: float, idf, threshold: float = LOCAL_MODEL_THRESHOLD):
+        self.weights = weights.astype(np.float32)
+        self.bias = float(bias)
+        self.idf = idf.astype(np.float32)
+        self.n_features = len(weights)
+        self.threshold = threshold
+
+    def predict_proba(self, text: str) -> float:
+        """
+        Probabilidade do email ser Produtivo.
+        """
+        indices, counts = extract_features(text, self.n_features)
+        if not len(indices):
+            return 0.5
+
+        values = _tfidf(indices, counts, self.idf)
+        score = float(np.dot(self.weights[indices], values)) + self.bias
+        return float(1.0 / (1.0 + np.exp(-score)))
+
+    def predict_proba_batch(self, texts: list):
+        """
+        `predict_proba` de vários emails de uma vez: as features do lote
+        formam uma matriz esparsa (CSR) e o produto é feito em NumPy.
+
+        Returns:
+            np.ndarray: Probabilidade de cada email ser Produtivo
+        """
+        docs = [extract_features(text, self.n_features) for text in texts]
+        lengths = np.array([len(indices) for indices, _ in docs], dtype=np.int64)
+        proba = np.full(len(docs), 0.5, dtype=np.float32)
+        if not lengths.sum():
+            return proba
+
+        col = np.concatenate([indices for indices, _ in docs])
+        counts = np.concatenate([counts for _, counts in docs])
+        row = np.repeat(np.arange(len(docs)), lengths)
+
+        # TF-IDF normalizado por linha, como em `_tfidf`
+        values = (1.0 + np.log(counts)) * self.idf[col]
+        norms = np.sqrt(np.bincount(row, weights=values * values, minlength=len(docs)))
+        values /= np.where(norms > 0, norms, 1.0)[row]
+
+        scores = np.bincount(row, weights=self.weights[col] * values, minlength=len(docs)) + self.bias
+        has_terms = lengths > 0
+        proba[has_terms] = 1.0 / (1.0 + np.exp(-scores[has_terms]))
+        return proba
+
+    def predict(self, text: str):
+        """
+        Retorna (categoria, probabilidade da categoria prevista).
+        """
+        proba = self.predict_proba(text)
+        if proba >= 0.5:
+            return LABELS[1], proba
+        return LABELS[0], 1.0 - proba
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(path, weights=self.weights, bias=np.array([self.bias]), idf=self.idf)
+
+    @classmethod
+    def load(cls, path: str, threshold: float = LOCAL_MODEL_THRESHOLD) -> "LocalClassifier":
+        with np.load(path) as data:
+            return cls(data["weights"], float(data["bias"][0]), data["idf"], threshold)
+
+    @classmethod
+    def train(cls, texts: list, labels: list, n_features: int = DEFAULT_N_FEATURES,
+              epochs: int = 300, learning_rate: float = 5.0, l2: float = 1e-4) -> "LocalClassifier":
+        """
+        Treina por gradiente descendente em lote completo sobre matriz esparsa (CSR).
+
+        Args:
+            texts (list): Textos dos emails
+            labels (list): Categorias ("Produtivo" ou "Improdutivo")
+
+        Returns:
+            LocalClassifier: Modelo treinado
+        """
+        docs = [extract_features(text, n_features) for text in texts]
+        keep = [i for i, (indices, _) in enumerate(docs) if len(indices)]
+        docs = [docs[i] for i in keep]
+        y = np.array([1.0 if labels[i] == LABELS[1] else 0.0 for i in keep], dtype=np.float32)
+
+        if not docs:
+            raise ValueError("Nenhum exemplo com texto para treinar")
+
+        # IDF suavizado
+        df = np.zeros(n_features, dtype=np.float32)
+        for indices, _ in docs:
+            df[indices] += 1
+        idf = (np.log((1.0 + len(docs)) / (1.0 + df)) + 1.0).astype(np.float32)
+
+        lengths = np.array([len(indices) for indices, _ in docs])
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        col = np.concatenate([indices for indices, _ in docs])
+        data = np.concatenate([_tfidf(indices, counts, idf) for indices, counts in docs]).astype(np.float32)
+        row = np.repeat(np.arange(len(docs)), lengths)
+
+        weights = np.zeros(n_features, dtype=np.float32)
+        bias = 0.0
+        n = float(len(docs))
+
+        for _ in range(epochs):
+            scores = np.add.reduceat(weights[col] * data, indptr[:-1]) + bias
+            error = (1.0 / (1.0 + np.exp(-scores))) - y
+
+            grad = np.zeros(n_features, dtype=np.float32)
+            np.add.at(grad, col, data * error[row])
+            weights -= learning_rate * (grad / n + l2 * weights)
+            bias -= learning_rate * float(error.mean())
+
+        return cls(weights, bias, idf)
+
+
+class LocalClassifierStats:
+    """
+    Contadores do caminho rápido local.
+    """
+
+    def __init__(self):
+        self.answered = 0
+        self.deferred = 0
+        self.total_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, answered: bool, seconds: float) -> None:
+        with self._lock:
+            if answered:
+                self.answered += 1
+            else:
+                self.deferred += 1
+            self.total_seconds += seconds
+
+    def as_dict(self, model: Optional["LocalClassifier"] = None) -> dict:
+        total = self.answered + self.deferred
+        return {
+            "loaded": model is not None,
+            "threshold": model.threshold if model is not None else LOCAL_MODEL_THRESHOLD,
+            "answered_locally": self.answered,
+            "sent_to_llm": self.deferred,
+            "avoided_rate": round(self.answered / total, 4) if total else 0.0,
+            "avg_latency_us": round(self.total_seconds / total * 1e6, 1) if total else 0.0,
+        }
+
+
+def load_local_classifier() -> Optional[LocalClassifier]:
+    """
+    Carrega o modelo serializado em `LOCAL_MODEL_PATH`, se existir. Chamado
+    por `app.resources.open_resources`, no startup do worker.
+    """
+    if not LOCAL_MODEL_PATH:
+        return None
+
+    if not os.path.exists(LOCAL_MODEL_PATH):
+        logger.info(f"Modelo local não encontrado em {LOCAL_MODEL_PATH} - caminho rápido desabilitado")
+        return None
+
+    model = LocalClassifier.load(LOCAL_MODEL_PATH)
+    logger.info(f"Modelo local carregado: {LOCAL_MODEL_PATH} (limiar {LOCAL_MODEL_THRESHOLD})")
+    return model
+
+
+def classify_locally(text: str) -> Optional[dict]:
+    """
+    Tenta classificar o email sem chamar a IA.
+
+    Returns:
+        dict: Resultado completo, ou None se o modelo não estiver carregado
+        ou a confiança ficar abaixo do limiar
+    """
+    local_classifier = get_resources().local_classifier
+    if local_classifier is None:
+        return None
+
+    start = time.perf_counter()
+    categoria, proba = local_classifier.predict(text)
+    answered = proba >= local_classifier.threshold
+    stats.record(answered, time.perf_counter() - start)
+    LOCAL_MODEL_DECISIONS.labels("answered" if answered else "deferred").inc()
+
+    if not answered:
+        return None
+
+    if categoria == "Produtivo":
+        resposta = "Olá! Recebemos sua mensagem e ela será encaminhada à equipe responsável. Retornaremos em breve."
+    else:
+        resposta = "Nenhuma ação necessária."
+
+    return {
+        "categoria": categoria,
+        "confianca": int(round(proba * 100)),
+        "razao": "Classificação feita pelo modelo local com alta confiança, sem consulta à IA.",
+        "resposta_sugerida": resposta
+    }
+
+
+stats = LocalClassifierStats()
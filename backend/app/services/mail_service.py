@@ -0,0 +1,214 @@
+import html
+import logging
+import re
+from email import policy
+from email.header import decode_header, make_header
+from email.parser import BytesParser
+from email.utils import parseaddr
+from functools import partial
+from typing import Iterator, Optional
+
+from app.config import MAIL_BULK_SENDER_DOMAINS, MAIL_MAX_MESSAGE_BYTES, MAIL_PREFILTER, MAX_EXTRACT_CHARS, THREAD_RAW_FACTOR
+from app.metrics import ERRORS
+from app.utils.email_cleaner import collapse_thread
+
+logger = logging.getLogger(__name__)
+
+# Linhas maiores são lidas em pedaços, sem carregar a linha inteira
+_MAX_LINE_BYTES = 64 * 1024
+
+# mboxrd: ">From " (com qualquer quantidade de ">") no corpo é um "From " escapado
+_ESCAPED_FROM_RE = re.compile(rb"^>+From ")
+
+_HTML_DROP_RE = re.compile(r"<(script|style|head)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_HTML_BREAK_RE = re.compile(r"<(?:br|/p|/div|/tr|/li|/h[1-6])\b[^>]*>", re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+# compat32: sem os objetos de cabeçalho do `policy.default`, que dominam o
+# tempo de leitura de caixas grandes; charsets e MIME são tratados aqui
+_parser = BytesParser(policy=policy.compat32)
+
+
+class MailMessage:
+    """
+    Email lido de um .eml ou de uma caixa .mbox: o texto a classificar
+    (assunto e corpo) e, se os cabeçalhos indicarem envio em massa ou
+    automático, o motivo para classificá-lo sem a IA.
+    """
+
+    def __init__(self, text: str, bulk_reason: Optional[str] = None):
+        self.text = text
+        self.bulk_reason = bulk_reason
+
+
+def iter_mbox_messages(stream, max_bytes: int = MAIL_MAX_MESSAGE_BYTES) -> Iterator[bytes]:
+    """
+    Separa uma caixa .mbox em mensagens, uma de cada vez.
+
+    Lê o arquivo linha a linha (linhas longas em pedaços de `_MAX_LINE_BYTES`)
+    e guarda só a mensagem atual, cortada em `max_bytes`: a memória não
+    depende do tamanho da caixa. Uma mensagem começa em cada linha "From "
+    no início do arquivo ou após uma linha em branco; ">From " no corpo é
+    desfeito (mboxrd).
+    """
+    message = None
+    size = 0
+    at_line_start = True
+    previous_blank = True
+    in_envelope = False
+
+    for line in iter(partial(stream.readline, _MAX_LINE_BYTES), b""):
+        starts_line = at_line_start
+        at_line_start = line.endswith(b"\n")
+
+        if in_envelope:
+            # Restante de uma linha "From " longa
+            in_envelope = not at_line_start
+            continue
+
+        if starts_line and previous_blank and line.startswith(b"From "):
+            if message is not None:
+                yield _join_message(message)
+            message = []
+            size = 0
+            in_envelope = not at_line_start
+            previous_blank = False
+            continue
+
+        previous_blank = starts_line and line.strip() == b""
+        if message is None or size >= max_bytes:
+            continue
+
+        if starts_line and _ESCAPED_FROM_RE.match(line):
+            line = line[1:]
+        message.append(line[:max_bytes - size])
+        size += len(message[-1])
+
+    if message is not None:
+        yield _join_message(message)
+
+
+def _join_message(lines: list) -> bytes:
+    # A linha em branco antes do próximo "From " é o separador, não faz parte da mensagem
+    raw = b"".join(lines)
+    if raw.endswith(b"\r\n\r\n"):
+        return raw[:-2]
+    if raw.endswith(b"\n\n"):
+        return raw[:-1]
+    return raw
+
+
+def _html_to_text(content: str) -> str:
+    content = _HTML_DROP_RE.sub(" ", content)
+    content = _HTML_BREAK_RE.sub("\n", content)
+    return html.unescape(_HTML_TAG_RE.sub(" ", content))
+
+
+def _decode_part(part) -> str:
+    payload = part.get_payload(decode=True) or b""
+    try:
+        return payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+    except LookupError:
+        # Charset desconhecido
+        return payload.decode("utf-8", errors="replace")
+
+
+def _body_text(message) -> str:
+    """
+    Corpo em texto: a primeira parte text/plain ou, sem ela, a text/html sem
+    as tags. Anexos são ignorados.
+    """
+    html_part = None
+    for part in message.walk():
+        if part.is_multipart() or part.get_content_maintype() != "text":
+            continue
+        if str(part.get("Content-Disposition", "")).lower().startswith("attachment"):
+            continue
+
+        subtype = part.get_content_subtype()
+        if subtype == "plain":
+            return _decode_part(part)
+        if subtype == "html" and html_part is None:
+            html_part = part
+
+    return _html_to_text(_decode_part(html_part)) if html_part is not None else ""
+
+
+def _header_text(value) -> str:
+    """
+    Valor do cabeçalho com as palavras codificadas (RFC 2047) decodificadas.
+    """
+    if value is None:
+        return ""
+    try:
+        return str(make_header(decode_header(str(value))))
+    except (LookupError, UnicodeError, ValueError):
+        return str(value)
+
+
+def _domain(address: str) -> str:
+    return parseaddr(address)[1].rpartition("@")[2].lower()
+
+
+def bulk_mail_reason(message) -> Optional[str]:
+    """
+    Pré-filtro de cabeçalhos: identifica emails em massa ou automáticos.
+
+    Returns:
+        str: Motivo (cabeçalho que o identificou) ou None se nada indicar envio em massa
+    """
+    if message.get("List-Unsubscribe") or message.get("List-Id"):
+        return "lista de distribuição (List-Unsubscribe/List-Id)"
+
+    auto_submitted = str(message.get("Auto-Submitted", "")).strip().lower()
+    if auto_submitted and auto_submitted != "no":
+        return f"mensagem automática (Auto-Submitted: {auto_submitted})"
+
+    precedence = str(message.get("Precedence", "")).strip().lower()
+    if precedence in ("bulk", "list", "junk"):
+        return f"envio em massa (Precedence: {precedence})"
+
+    for header in ("From", "Sender", "Return-Path"):
+        domain = _domain(_header_text(message.get(header)))
+        if domain and any(domain == bulk or domain.endswith("." + bulk) for bulk in MAIL_BULK_SENDER_DOMAINS):
+            return f"remetente de envio em massa ({domain})"
+
+    return None
+
+
+def parse_email(raw: bytes, max_chars: int = MAX_EXTRACT_CHARS) -> MailMessage:
+    """
+    Interpreta uma mensagem RFC 822 (cabeçalhos, MIME, charsets).
+
+    Args:
+        raw (bytes): Mensagem (já limitada a `MAIL_MAX_MESSAGE_BYTES`)
+        max_chars (int): Limite de caracteres do texto extraído
+
+    Returns:
+        MailMessage: Assunto e corpo (cadeia reduzida, ver `collapse_thread`) e o
+        motivo do pré-filtro, se `MAIL_PREFILTER` estiver ativo
+    """
+    try:
+        message = _parser.parsebytes(raw)
+        subject = " ".join(_header_text(message.get("Subject")).split())
+        body = _body_text(message)
+        reason = bulk_mail_reason(message) if MAIL_PREFILTER else None
+
+    except Exception as e:
+        logger.error("Erro ao interpretar email: %s", e)
+        ERRORS.labels("extract_text").inc()
+        return MailMessage("")
+
+    text = collapse_thread(body[:max_chars * THREAD_RAW_FACTOR])
+    if subject:
+        text = f"Assunto: {subject}\n\n{text}"
+    return MailMessage(text[:max_chars].strip(), reason)
+
+
+def iter_mailbox(stream) -> Iterator[MailMessage]:
+    """
+    Gera as mensagens de uma caixa .mbox já interpretadas, uma de cada vez.
+    """
+    stream.seek(0)
+    for raw in iter_mbox_messages(stream):
+        yield parse_email(raw)
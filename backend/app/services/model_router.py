@@ -0,0 +1,181 @@
+import logging
+import threading
+from typing import Optional
+
+from app.config import (
+    OPENAI_MODEL,
+    ROUTING_ESCALATE_CATEGORIES,
+    ROUTING_ESCALATION_THRESHOLD,
+    ROUTING_MODE,
+    ROUTING_REPLY_MODEL,
+    ROUTING_TRIAGE_MAX_TOKENS,
+    ROUTING_TRIAGE_MODEL,
+)
+from app.metrics import ESCALATIONS, TIER_SECONDS, TIER_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# Níveis do roteamento
+SINGLE_TIER = "single"    # ROUTING_MODE=single: uma chamada com o JSON completo
+TRIAGE_TIER = "triage"    # só categoria e confiança, com poucos tokens de saída
+REPLY_TIER = "reply"      # razão e resposta sugerida, apenas para os escalados
+
+TIER_MODELS = {
+    SINGLE_TIER: OPENAI_MODEL,
+    TRIAGE_TIER: ROUTING_TRIAGE_MODEL,
+    REPLY_TIER: ROUTING_REPLY_MODEL,
+}
+
+tiered_routing = ROUTING_MODE == "tiered"
+
+if ROUTING_MODE not in ("tiered", "single"):
+    logger.warning("ROUTING_MODE desconhecido (%s), usando chamada única", ROUTING_MODE)
+
+
+def triage_max_tokens(emails: int = 1) -> int:
+    """
+    Limite de saída da triagem: `ROUTING_TRIAGE_MAX_TOKENS` por email, mais a
+    estrutura do JSON em lote.
+    """
+    if emails == 1:
+        return ROUTING_TRIAGE_MAX_TOKENS
+    return ROUTING_TRIAGE_MAX_TOKENS * emails + 10
+
+
+def escalation_reason(triage: Optional[dict]) -> Optional[str]:
+    """
+    Decide se a triagem basta ou se o email precisa do nível de resposta.
+
+    Args:
+        triage (dict): JSON devolvido pela triagem (ou None se ausente)
+
+    Returns:
+        str: Motivo da escalada ("invalid_triage", "categoria" ou
+        "low_confidence"), ou None se a triagem já é a resposta final
+    """
+    if not isinstance(triage, dict) or triage.get("categoria") not in ("Produtivo", "Improdutivo"):
+        return "invalid_triage"
+
+    try:
+        confianca = int(triage.get("confianca", 0))
+    except (TypeError, ValueError):
+        return "invalid_triage"
+
+    if triage["categoria"] in ROUTING_ESCALATE_CATEGORIES:
+        return "categoria"
+
+    if confianca < ROUTING_ESCALATION_THRESHOLD:
+        return "low_confidence"
+    return None
+
+
+class RoutingStats:
+    """
+    Tokens e latência por nível do roteamento, por email classificado.
+
+    A economia é estimada comparando o custo real (triagem de todos mais a
+    resposta dos escalados) com o de mandar todos os emails para uma chamada
+    completa, usando a média observada do tier "single" ou, sem ela, do
+    tier "reply" (mesmo prompt completo, com a dica da triagem).
+    """
+
+    def __init__(self):
+        self.tiers = {
+            tier: {"calls": 0, "emails": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0}
+            for tier in TIER_MODELS
+        }
+        self.routed = 0
+        self.reasons = {}
+        self._lock = threading.Lock()
+
+    def record_call(self, tier: str, usage, seconds: float, emails: int = 1) -> None:
+        """
+        Registra uma chamada à OpenAI de um nível (`usage` como em `response.usage`).
+        """
+        prompt_tokens = (getattr(usage, "prompt_tokens", 0) or 0) if usage is not None else 0
+        completion_tokens = (getattr(usage, "completion_tokens", 0) or 0) if usage is not None else 0
+
+        TIER_SECONDS.labels(tier).observe(seconds)
+        TIER_TOKENS.labels(tier, "prompt").inc(prompt_tokens)
+        TIER_TOKENS.labels(tier, "completion").inc(completion_tokens)
+
+        with self._lock:
+            counters = self.tiers[tier]
+            counters["calls"] += 1
+            counters["emails"] += emails
+            counters["prompt_tokens"] += prompt_tokens
+            counters["completion_tokens"] += completion_tokens
+            counters["seconds"] += seconds
+
+    def record_route(self, reason: Optional[str]) -> None:
+        """
+        Registra a decisão da triagem para um email.
+        """
+        if reason is not None:
+            ESCALATIONS.labels(reason).inc()
+
+        with self._lock:
+            self.routed += 1
+            if reason is not None:
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    @staticmethod
+    def _tier_summary(counters: dict) -> dict:
+        emails = counters["emails"]
+        tokens = counters["prompt_tokens"] + counters["completion_tokens"]
+        return {
+            "calls": counters["calls"],
+            "emails": emails,
+            "prompt_tokens": counters["prompt_tokens"],
+            "completion_tokens": counters["completion_tokens"],
+            "avg_tokens_per_email": round(tokens / emails, 1) if emails else 0.0,
+            "avg_latency_ms": round(counters["seconds"] / counters["calls"] * 1000, 1) if counters["calls"] else 0.0,
+        }
+
+    def _estimated_savings(self) -> dict:
+        baseline_tier = SINGLE_TIER if self.tiers[SINGLE_TIER]["emails"] else REPLY_TIER
+        baseline = self.tiers[baseline_tier]
+        if not self.routed or not baseline["emails"]:
+            return {}
+
+        triage = self.tiers[TRIAGE_TIER]
+        reply = self.tiers[REPLY_TIER]
+
+        def saved(kind):
+            baseline_total = baseline[kind] / baseline["emails"] * self.routed
+            return round(baseline_total - triage[kind] - reply[kind])
+
+        def latency(counters):
+            return counters["seconds"] / counters["calls"] if counters["calls"] else 0.0
+
+        # Latência percebida por email: triagem sempre, resposta só quando escalado
+        escalation_rate = sum(self.reasons.values()) / self.routed
+        tiered_latency = latency(triage) + escalation_rate * latency(reply)
+
+        # Tokens de saída e de entrada separados: os de saída custam mais e
+        # dominam a latência, enquanto os de entrada se repetem na triagem
+        return {
+            "baseline_tier": baseline_tier,
+            "prompt_tokens": saved("prompt_tokens"),
+            "completion_tokens": saved("completion_tokens"),
+            "avg_latency_ms": round((latency(baseline) - tiered_latency) * 1000, 1),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            escalated = sum(self.reasons.values())
+            return {
+                "mode": ROUTING_MODE,
+                "models": dict(TIER_MODELS),
+                "escalation_threshold": ROUTING_ESCALATION_THRESHOLD,
+                "escalate_categories": sorted(ROUTING_ESCALATE_CATEGORIES),
+                "triaged": self.routed,
+                "escalated": escalated,
+                "escalation_rate": round(escalated / self.routed, 4) if self.routed else 0.0,
+                "escalation_reasons": dict(self.reasons),
+                "tiers": {tier: self._tier_summary(counters) for tier, counters in self.tiers.items()},
+                "estimated_savings": self._estimated_savings(),
+            }
+
+
+routing_stats = RoutingStats()
@@ -0,0 +1,485 @@
+import itertools
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from app.config import (
+    CACHE_BACKEND,
+    CACHE_TTL_SECONDS,
+    NEAR_DUP_CACHE,
+    NEAR_DUP_MAX_ENTRIES,
+    NEAR_DUP_PATH,
+    NEAR_DUP_THRESHOLD,
+)
+from app.services.cache_service import cache_namespace, prompt_text
+from app.services.keyword_service import DATE_RE, DECIMAL_RE, NUMBER_SPAN_RE
+
+logger = logging.getLogger(__name__)
+
+# Palavras com inicial maiúscula (nomes de pessoas e empresas, em geral)
+NAME_RE = re.compile(r"\b[A-ZÀ-ÖØ-Þ]\w+")
+
+# Trechos variáveis dos emails gerados por modelo, achados com as mesmas regex
+# dos sinais numéricos: "R$ 1.250,00" vira "r$ VALOR", "10/11" vira "DATA",
+# "#1234" vira "#NUM" e nomes no meio da frase viram "NOME". Os marcadores em
+# maiúsculas não colidem com as palavras do texto, comparado em minúsculas
+SLOT_RE = re.compile(rf"((?i:r\$\s*))?({NUMBER_SPAN_RE.pattern})|(?P<nome>{NAME_RE.pattern})")
+MARKERS = {"valor": "VALOR", "data": "DATA", "num": "NUM", "nome": "NOME"}
+SENTENCE_END = ".!?:"
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Campos da resposta da IA reescritos com os valores do novo email
+TEMPLATE_FIELDS = ("razao", "resposta_sugerida")
+
+# MinHash com 64 permutações sobre trigramas de palavras, indexado por LSH
+# em 8 faixas de 8 linhas: emails com Jaccard 0,9 viram candidatos em ~99%
+# das buscas e com Jaccard 0,5, em menos de 4%
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 31) - 1
+# Coeficientes fixos (não aleatórios): as assinaturas são gravadas em disco
+_A = np.array([zlib.crc32(f"minhash-a-{i}".encode()) % (_PRIME - 1) + 1 for i in range(NUM_PERM)], dtype=np.uint64)
+_B = np.array([zlib.crc32(f"minhash-b-{i}".encode()) % _PRIME for i in range(NUM_PERM)], dtype=np.uint64)
+
+
+def canonicalize(text: str) -> tuple:
+    """
+    Troca valores monetários, datas, demais números e nomes por marcadores.
+    Palavras com maiúscula no início de frase ("Olá", "Segue") são mantidas.
+
+    Returns:
+        tuple: (texto canônico em minúsculas, lista de (tipo, trecho original) na ordem do texto)
+    """
+    parts = []
+    slots = []
+    last = 0
+
+    for match in SLOT_RE.finditer(text):
+        start = match.start()
+        if match.group("nome"):
+            # Texto normalizado: no máximo um espaço antes da palavra
+            before = text[max(0, start - 2):start].rstrip()
+            if not before or before[-1] in SENTENCE_END:
+                continue
+            kind, span = "nome", match.group("nome")
+        else:
+            start = match.start(2)
+            span = match.group(2).rstrip(".,/-")
+            if match.group(1):
+                kind = "valor"
+            elif DATE_RE.fullmatch(span):
+                kind = "data"
+            elif DECIMAL_RE.search(span):
+                kind = "valor"
+            else:
+                kind = "num"
+
+        parts.append(text[last:start].lower())
+        parts.append(MARKERS[kind])
+        slots.append((kind, span))
+        last = start + len(span)
+
+    parts.append(text[last:].lower())
+    return "".join(parts), slots
+
+
+def signature(canonical: str) -> Optional[np.ndarray]:
+    """
+    Assinatura MinHash dos trigramas de palavras do texto canônico.
+
+    Returns:
+        np.ndarray: `NUM_PERM` valores uint32, ou None para texto sem palavras
+    """
+    tokens = TOKEN_RE.findall(canonical)
+    if not tokens:
+        return None
+
+    if len(tokens) < SHINGLE_SIZE:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # a < 2^31 e hash < 2^32: o produto cabe em uint64
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def _band_keys(sig: np.ndarray) -> list:
+    # Hash (int) em vez dos bytes da faixa: o índice é só em memória e os
+    # candidatos são conferidos pela assinatura inteira
+    return [hash(sig[i * ROWS:(i + 1) * ROWS].tobytes()) for i in range(BANDS)]
+
+
+def _span_pattern(spans) -> re.Pattern:
+    alternatives = "|".join(re.escape(span) for span in sorted(spans, key=len, reverse=True))
+    # Só palavras e números inteiros: "250" não casa dentro de "1.250,00"
+    return re.compile(rf"(?<!\w)(?<!\d[.,/-])(?:{alternatives})(?!\w|[.,/-]\d)")
+
+
+def _kinds(slots: list) -> str:
+    # Sequência dos tipos em uma única string ("NOME NUM VALOR DATA")
+    return " ".join(MARKERS[kind] for kind, _ in slots)
+
+
+def _cited_slots(slots: list, fields: list) -> list:
+    """
+    Trechos variáveis do email citados na razão ou na resposta, com a posição
+    de cada ocorrência no email. Só eles precisam ser guardados.
+    """
+    spans = {span for _, span in slots}
+    if not spans or not fields:
+        return []
+
+    cited = set(_span_pattern(spans).findall(" ".join(fields)))
+    return [[position, span] for position, (_, span) in enumerate(slots) if span in cited]
+
+
+def _slot_changes(kinds: str, cited: list, new: list) -> tuple:
+    """
+    Alinha os trechos citados do email guardado com os do novo.
+
+    Args:
+        kinds (str): Tipos dos trechos variáveis do email guardado (`_kinds`)
+        cited (list): Pares [posição, trecho] citados na razão ou na resposta
+        new (list): Trechos variáveis do novo email (`canonicalize`)
+
+    Returns:
+        tuple: (trecho antigo -> trecho novo, trechos antigos sem substituto conhecido)
+    """
+    new_spans = {span for _, span in new}
+    if kinds != _kinds(new):
+        # Sequências diferentes: nenhum valor antigo pode ser trocado com segurança
+        return {}, {span for _, span in cited if span not in new_spans}
+
+    targets = {}
+    for position, before in cited:
+        targets.setdefault(before, set()).add(new[position][1])
+
+    changes = {}
+    unknown = set()
+    for before, afters in targets.items():
+        if len(afters) > 1:
+            unknown.add(before)
+        elif before not in afters:
+            changes[before] = afters.pop()
+    return changes, unknown
+
+
+def _fill(value: str, changes: dict, unknown: set) -> Optional[str]:
+    """
+    Troca no texto os valores do email antigo pelos do novo.
+
+    Returns:
+        str: Texto reescrito, ou None se ele citar um valor sem substituto
+    """
+    spans = set(changes) | unknown
+    if not spans:
+        return value
+
+    pattern = _span_pattern(spans)
+    if unknown.intersection(pattern.findall(value)):
+        return None
+    return pattern.sub(lambda match: changes[match.group(0)], value)
+
+
+class NearDuplicateCache:
+    """
+    Cache de classificações por similaridade, para emails gerados a partir do
+    mesmo modelo ("Fatura #1234 de R$ 500,00 vence em 10/11") que o cache
+    exato nunca encontra.
+
+    O texto é canonizado (valores, datas e números viram marcadores) e
+    resumido em uma assinatura MinHash; um índice LSH em memória encontra os
+    candidatos e a similaridade estimada (fração de valores iguais na
+    assinatura) decide se o veredicto é reaproveitado. Categoria e confiança
+    vêm do email guardado; razão e resposta sugerida têm os valores antigos
+    trocados pelos do novo email. Um campo que cite um valor sem substituto,
+    ou um nome ausente do novo email, volta como None.
+
+    Com `path`, as entradas são gravadas em SQLite e recarregadas na
+    inicialização; a memória fica limitada a `max_entries` (LRU) e o arquivo
+    é cortado nas mais recentes a cada `PRUNE_EVERY` escritas. Com `ttl`, as
+    entradas expiram como as do cache exato (`CACHE_TTL_SECONDS`).
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: Optional[str], threshold: float, max_entries: int, ttl: Optional[float] = None):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Mudar prompt, modelos ou o formato da assinatura invalida as entradas gravadas
+        self.namespace = f"{cache_namespace()}\0minhash-{NUM_PERM}x{SHINGLE_SIZE}"
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.retemplated = 0
+        self.fallbacks = 0
+
+        self._entries = OrderedDict()  # id -> (assinatura, payload, expira em)
+        self._bands = [{} for _ in range(BANDS)]  # chave da faixa -> ids
+        self._ids = itertools.count(1)
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self._conn = None
+        if path:
+            self._conn = self._connect()
+            self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS near_duplicates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                payload TEXT NOT NULL,
+                expires_at REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(near_duplicates)")}
+        if "expires_at" not in columns:
+            # Arquivo anterior à expiração: as entradas antigas valem como vencidas
+            conn.execute("ALTER TABLE near_duplicates ADD COLUMN expires_at REAL NOT NULL DEFAULT 0")
+        return conn
+
+    def _expires_at(self) -> float:
+        return time.time() + self.ttl if self.ttl is not None else float("inf")
+
+    def _load(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM near_duplicates WHERE namespace != ?", (self.namespace,))
+            if self.ttl is not None:
+                self._conn.execute("DELETE FROM near_duplicates WHERE expires_at < ?", (time.time(),))
+            rows = self._conn.execute(
+                "SELECT id, signature, payload, expires_at FROM near_duplicates ORDER BY id DESC LIMIT ?",
+                (self.max_entries,),
+            ).fetchall()
+            for entry_id, blob, raw, expires_at in reversed(rows):
+                expires_at = expires_at if self.ttl is not None else float("inf")
+                self._insert(entry_id, np.frombuffer(blob, dtype=np.uint32), json.loads(raw), expires_at)
+
+    def _best(self, sig: np.ndarray) -> tuple:
+        """
+        Candidato mais parecido entre os que dividem ao menos uma faixa.
+
+        Returns:
+            tuple: (id, similaridade estimada), ou (None, 0.0)
+        """
+        candidates = set()
+        for band, key in zip(self._bands, _band_keys(sig)):
+            ids = band.get(key)
+            if ids is None:
+                continue
+            if isinstance(ids, int):
+                candidates.add(ids)
+            else:
+                candidates.update(ids)
+        if not candidates:
+            return None, 0.0
+
+        ids = list(candidates)
+        similarities = (np.stack([self._entries[i][0] for i in ids]) == sig).mean(axis=1)
+        best = int(similarities.argmax())
+        return ids[best], float(similarities[best])
+
+    def _insert(self, entry_id: int, sig: np.ndarray, payload: dict, expires_at: float) -> None:
+        best, similarity = self._best(sig)
+        if best is not None and similarity >= 1.0:
+            # Mesma assinatura: fica só a resposta mais recente
+            self._remove(best)
+
+        self._entries[entry_id] = (sig, payload, expires_at)
+        for band, key in zip(self._bands, _band_keys(sig)):
+            # Um id solto por faixa; conjunto só quando há colisão (economiza memória)
+            ids = band.get(key)
+            if ids is None:
+                band[key] = entry_id
+            elif isinstance(ids, int):
+                band[key] = {ids, entry_id}
+            else:
+                ids.add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, entry_id: int) -> None:
+        sig = self._entries.pop(entry_id)[0]
+        for band, key in zip(self._bands, _band_keys(sig)):
+            ids = band[key]
+            if isinstance(ids, int):
+                del band[key]
+                continue
+            ids.discard(entry_id)
+            if len(ids) == 1:
+                band[key] = ids.pop()
+
+    def _persist(self, sig: np.ndarray, raw: str, expires_at: float) -> int:
+        if self._conn is None:
+            return next(self._ids)
+
+        cur = self._conn.execute(
+            "INSERT INTO near_duplicates (namespace, signature, payload, expires_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, sig.tobytes(), raw, expires_at if self.ttl is not None else 0),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            if self.ttl is not None:
+                self._conn.execute("DELETE FROM near_duplicates WHERE expires_at < ?", (time.time(),))
+            # Limite do arquivo, somando as entradas de todos os workers
+            self._conn.execute(
+                "DELETE FROM near_duplicates WHERE id <= "
+                "(SELECT id FROM near_duplicates ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        return cur.lastrowid
+
+    def get(self, text: str) -> Optional[dict]:
+        """
+        Busca um email quase idêntico já classificado.
+
+        Returns:
+            dict: JSON da IA (antes do pós-processamento) com razão e resposta
+            reescritas; campos que não puderam ser reescritos vêm como None
+        """
+        text = prompt_text(text)
+        canonical, slots = canonicalize(text)
+        sig = signature(canonical)
+
+        with self._lock:
+            best, similarity = self._best(sig) if sig is not None else (None, 0.0)
+            now = time.time()
+            while best is not None and self._entries[best][2] < now:
+                # Vencida: sai do índice (e do arquivo na próxima limpeza)
+                self._remove(best)
+                self.expired += 1
+                best, similarity = self._best(sig)
+            if best is None or similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best)
+            payload = self._entries[best][1]
+            self.hits += 1
+
+        logger.info("Quase-duplicata encontrada (similaridade %.2f)", similarity)
+        return self._retemplate(payload, slots, text)
+
+    def _retemplate(self, payload: dict, slots: list, text: str) -> dict:
+        parsed = dict(payload["parsed"])
+        changes, unknown = _slot_changes(payload["kinds"], payload["cited"], slots)
+        names = set(NAME_RE.findall(text))
+
+        for field in TEMPLATE_FIELDS:
+            value = parsed.get(field)
+            if not isinstance(value, str):
+                continue
+
+            # Nomes do email antigo que não são trocados nem aparecem no novo
+            stale = set(payload["names"].get(field, ())) - names - set(changes)
+            filled = None
+            if not stale:
+                filled = _fill(value, changes, unknown)
+
+            if filled is None:
+                self.fallbacks += 1
+            elif filled != value:
+                self.retemplated += 1
+            parsed[field] = filled
+
+        return parsed
+
+    def set(self, text: str, parsed: dict) -> None:
+        text = prompt_text(text)
+        canonical, slots = canonicalize(text)
+        sig = signature(canonical)
+        if sig is None:
+            return
+
+        fields = [parsed[field] for field in TEMPLATE_FIELDS if isinstance(parsed.get(field), str)]
+        # Nomes do email citados na resposta: só valem para quem tem o mesmo nome
+        source_names = set(NAME_RE.findall(text))
+        names = {
+            field: sorted(source_names.intersection(NAME_RE.findall(parsed[field])))
+            for field in TEMPLATE_FIELDS
+            if isinstance(parsed.get(field), str)
+        }
+        payload = {
+            "parsed": dict(parsed),
+            "kinds": _kinds(slots),
+            "cited": _cited_slots(slots, fields),
+            "names": {field: found for field, found in names.items() if found},
+        }
+
+        try:
+            with self._lock:
+                expires_at = self._expires_at()
+                entry_id = self._persist(sig, json.dumps(payload, ensure_ascii=False), expires_at)
+                self._insert(entry_id, sig, payload, expires_at)
+        except Exception as e:
+            logger.warning("Falha ao gravar no cache de quase-duplicatas: %s", e)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "persisted": self.path is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "ttl_seconds": self.ttl,
+            "retemplated_fields": self.retemplated,
+            "fallback_fields": self.fallbacks,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def build_near_duplicate_cache() -> Optional[NearDuplicateCache]:
+    """
+    Cria o cache de quase-duplicatas (desligado com `NEAR_DUP_CACHE=false` ou
+    `CACHE_BACKEND=none`). Chamado por `app.resources.open_resources`, no
+    startup do worker.
+    """
+    if not NEAR_DUP_CACHE or CACHE_BACKEND == "none":
+        return None
+
+    try:
+        cache = NearDuplicateCache(NEAR_DUP_PATH or None, NEAR_DUP_THRESHOLD, NEAR_DUP_MAX_ENTRIES, CACHE_TTL_SECONDS)
+    except (sqlite3.Error, OSError, ValueError, KeyError) as e:
+        logger.error(f"Falha ao abrir {NEAR_DUP_PATH}, cache de quase-duplicatas só em memória: {e}")
+        cache = NearDuplicateCache(None, NEAR_DUP_THRESHOLD, NEAR_DUP_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+    logger.info(f"Cache de quase-duplicatas ativo: {cache.stats()['entries']} emails carregados")
+    return cache
+
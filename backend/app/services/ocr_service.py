@@ -0,0 +1,347 @@
+"""
+OCR de PDFs digitalizados.
+
+Usado só como recurso das páginas sem camada de texto (ver
+`file_service.extract_text`). Depende de dois componentes opcionais: o pacote
+`pypdfium2`, que renderiza a página, e o binário do `tesseract`, que a
+reconhece. Vem desligado (`OCR_ENABLED`); ligado sem eles, o worker avisa
+no startup e o fluxo segue como antes (texto curto demais -> resultado de
+falha).
+
+O custo de CPU é limitado de três formas:
+- um pool de `OCR_PROCESSES` processos por worker, compartilhado entre os
+  uploads; cada documento mantém no máximo `OCR_PROCESSES` páginas na fila,
+  então uploads simultâneos se intercalam em vez de um monopolizar o pool;
+- a resolução é escolhida por página (`adaptive_dpi`), com teto de pixels;
+- cada documento tem um prazo (`OCR_TIMEOUT`) e para ao juntar
+  `OCR_TARGET_CHARS` caracteres, suficientes para classificar.
+"""
+import hashlib
+import importlib.util
+import io
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+from pypdf import PdfWriter
+
+from app.config import (
+    OCR_CACHE_ENTRIES,
+    OCR_ENABLED,
+    OCR_LANGUAGES,
+    OCR_MAX_DPI,
+    OCR_MAX_PAGES,
+    OCR_MIN_DPI,
+    OCR_PROCESSES,
+    OCR_TARGET_CHARS,
+    OCR_TESSERACT_CMD,
+    OCR_TIMEOUT,
+)
+from app.metrics import OCR_PAGES, timed
+
+logger = logging.getLogger(__name__)
+
+# Teto de pixels por página: um A4 a 300 DPI. Páginas maiores têm a resolução
+# reduzida para manter o custo de cada página previsível.
+MAX_PAGE_PIXELS = 8_700_000
+
+
+def adaptive_dpi(page) -> int:
+    """
+    Resolução de renderização da página.
+
+    Usa a resolução nativa da maior imagem digitalizada (renderizar acima
+    dela não acrescenta detalhe), limitada pelo teto de pixels e pelo
+    intervalo `OCR_MIN_DPI`..`OCR_MAX_DPI`.
+    """
+    width_pt = float(page.mediabox.width) or 612.0
+    height_pt = float(page.mediabox.height) or 792.0
+
+    dpi = OCR_MAX_DPI
+    native = _native_dpi(page, width_pt)
+    if native:
+        dpi = min(dpi, native)
+
+    budget = 72 * math.sqrt(MAX_PAGE_PIXELS / (width_pt * height_pt))
+    dpi = min(dpi, budget)
+
+    return int(max(OCR_MIN_DPI, min(OCR_MAX_DPI, dpi)))
+
+
+def _native_dpi(page, width_pt: float) -> Optional[float]:
+    """
+    DPI da maior imagem da página, supondo que ela ocupe a largura toda
+    (caso típico de uma página digitalizada).
+    """
+    try:
+        xobjects = page["/Resources"]["/XObject"].get_object()
+    except (KeyError, TypeError):
+        return None
+
+    widest = 0
+    for ref in xobjects.values():
+        obj = ref.get_object()
+        if obj.get("/Subtype") == "/Image":
+            widest = max(widest, int(obj.get("/Width", 0)))
+
+    return widest * 72 / width_pt if widest else None
+
+
+def single_page_pdf(page) -> bytes:
+    """
+    A página como um PDF próprio: é o que atravessa para o processo do
+    pool (objetos do pypdf não são serializáveis) e a base da impressão
+    digital do cache. A saída do `PdfWriter` é determinística.
+    """
+    writer = PdfWriter()
+    writer.add_page(page)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def _ocr_page(data: bytes, dpi: int, languages: str, command: str, timeout: float) -> str:
+    """
+    Renderiza a página em tons de cinza e a envia ao tesseract pela entrada
+    padrão (formato PGM, sem arquivo temporário).
+
+    Função de módulo (serializável) para rodar no pool de processos.
+    """
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(data)
+    try:
+        bitmap = pdf[0].render(scale=dpi / 72, grayscale=True)
+        pixels = bitmap.to_numpy().reshape(bitmap.height, bitmap.width)
+        image = b"P5\n%d %d\n255\n" % (bitmap.width, bitmap.height) + pixels.tobytes()
+    finally:
+        pdf.close()
+
+    completed = subprocess.run(
+        [command, "stdin", "stdout", "-l", languages, "--dpi", str(dpi), "--psm", "3"],
+        input=image,
+        capture_output=True,
+        timeout=timeout,
+        check=True,
+        # Um núcleo por página: o paralelismo vem do pool, não do tesseract
+        env={**os.environ, "OMP_THREAD_LIMIT": "1"},
+    )
+    return completed.stdout.decode("utf-8", errors="replace").strip()
+
+
+class _InlineExecutor:
+    """
+    Executa no próprio processo. Usado quando a extração já roda em um
+    processo do pool dos jobs, que tem o seu próprio limite de processos.
+    """
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+class OcrService:
+    """
+    Pool de OCR do worker, com cache das páginas já reconhecidas (LRU,
+    chaveado pelo hash da página e pelos idiomas).
+    """
+
+    def __init__(self, processes: int, max_entries: int):
+        self.processes = max(1, processes)
+        self.max_entries = max_entries
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._available: Optional[bool] = None
+        self.pages = 0
+        self.cache_hits = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    @property
+    def available(self) -> bool:
+        """
+        Verificado uma vez, no startup do worker: OCR ligado, `pypdfium2`
+        importável e tesseract no PATH.
+        """
+        if self._available is None:
+            reason = None
+            if not OCR_ENABLED:
+                reason = "OCR_ENABLED=false"
+            elif importlib.util.find_spec("pypdfium2") is None:
+                reason = "pacote pypdfium2 não instalado"
+            elif shutil.which(OCR_TESSERACT_CMD) is None:
+                reason = f"'{OCR_TESSERACT_CMD}' não encontrado no PATH"
+
+            self._available = reason is None
+            if reason and OCR_ENABLED:
+                logger.warning("OCR desligado (%s): PDFs digitalizados não terão texto", reason)
+        return self._available
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: o processo da API tem threads (thread pool, SQLite) e fork não é seguro
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _discard(self, executor) -> None:
+        """
+        Descarta o pool se um processo morreu (ex.: falta de memória): um
+        `ProcessPoolExecutor` quebrado recusa novas tarefas.
+        """
+        with self._lock:
+            if self._pool is not executor:
+                return
+            self._pool = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+            return text
+
+    def _cache_set(self, key: str, text: str) -> None:
+        with self._lock:
+            self._cache[key] = text
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    @timed("ocr")
+    def recognize(self, pages: list, inline: bool = False) -> str:
+        """
+        Reconhece as páginas sem camada de texto, na ordem, até juntar
+        `OCR_TARGET_CHARS` caracteres, esgotar `OCR_MAX_PAGES` páginas ou
+        estourar o prazo do documento.
+
+        Args:
+            pages (list): Páginas do pypdf sem texto extraível
+            inline (bool): Roda no próprio processo (já dentro de um pool)
+
+        Returns:
+            str: Texto reconhecido (vazio se nada foi reconhecido)
+        """
+        if not pages or not self.available:
+            return ""
+
+        deadline = time.monotonic() + OCR_TIMEOUT
+        executor = _InlineExecutor() if inline else self._executor()
+        window = 1 if inline else self.processes
+
+        results: List[Optional[str]] = [None] * min(len(pages), OCR_MAX_PAGES)
+        pending = {}
+        next_page = 0
+        total = 0
+
+        def submit(index: int) -> None:
+            nonlocal total
+            page = pages[index]
+            data = single_page_pdf(page)
+            key = hashlib.sha256(OCR_LANGUAGES.encode() + b"\0" + data).hexdigest()
+
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                OCR_PAGES.labels("cache").inc()
+                results[index] = cached
+                total += len(cached)
+                return
+
+            remaining = max(1.0, deadline - time.monotonic())
+            future = executor.submit(_ocr_page, data, adaptive_dpi(page), OCR_LANGUAGES, OCR_TESSERACT_CMD, remaining)
+            pending[future] = (index, key)
+
+        try:
+            while total < OCR_TARGET_CHARS and (pending or next_page < len(results)):
+                # Janela por documento: no máximo `window` páginas na fila do pool
+                while next_page < len(results) and len(pending) < window and total < OCR_TARGET_CHARS:
+                    try:
+                        submit(next_page)
+                    except BrokenProcessPool:
+                        self._discard(executor)
+                        self.errors += 1
+                        OCR_PAGES.labels("error").inc()
+                        logger.error("OCR: pool de processos quebrado - recriado na próxima chamada")
+                        return "\n".join(text for text in results if text).strip()
+                    next_page += 1
+
+                if not pending:
+                    continue
+
+                remaining = deadline - time.monotonic()
+                done, _ = wait(pending, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+                if not done:
+                    self.timeouts += len(pending)
+                    OCR_PAGES.labels("timeout").inc(len(pending))
+                    logger.warning("OCR: prazo de %.0fs esgotado com %s página(s) pendente(s)", OCR_TIMEOUT, len(pending))
+                    break
+
+                for future in done:
+                    index, key = pending.pop(future)
+                    try:
+                        text = future.result()
+                    except subprocess.TimeoutExpired:
+                        self.timeouts += 1
+                        OCR_PAGES.labels("timeout").inc()
+                        continue
+                    except Exception as e:
+                        if isinstance(e, BrokenProcessPool):
+                            self._discard(executor)
+                        self.errors += 1
+                        OCR_PAGES.labels("error").inc()
+                        logger.error("OCR: falha na página %s: %s", index + 1, e)
+                        continue
+
+                    self.pages += 1
+                    OCR_PAGES.labels("ocr").inc()
+                    self._cache_set(key, text)
+                    results[index] = text
+                    total += len(text)
+        finally:
+            # Páginas ainda na fila são descartadas; as que já estão rodando
+            # terminam pelo timeout do próprio tesseract
+            for future in pending:
+                future.cancel()
+
+        return "\n".join(text for text in results if text).strip()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._cache)
+        return {
+            "available": self.available,
+            "processes": self.processes,
+            "pages": self.pages,
+            "cache_hits": self.cache_hits,
+            "cache_entries": entries,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+ocr_service = OcrService(OCR_PROCESSES, OCR_CACHE_ENTRIES)
@@ -0,0 +1,168 @@
+import logging
+
+from app.config import MAX_EMAIL_TOKENS, ROUTING_REPLY_MODEL, TOKENIZER_ENCODING
+from app.utils.email_cleaner import clean_email
+from app.utils.tokenizer import load_tokenizer
+
+logger = logging.getLogger(__name__)
+
+# Instruções fixas: vão na mensagem de sistema, idêntica em todas as chamadas
+# do mesmo tipo, para que o cache de prompt do provedor reaproveite o prefixo.
+# O email vai sempre na mensagem do usuário.
+_CLASSIFICATION_RULES = """REGRAS DE CLASSIFICAÇÃO:
+- "Produtivo": Requer ação, suporte, dúvidas, pagamentos, relatórios, solicitações técnicas, testes de API/sistema, desenvolvimento.
+- "Improdutivo": Apenas saudações, spam, agradecimentos vagos ou conteúdo ilegível.
+
+CRITÉRIOS DE CONFIANÇA (0-100%):
+ALTA (85-100%):
+- Verbos de ação claros: "Pagar", "Resolver", "Testar", "Desenvolver", "Implementar", "Corrigir"
+- Termos técnicos específicos: "API", "código", "bug", "erro", "sistema", "banco de dados"
+- Valores monetários ou datas específicas
+- Solicitações explícitas mesmo que curtas
+MÉDIA (60-84%):
+- Contexto financeiro/corporativo sem ação explícita
+- Menção a processos sem urgência clara
+- Termos genéricos de negócio
+BAIXA (0-59%):
+- Apenas fragmentos sem contexto ("Segue anexo", "Ok")
+- Texto ambíguo ou ilegível
+- Saudações isoladas
+
+IMPORTANTE:
+- Textos curtos (menos de 50 chars) MAS com termos técnicos específicos ou ações claras DEVEM ter confiança ALTA (85%+)
+- A brevidade não é problema se o conteúdo é claro e objetivo
+- "Testar API", "corrigir bug", "pagar fatura" são exemplos de textos curtos mas com alta confiança"""
+
+_FULL_FIELDS = (
+    '"categoria": "Produtivo" ou "Improdutivo", "confianca": (inteiro 0-100), '
+    '"razao": "Explicação técnica e direta.", "resposta_sugerida": "Resposta formal e direta."'
+)
+_TRIAGE_FIELDS = '"categoria": "Produtivo" ou "Improdutivo", "confianca": (inteiro 0-100)'
+
+SYSTEM_PROMPT = f"""Você é um classificador sênior de emails corporativos. Analise o email enviado pelo usuário.
+
+{_CLASSIFICATION_RULES}
+
+Se houver TRIAGEM PRELIMINAR, confirme ou corrija a classificação.
+Retorne APENAS JSON:
+{{{_FULL_FIELDS}}}"""
+
+TRIAGE_SYSTEM_PROMPT = f"""Você é um classificador sênior de emails corporativos. Classifique o email enviado pelo usuário.
+
+{_CLASSIFICATION_RULES}
+
+Retorne APENAS JSON, sem explicações:
+{{{_TRIAGE_FIELDS}}}"""
+
+BATCH_SYSTEM_PROMPT = f"""Você é um classificador sênior de emails corporativos. Analise CADA email enviado pelo usuário de forma independente; cada um vem identificado por EMAIL [ID].
+
+{_CLASSIFICATION_RULES}
+
+Se um email trouxer triagem preliminar, confirme ou corrija a classificação.
+Retorne APENAS JSON, com exatamente um item por email, usando o mesmo ID:
+{{"resultados": [{{"id": "ID do email", {_FULL_FIELDS}}}]}}"""
+
+BATCH_TRIAGE_SYSTEM_PROMPT = f"""Você é um classificador sênior de emails corporativos. Classifique CADA email enviado pelo usuário de forma independente; cada um vem identificado por EMAIL [ID].
+
+{_CLASSIFICATION_RULES}
+
+Retorne APENAS JSON, sem explicações, com exatamente um item por email, usando o mesmo ID:
+{{"resultados": [{{"id": "ID do email", {_TRIAGE_FIELDS}}}]}}"""
+
+_tokenizer = None
+
+
+def init_tokenizer():
+    """
+    Carrega o tokenizador do modelo de resposta. Chamado no startup do worker
+    (`lifespan`): o tiktoken pode baixar o arquivo BPE no primeiro uso, o que
+    não deve acontecer no meio de uma requisição.
+    """
+    global _tokenizer
+    _tokenizer = load_tokenizer(ROUTING_REPLY_MODEL, TOKENIZER_ENCODING)
+    if _tokenizer.name == "approximate":
+        logger.warning("Prompts cortados pela contagem aproximada: MAX_EMAIL_TOKENS pode ser excedido")
+    return _tokenizer
+
+
+def get_tokenizer():
+    """
+    Tokenizador do modelo de resposta. Fora da API (CLIs e benchmarks), é
+    carregado no primeiro uso.
+    """
+    if _tokenizer is None:
+        return init_tokenizer()
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    return get_tokenizer().count(text)
+
+
+def prepare_email(text: str, max_tokens: int = MAX_EMAIL_TOKENS) -> str:
+    """
+    Compacta o email (ver `clean_email`) e o corta em `max_tokens` tokens.
+
+    Args:
+        text (str): Texto do email
+        max_tokens (int): Orçamento de tokens do email no prompt
+
+    Returns:
+        str: Trecho do email que vai para o prompt
+    """
+    email = clean_email(text)
+
+    # Cada token tem ao menos um caractere: textos curtos dispensam a tokenização
+    if len(email) <= max_tokens:
+        return email
+    return get_tokenizer().truncate(email, max_tokens)
+
+
+def _triage_note(triage: dict) -> str:
+    return f'"{triage["categoria"]}" com {triage.get("confianca")}% de confiança'
+
+
+def build_messages(text: str, triage_only: bool = False, triage: dict = None) -> list:
+    """
+    Monta as mensagens de classificação de um email.
+
+    Args:
+        text (str): Texto do email (sem limpar nem truncar)
+        triage_only (bool): Pede só categoria e confiança (triagem)
+        triage (dict): Classificação preliminar da triagem, a confirmar ou corrigir
+
+    Returns:
+        list: Mensagens de sistema e do usuário
+    """
+    content = f'EMAIL:\n"""\n{prepare_email(text)}\n"""'
+    if triage is not None:
+        content += f"\n\nTRIAGEM PRELIMINAR: {_triage_note(triage)}."
+
+    return [
+        {"role": "system", "content": TRIAGE_SYSTEM_PROMPT if triage_only else SYSTEM_PROMPT},
+        {"role": "user", "content": content},
+    ]
+
+
+def build_batch_messages(items: list, triage_only: bool = False, triages: dict = None) -> list:
+    """
+    Monta as mensagens de uma chamada com vários emails identificados por ID.
+
+    Args:
+        items (list): Lista de tuplas (id, texto do email)
+        triage_only (bool): Pede só categoria e confiança (triagem)
+        triages (dict): Classificação preliminar por ID, a confirmar ou corrigir
+
+    Returns:
+        list: Mensagens de sistema e do usuário
+    """
+    triages = triages or {}
+    emails = []
+    for item_id, text in items:
+        note = f" (triagem preliminar: {_triage_note(triages[item_id])})" if item_id in triages else ""
+        emails.append(f'EMAIL [{item_id}]{note}:\n"""\n{prepare_email(text)}\n"""')
+
+    return [
+        {"role": "system", "content": BATCH_TRIAGE_SYSTEM_PROMPT if triage_only else BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": "\n\n".join(emails)},
+    ]
@@ -0,0 +1,442 @@
+import asyncio
+import contextvars
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from app.config import OPENAI_TPM_LIMIT, TENANT_MAX_QUEUED, TENANTS_PATH
+from app.metrics import TENANT_QUEUE_SECONDS, TENANT_REJECTIONS, TENANT_TOKENS
+from app.resources import get_resources
+from app.utils.resilience import RateLimitWaitTimeout, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Prioridades das chamadas à OpenAI dentro de cada tenant (menor sai antes)
+INTERACTIVE = 0  # /classify e /classify/stream: alguém aguardando a resposta
+BATCH = 1        # /classify/batch
+BULK = 2         # jobs (backfills, caixas .mbox)
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BULK: "bulk"}
+
+DEFAULT_TENANT = "default"
+
+
+class TenantError(Exception):
+    """Base dos erros de tenant, convertidos em respostas HTTP pelas rotas."""
+
+
+class TenantAuthError(TenantError):
+    """Chave de API ausente ou desconhecida."""
+
+
+class TenantQuotaExceeded(TenantError):
+    """Cota de tokens do tenant esgotada ou fila de chamadas cheia."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Tenant:
+    """
+    Equipe que usa a API: peso na divisão da capacidade da OpenAI, cota de
+    tokens por minuto (opcional) e contadores de uso.
+    """
+
+    def __init__(self, name: str, weight: float = 1.0, tokens_per_minute: Optional[float] = None):
+        self.name = name
+        self.weight = max(float(weight), 0.01)
+        self.quota = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+        # Estado no escalonador: fila por prioridade e tempo virtual
+        self.queue = []
+        self.virtual_time = 0.0
+        self.in_flight = 0
+
+        self.requests = 0
+        self.rejected = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.throttled = 0
+        self.queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.granted = 0
+
+        self._tokens = {kind: TENANT_TOKENS.labels(name, kind) for kind in ("prompt", "completion")}
+        self._rejections = TENANT_REJECTIONS.labels(name)
+        self._queue_seconds = {
+            priority: TENANT_QUEUE_SECONDS.labels(name, label) for priority, label in PRIORITY_NAMES.items()
+        }
+
+    def quota_wait(self, tokens: int, now: float) -> float:
+        """
+        Segundos até a cota do tenant comportar `tokens` tokens (0 sem cota).
+        """
+        return self.quota.wait_time(tokens, now) if self.quota is not None else 0.0
+
+    def record_wait(self, priority: int, seconds: float) -> None:
+        self.granted += 1
+        self.queue_wait += seconds
+        self.max_queue_wait = max(self.max_queue_wait, seconds)
+        self._queue_seconds[priority].observe(seconds)
+
+    def record_usage(self, estimated: int, usage) -> None:
+        """
+        Soma os tokens da chamada e corrige a cota com o consumo real.
+        """
+        self.llm_calls += 1
+        if usage is None:
+            return
+
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self._tokens["prompt"].inc(prompt)
+        self._tokens["completion"].inc(completion)
+
+        if self.quota is not None:
+            self.quota.tokens += estimated - (prompt + completion)
+
+    def reject(self) -> None:
+        self.rejected += 1
+        self._rejections.inc()
+
+    def usage(self) -> dict:
+        queued = {label: 0 for label in PRIORITY_NAMES.values()}
+        for waiter in self.queue:
+            if not waiter.future.done():
+                queued[PRIORITY_NAMES[waiter.priority]] += 1
+
+        quota = None
+        if self.quota is not None:
+            self.quota.refill(time.monotonic())
+            quota = {
+                "tokens_per_minute": self.quota.capacity,
+                "tokens_available": round(self.quota.tokens, 1),
+            }
+
+        return {
+            "tenant": self.name,
+            "weight": self.weight,
+            "quota": quota,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "throttled": self.throttled,
+            "in_flight": self.in_flight,
+            "queued": queued,
+            "avg_queue_wait_seconds": round(self.queue_wait / self.granted, 4) if self.granted else 0.0,
+            "max_queue_wait_seconds": round(self.max_queue_wait, 4),
+        }
+
+
+def _key_digest(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class TenantRegistry:
+    """
+    Tenants configurados e o índice das chaves de API.
+
+    Sem configuração (`TENANTS_PATH`), a autenticação fica desligada e todas
+    as requisições usam o tenant "default", sem cota.
+    """
+
+    def __init__(self, tenants: list, keys: dict):
+        self.enabled = bool(tenants)
+        self.tenants = {tenant.name: tenant for tenant in tenants}
+        # Chamadas fora de uma requisição (scripts, jobs antigos) vão para o tenant padrão
+        self.default = self.tenants.setdefault(DEFAULT_TENANT, Tenant(DEFAULT_TENANT))
+        # sha256 da chave -> tenant: a chave em si não fica guardada
+        self._keys = {_key_digest(key): tenant for key, tenant in keys.items()}
+
+    def authenticate(self, api_key: Optional[str]) -> Tenant:
+        """
+        Raises:
+            TenantAuthError: Chave ausente ou desconhecida (com tenants configurados)
+        """
+        if not self.enabled:
+            return self.default
+
+        tenant = self._keys.get(_key_digest(api_key)) if api_key else None
+        if tenant is None:
+            raise TenantAuthError("Chave de API ausente ou inválida")
+        return tenant
+
+    def get(self, name: Optional[str]) -> Tenant:
+        """
+        Tenant pelo nome (jobs gravados). Um tenant removido da configuração
+        continua existindo, sem cota, para terminar os jobs pendentes.
+        """
+        if not name:
+            return self.default
+        if name not in self.tenants:
+            self.tenants[name] = Tenant(name)
+        return self.tenants[name]
+
+    def admit(self, tenant: Tenant) -> None:
+        """
+        Controle de admissão das rotas interativas: recusa na hora, em vez de
+        enfileirar, quando a cota do tenant está esgotada ou a fila dele cheia.
+
+        Raises:
+            TenantQuotaExceeded: Com o tempo sugerido para nova tentativa
+        """
+        now = time.monotonic()
+        wait = tenant.quota_wait(1, now)
+        if wait > 0:
+            tenant.reject()
+            raise TenantQuotaExceeded(f"Cota de tokens por minuto do tenant {tenant.name} esgotada", wait)
+
+        if sum(1 for waiter in tenant.queue if not waiter.future.done()) >= TENANT_MAX_QUEUED:
+            tenant.reject()
+            raise TenantQuotaExceeded(f"Fila de chamadas do tenant {tenant.name} cheia", 1.0)
+
+        tenant.requests += 1
+
+    def usage(self) -> list:
+        return [tenant.usage() for tenant in self.tenants.values()]
+
+
+def load_tenants(path: Optional[str] = TENANTS_PATH) -> TenantRegistry:
+    """
+    Lê o arquivo de tenants:
+
+        {"suporte": {"api_keys": ["..."], "tokens_per_minute": 60000, "weight": 3},
+         "backfill": {"api_keys": ["..."], "tokens_per_minute": 20000, "weight": 1}}
+
+    `tokens_per_minute` é opcional (sem cota própria) e `weight` vale 1 por padrão.
+    """
+    if not path:
+        return TenantRegistry([], {})
+
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+
+    tenants = []
+    keys = {}
+    for name, options in config.items():
+        tpm = options.get("tokens_per_minute")
+        if tpm and tpm > OPENAI_TPM_LIMIT:
+            logger.warning("Cota do tenant %s (%s TPM) acima do limite global (%s TPM)", name, tpm, OPENAI_TPM_LIMIT)
+        tenant = Tenant(name, options.get("weight", 1.0), tpm)
+        tenants.append(tenant)
+        for key in options.get("api_keys", []):
+            keys[key] = tenant
+
+    logger.info("%s tenants carregados de %s", len(tenants), path)
+    return TenantRegistry(tenants, keys)
+
+
+# Tenant e prioridade da requisição (ou job) em andamento, lidos pelo LLMGateway
+_current = contextvars.ContextVar("tenant", default=None)
+
+
+@contextmanager
+def tenant_context(tenant: Tenant, priority: int):
+    """
+    Define a quem são atribuídas as chamadas à OpenAI feitas dentro do bloco,
+    inclusive pelas tarefas criadas nele (asyncio copia o contexto).
+    """
+    token = _current.set((tenant, priority))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current_tenant() -> tuple:
+    """
+    Returns:
+        tuple: (tenant, prioridade); fora de um `tenant_context`, o tenant padrão como interativo
+    """
+    return _current.get() or (get_resources().tenants.default, INTERACTIVE)
+
+
+class _Waiter:
+    __slots__ = ("tenant", "priority", "sequence", "tokens", "deadline", "enqueued", "future")
+
+    def __init__(self, tenant: Tenant, priority: int, sequence: int, tokens: int, deadline: Optional[float]):
+        self.tenant = tenant
+        self.priority = priority
+        self.sequence = sequence
+        self.tokens = tokens
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+
+    def __lt__(self, other) -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class FairScheduler:
+    """
+    Divide a capacidade da OpenAI (chamadas simultâneas e o orçamento de
+    RPM/TPM do limitador global) entre os tenants.
+
+    - Cada tenant tem uma fila por prioridade: interativo, lote, bulk.
+    - Entre tenants, enfileiramento justo ponderado (start-time fair queuing):
+      cada chamada liberada avança o tempo virtual do tenant em tokens/peso e
+      a próxima vaga vai para o tenant com fila e menor tempo virtual. Um
+      tenant que volta a ter fila entra no tempo virtual atual, sem acumular
+      crédito do período ocioso.
+    - A cota de TPM de um tenant segura só as chamadas dele.
+    - Chamadas bulk ocupam no máximo `bulk_share` das vagas: sempre há
+      capacidade imediata para as interativas, mesmo com backfills rodando.
+
+    As chamadas só são liberadas quando o limitador global tem capacidade
+    (e ela já é consumida aqui), então a ordem de saída é decidida por este
+    escalonador, não pela ordem de chegada ao limitador.
+    """
+
+    def __init__(self, limiter, max_concurrency: int, bulk_share: float):
+        self.limiter = limiter
+        self.max_concurrency = max(1, max_concurrency)
+        self.bulk_limit = max(1, int(self.max_concurrency * bulk_share))
+        self.in_flight = 0
+        self.bulk_in_flight = 0
+        self.virtual_time = 0.0
+        self.expired = 0
+        self._backlogged = {}
+        self._sequence = itertools.count()
+        self._timer = None
+
+    async def acquire(self, tenant: Tenant, priority: int, tokens: int, deadline: Optional[float] = None) -> _Waiter:
+        """
+        Aguarda a vez da chamada.
+
+        Returns:
+            _Waiter: Vaga a devolver com `release` ao fim da chamada
+
+        Raises:
+            RateLimitWaitTimeout: Se a vez não chegar até `deadline` (time.monotonic)
+        """
+        waiter = _Waiter(tenant, priority, next(self._sequence), tokens, deadline)
+        if tenant.name not in self._backlogged:
+            tenant.virtual_time = max(tenant.virtual_time, self.virtual_time)
+            self._backlogged[tenant.name] = tenant
+        heapq.heappush(tenant.queue, waiter)
+        self._dispatch()
+
+        if not waiter.future.done():
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                await asyncio.wait((waiter.future,), timeout=timeout)
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+
+            if not waiter.future.done():
+                self._abandon(waiter)
+                self.expired += 1
+                raise RateLimitWaitTimeout(f"Sem capacidade da OpenAI para o tenant {tenant.name} dentro do prazo")
+
+        waiter.future.result()
+        return waiter
+
+    def release(self, waiter: _Waiter) -> None:
+        self.in_flight -= 1
+        waiter.tenant.in_flight -= 1
+        if waiter.priority == BULK:
+            self.bulk_in_flight -= 1
+        self._dispatch()
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        future = waiter.future
+        if future.done() and not future.cancelled() and future.exception() is None:
+            # A vaga saiu junto com o cancelamento/prazo: devolve
+            self.release(waiter)
+        else:
+            future.cancel()
+
+    def _head(self, tenant: Tenant, now: float) -> tuple:
+        """
+        Primeira chamada ainda aguardando na fila do tenant e a espera pela
+        cota dele. Descarta as abandonadas e recusa as que a cota não
+        atenderia dentro do prazo.
+        """
+        while tenant.queue:
+            waiter = tenant.queue[0]
+            if waiter.future.done():
+                heapq.heappop(tenant.queue)
+                continue
+
+            wait = tenant.quota_wait(waiter.tokens, now)
+            if wait > 0 and waiter.deadline is not None and now + wait > waiter.deadline:
+                heapq.heappop(tenant.queue)
+                tenant.throttled += 1
+                waiter.future.set_exception(RateLimitWaitTimeout(
+                    f"Cota de tokens do tenant {tenant.name} disponível só em {wait:.1f}s"
+                ))
+                continue
+            return waiter, wait
+
+        del self._backlogged[tenant.name]
+        return None, 0.0
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        wake = None
+
+        while self.in_flight < self.max_concurrency:
+            chosen = None
+            for tenant in sorted(self._backlogged.values(), key=lambda t: t.virtual_time):
+                waiter, wait = self._head(tenant, now)
+                if waiter is None:
+                    continue
+                if waiter.priority == BULK and self.bulk_in_flight >= self.bulk_limit:
+                    continue
+                if wait > 0:
+                    wake = wait if wake is None else min(wake, wait)
+                    continue
+                chosen = waiter
+                break
+
+            if chosen is None:
+                break
+
+            # Orçamento global esgotado: ninguém sai, e quem chegar até lá disputa a vaga
+            wait = self.limiter.wait_time(chosen.tokens, now)
+            if wait > 0:
+                wake = wait if wake is None else min(wake, wait)
+                break
+
+            tenant = chosen.tenant
+            heapq.heappop(tenant.queue)
+            self.limiter.consume(chosen.tokens)
+            if tenant.quota is not None:
+                tenant.quota.consume(chosen.tokens)
+
+            self.virtual_time = tenant.virtual_time
+            tenant.virtual_time += chosen.tokens / tenant.weight
+            tenant.in_flight += 1
+            self.in_flight += 1
+            if chosen.priority == BULK:
+                self.bulk_in_flight += 1
+
+            tenant.record_wait(chosen.priority, now - chosen.enqueued)
+            chosen.future.set_result(None)
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if wake is not None:
+            self._timer = asyncio.get_running_loop().call_later(wake, self._dispatch)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "bulk_limit": self.bulk_limit,
+            "in_flight": self.in_flight,
+            "bulk_in_flight": self.bulk_in_flight,
+            "backlogged_tenants": sorted(self._backlogged),
+            "expired": self.expired,
+        }
@@ -0,0 +1,154 @@
+import codecs
+import logging
+import re
+from typing import Optional
+from fastapi import UploadFile
+
+from app.config import ENCODING_SNIFF_BYTES, MAX_FILE_SIZE, MAX_MAILBOX_SIZE
+from app.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FILE_TYPES = ("pdf", "txt", "eml", "mbox")
+
+# Tipos lidos em streaming, com limite de tamanho próprio
+MAX_SIZE_BY_TYPE = {"mbox": MAX_MAILBOX_SIZE}
+
+# Linha separadora do formato mbox: "From remetente data"
+_MBOX_FROM_LINE_RE = re.compile(rb"From \S+ +[^\r\n]*\d\d:\d\d[^\r\n]*\r?\n")
+
+# Cabeçalho RFC 822 ("Nome: valor") e os que identificam um email
+_HEADER_LINE_RE = re.compile(rb"[!-9;-~]+:[ \t]")
+_EMAIL_HEADERS_RE = re.compile(rb"^(?:from|date|subject|message-id|received|mime-version)[ \t]*:", re.IGNORECASE | re.MULTILINE)
+
+# Contêiner OLE dos arquivos antigos do Office, incluindo o .msg do Outlook
+OLE_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+# Assinaturas de formatos binários comuns que não devem ser tratados como texto
+BINARY_SIGNATURES = (
+    b"\x89PNG", b"\xff\xd8\xff", b"GIF8", b"PK\x03\x04", b"\x1f\x8b", b"Rar!",
+    b"7z\xbc\xaf", b"\xd0\xcf\x11\xe0", b"MZ", b"\x7fELF",
+)
+
+
+class UploadError(ValueError):
+    """Arquivo enviado inválido (tipo não suportado ou tamanho excedido)."""
+
+
+class PreparedUpload:
+    """
+    Upload pronto para extração: o buffer spooled do Starlette (sem cópias),
+    o tipo detectado pelos magic bytes e a codificação, no caso de texto.
+    """
+
+    def __init__(self, stream, filename: str, size: int, kind: str, encoding: Optional[str] = None):
+        self.stream = stream
+        self.filename = filename
+        self.size = size
+        self.kind = kind
+        self.encoding = encoding
+
+
+def sniff_file_type(head: bytes) -> Optional[str]:
+    """
+    Identifica o tipo do arquivo pelos primeiros bytes.
+
+    Returns:
+        str: "pdf", "txt", "eml", "mbox" ou None se o formato não for suportado
+    """
+    # A especificação permite lixo antes do cabeçalho em até 1024 bytes
+    if b"%PDF-" in head[:1024]:
+        return "pdf"
+
+    if head.startswith(BINARY_SIGNATURES):
+        return None
+
+    if _MBOX_FROM_LINE_RE.match(head):
+        return "mbox"
+
+    if _HEADER_LINE_RE.match(head):
+        headers = re.split(rb"\r?\n\r?\n", head, maxsplit=1)[0]
+        if len({name.lower() for name in _EMAIL_HEADERS_RE.findall(headers)}) >= 2:
+            return "eml"
+
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "txt"
+
+    if b"\x00" in head:
+        return None
+
+    return "txt"
+
+
+def detect_encoding(prefix: bytes) -> str:
+    """
+    Detecta a codificação a partir de um prefixo limitado do arquivo.
+
+    O decodificador incremental aceita um caractere multibyte cortado no fim
+    do prefixo, então o teste de UTF-8 não falha por causa do corte.
+    """
+    if prefix.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+
+    for encoding in ("utf-8", "cp1252"):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+
+    return "latin-1"
+
+
+def _upload_size(file: UploadFile) -> int:
+    """
+    Tamanho já contado pelo Starlette ao receber os chunks; sem ele, usa a
+    posição final do buffer (sem ler o conteúdo).
+    """
+    size = getattr(file, "size", None)
+    if size is not None:
+        return size
+
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+@timed("upload_read")
+def prepare_upload(file: UploadFile) -> PreparedUpload:
+    """
+    Valida o upload e detecta tipo e codificação lendo apenas um prefixo.
+
+    O limite de bytes da requisição é aplicado durante o recebimento pelo
+    `BodySizeLimitMiddleware`; aqui o limite é conferido por arquivo.
+
+    Raises:
+        UploadError: Tamanho acima do limite (`MAX_FILE_SIZE`; `MAX_MAILBOX_SIZE` para .mbox)
+            ou formato não suportado
+    """
+    size = _upload_size(file)
+
+    logger.info("Arquivo recebido: %s (%s bytes)", file.filename, size)
+
+    file.file.seek(0)
+    head = file.file.read(ENCODING_SNIFF_BYTES)
+    file.file.seek(0)
+
+    kind = sniff_file_type(head)
+    if kind is None and head.startswith(OLE_SIGNATURE):
+        # .msg exige um leitor de OLE que o projeto não tem
+        raise UploadError("Arquivos .msg do Outlook não são suportados: salve o email como .eml")
+    if kind not in SUPPORTED_FILE_TYPES:
+        raise UploadError(
+            f"Tipo de arquivo não suportado. Use: {', '.join('.' + ext for ext in SUPPORTED_FILE_TYPES)}"
+        )
+
+    max_size = MAX_SIZE_BY_TYPE.get(kind, MAX_FILE_SIZE)
+    if size > max_size:
+        raise UploadError(f"Arquivo muito grande. Tamanho máximo: {max_size // (1024*1024)}MB")
+
+    encoding = detect_encoding(head) if kind == "txt" else None
+    return PreparedUpload(file.file, file.filename or "", size, kind, encoding)
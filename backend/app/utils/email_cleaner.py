@@ -0,0 +1,279 @@
+import re
+
+from app.config import THREAD_HISTORY_CHARS, THREAD_MESSAGE_CHARS
+
+# Início de cada mensagem anterior da cadeia (Gmail, Outlook, Apple Mail), em
+# qualquer nível de citação:
+# - "Em seg., 10 de jan. de 2024 às 10:00, Fulano <f@x.com> escreveu:" (às vezes em duas linhas)
+# - "-----Mensagem original-----", "---------- Mensagem encaminhada ---------"
+# - bloco do Outlook: "De: ..." seguido de "Enviado:", "Data:" ou "Para:"
+# Repetições limitadas: cada tentativa examina no máximo duas linhas.
+_BOUNDARY_RE = re.compile(
+    r"^[ \t>]*(?:"
+    r"(?P<gmail>(?:em|on)\b[^\n]{0,300}?(?:\n[ \t>]*[^\n]{0,300}?)?\b(?:escreveu|wrote)[ \t]*:)[ \t]*$"
+    r"|-{2,}[ \t]*(?P<separator>mensagem original|original message|mensagem encaminhada|forwarded message)[ \t]*-{2,}[^\n]*$"
+    r"|(?P<outlook>(?:de|from)[ \t]*:[^\n]*\n[ \t>]*(?:enviad[oa](?: em)?|sent|data|date|para|to)[ \t]*:[^\n]*)$"
+    r")",
+    re.IGNORECASE | re.MULTILINE,
+)
+_HEADER_LINE_RE = re.compile(
+    r"^(?P<name>de|from|data|date|enviad[oa](?: em)?|sent|para|to|cc|cco|bcc|assunto|subject)[ \t]*:[ \t]*(?P<value>.*)$",
+    re.IGNORECASE,
+)
+_GMAIL_MARKERS_RE = re.compile(r"^(?:em|on)\s+|\s*(?:escreveu|wrote)\s*:$|\s*<[^>]*>", re.IGNORECASE)
+
+# Delimitador de assinatura (RFC 3676) e despedidas que costumam abrir a assinatura
+_SIGNATURE_DELIMITER_RE = re.compile(r"^-- ?$")
+_CLOSING_RE = re.compile(
+    r"^(?:atenciosamente|att|atte|abraços?|abs|cordialmente|saudações|grat[oa]|"
+    r"regards|best regards|kind regards|best|cheers)[ \t]*[,.!]?[ \t]*$",
+    re.IGNORECASE,
+)
+_MOBILE_FOOTER_RE = re.compile(
+    r"^(?:enviado do meu|enviado de meu|sent from my|get outlook for|obter o outlook para)\b",
+    re.IGNORECASE,
+)
+
+# Avisos legais de rodapé
+_DISCLAIMER_RE = re.compile(
+    r"^(?:aviso legal|aviso de confidencialidade|confidencialidade|disclaimer|antes de imprimir)\b"
+    r"|(?:esta mensagem|este e-?mail|this (?:e-?mail|message))[^\n]{0,300}?"
+    r"(?:confidencia|privilegiad|privileged|destinatário|intended recipient)",
+    re.IGNORECASE,
+)
+
+# Linhas finais consideradas ao procurar a despedida que abre a assinatura
+SIGNATURE_MAX_LINES = 8
+
+# Abaixo disso a mensagem nova é só um "segue abaixo"/"ok": a mensagem anterior
+# (em geral a encaminhada) entra inteira no histórico, até o limite total
+MIN_NEWEST_CHARS = 20
+
+
+def _compact_lines(lines: list) -> list:
+    """
+    Colapsa espaços dentro das linhas e linhas em branco consecutivas.
+    """
+    compacted = []
+    for line in lines:
+        line = " ".join(line.split())
+        if line or (compacted and compacted[-1]):
+            compacted.append(line)
+
+    while compacted and not compacted[-1]:
+        compacted.pop()
+    return compacted
+
+
+def strip_signature(text: str) -> str:
+    """
+    Remove a assinatura: tudo após o delimitador "-- " ou após uma despedida
+    ("Atenciosamente,", "Abraços") nas últimas linhas, além de rodapés como
+    "Enviado do meu iPhone".
+    """
+    lines = [line for line in text.split("\n") if not _MOBILE_FOOTER_RE.match(line.strip())]
+
+    has_content = False
+    for index, line in enumerate(lines):
+        if has_content and _SIGNATURE_DELIMITER_RE.match(line):
+            lines = lines[:index]
+            break
+        has_content = has_content or bool(line.strip())
+
+    first_candidate = max(1, len(lines) - SIGNATURE_MAX_LINES)
+    for index in range(first_candidate, len(lines)):
+        if _CLOSING_RE.match(lines[index].strip()) and any(line.strip() for line in lines[:index]):
+            lines = lines[:index]
+            break
+
+    return "\n".join(lines)
+
+
+def strip_disclaimers(text: str) -> str:
+    """
+    Remove parágrafos de aviso legal/confidencialidade.
+    """
+    paragraphs = re.split(r"\n[ \t]*\n", text)
+    kept = [paragraph for paragraph in paragraphs if not _DISCLAIMER_RE.search(paragraph.strip())]
+    return "\n\n".join(kept) if kept else text
+
+
+def _chunk_key(chunk: str) -> int:
+    return hash(" ".join(chunk.split()).lower())
+
+
+def _shorten(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit)
+    return text[:cut if cut > limit // 2 else limit].rstrip() + "…"
+
+
+def _message_label(boundary, header_values: dict) -> str:
+    """
+    Identificação curta da mensagem anterior: remetente e data.
+    """
+    if boundary is not None and boundary.group("gmail"):
+        label = " ".join(re.sub(r"\n[ \t>]*", " ", boundary.group("gmail")).split())
+        return _GMAIL_MARKERS_RE.sub("", label).strip(" ,")
+
+    parts = [header_values.get(name) for name in ("de", "from", "enviado", "enviado em", "enviada", "sent", "data", "date")]
+    label = ", ".join(_GMAIL_MARKERS_RE.sub("", part).strip() for part in parts if part)
+    if not label and boundary is not None and boundary.group("separator"):
+        label = boundary.group("separator").capitalize()
+    return label
+
+
+def _parse_message(raw: str, boundary) -> tuple:
+    """
+    Separa uma mensagem anterior em identificação e corpo: remove os
+    marcadores de citação, lê o bloco de cabeçalhos e descarta assinatura e
+    avisos legais.
+
+    Returns:
+        tuple: (identificação, corpo)
+    """
+    lines = [line.lstrip(" \t>") for line in raw.split("\n")]
+    header_values = {}
+    subject = None
+
+    if boundary is not None and boundary.group("outlook"):
+        for line in boundary.group("outlook").split("\n"):
+            match = _HEADER_LINE_RE.match(line.lstrip(" \t>"))
+            if match:
+                header_values[match.group("name").lower()] = match.group("value").strip()
+
+    start = 0
+    while start < len(lines):
+        match = _HEADER_LINE_RE.match(lines[start])
+        if match:
+            name = match.group("name").lower()
+            if name in ("assunto", "subject"):
+                subject = match.group("value").strip()
+            else:
+                header_values.setdefault(name, match.group("value").strip())
+        elif lines[start].strip():
+            break
+        start += 1
+
+    body = strip_signature(strip_disclaimers("\n".join(lines[start:])))
+    if subject:
+        body = f"Assunto: {subject}\n\n{body}"
+    return _message_label(boundary, header_values), body
+
+
+def collapse_thread(text: str, message_chars: int = THREAD_MESSAGE_CHARS, history_chars: int = THREAD_HISTORY_CHARS) -> str:
+    """
+    Reduz uma cadeia de emails à mensagem mais recente e a um resumo sem
+    repetições das anteriores.
+
+    A cadeia é dividida nos cabeçalhos de resposta/encaminhamento (em qualquer
+    nível de citação). A mensagem mais recente é mantida inteira, sem as
+    linhas citadas com ">". Cada mensagem anterior é quebrada em parágrafos
+    cujo hash (texto normalizado) é comparado com os já vistos: trechos
+    citados de novo, assinaturas e avisos legais repetidos são descartados e
+    cada mensagem entra no histórico com até `message_chars` caracteres do seu
+    conteúdo inédito, até `history_chars` no total. Mensagens além do limite
+    são só contadas.
+
+    Tempo linear no tamanho do texto: cada mensagem é percorrida uma vez e as
+    comparações são feitas por hash.
+
+    Args:
+        text (str): Texto do email ou da cadeia encaminhada
+        message_chars (int): Caracteres por mensagem anterior no resumo
+        history_chars (int): Caracteres do resumo inteiro
+
+    Returns:
+        str: Mensagem mais recente seguida de "Histórico da conversa", se houver
+    """
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    boundaries = list(_BOUNDARY_RE.finditer(text))
+
+    head = text[:boundaries[0].start()] if boundaries else text
+    newest_lines = []
+    quoted_lines = []
+    for line in head.split("\n"):
+        (quoted_lines if line.lstrip().startswith(">") else newest_lines).append(line)
+
+    newest = strip_signature(strip_disclaimers("\n".join(newest_lines)))
+    if not boundaries and not quoted_lines:
+        return newest
+
+    seen = {_chunk_key(chunk) for chunk in re.split(r"\n[ \t]*\n", newest) if chunk.strip()}
+
+    # Mensagens anteriores: citações soltas na mensagem nova e, depois, cada trecho entre cabeçalhos
+    messages = []
+    if quoted_lines:
+        messages.append(("\n".join(quoted_lines), None))
+    for index, boundary in enumerate(boundaries):
+        end = boundaries[index + 1].start() if index + 1 < len(boundaries) else len(text)
+        messages.append((text[boundary.end():end], boundary))
+
+    newest = newest.strip()
+    promote = len(newest) < MIN_NEWEST_CHARS
+    history = []
+    previous = 0
+    used = 0
+    repeated = 0
+    omitted = 0
+
+    for raw, boundary in messages:
+        # Separador seguido direto do bloco de cabeçalhos: a mensagem começa no próximo limite
+        if not raw.strip(" \t\n>"):
+            continue
+        previous += 1
+
+        if used >= history_chars:
+            omitted += 1
+            continue
+
+        label, body = _parse_message(raw, boundary)
+
+        unique = []
+        for chunk in re.split(r"\n[ \t]*\n", body):
+            if not chunk.strip():
+                continue
+            key = _chunk_key(chunk)
+            if key not in seen:
+                seen.add(key)
+                unique.append(" ".join(chunk.split()))
+
+        if not unique:
+            repeated += 1
+            continue
+
+        limit = history_chars - used if promote else min(message_chars, history_chars - used)
+        promote = False
+        summary = _shorten(" ".join(unique), limit)
+        history.append(f"- {label}: {summary}" if label else f"- {summary}")
+        used += len(summary)
+
+    if not history:
+        return newest
+
+    notes = [f"mensagens anteriores: {previous}"]
+    if repeated:
+        notes.append(f"repetidas omitidas: {repeated}")
+    if omitted:
+        notes.append(f"além do limite: {omitted}")
+
+    return f"{newest}\n\nHistórico da conversa ({', '.join(notes)}):\n" + "\n".join(history)
+
+
+def clean_email(text: str) -> str:
+    """
+    Compacta o email para o prompt: sem linhas e espaços redundantes.
+
+    A cadeia de respostas, a assinatura e os avisos legais já foram tratados
+    na entrada (`collapse_thread`, aplicado uma única vez por texto, arquivo,
+    lote e job).
+
+    Args:
+        text (str): Texto do email, com a cadeia já reduzida
+
+    Returns:
+        str: Texto limpo
+    """
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(_compact_lines(text.split("\n")))
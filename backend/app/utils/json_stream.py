@@ -0,0 +1,247 @@
+import json
+import re
+
+_WHITESPACE = " \t\r\n"
+_STRING_RUN = re.compile(r'[^"\\]+')
+_SCALAR_RUN = re.compile(r'[^,}\]\s]+')
+
+# Estados do parser
+_BEFORE_OBJECT = 0
+_EXPECT_KEY = 1
+_KEY = 2
+_EXPECT_COLON = 3
+_EXPECT_VALUE = 4
+_STRING = 5
+_SCALAR = 6
+_NESTED = 7
+_AFTER_VALUE = 8
+_DONE = 9
+
+
+class IncrementalJSONParser:
+    """
+    Parser incremental do objeto JSON plano devolvido pela IA em streaming.
+
+    Recebe o texto em pedaços arbitrários (inclusive cortando escapes como
+    `\\u00e7` ao meio) e devolve eventos assim que cada trecho é decodificado:
+
+    - `("delta", chave, texto)`: novo trecho de um valor string ainda aberto
+    - `("value", chave, valor)`: valor completo de um membro do objeto
+
+    Apenas o objeto de nível mais alto é acompanhado membro a membro; valores
+    aninhados (objetos e listas) são entregues inteiros ao se fecharem.
+    Qualquer texto antes do primeiro `{` (ex.: ```json) é ignorado.
+
+    Raises:
+        ValueError: Se o texto não for um objeto JSON válido
+    """
+
+    def __init__(self):
+        self.result = {}
+        self.done = False
+        self._state = _BEFORE_OBJECT
+        self._key = None
+        self._buffer = []
+        self._pending = []
+        self._escape = ""
+        self._high_surrogate = None
+        self._depth = 0
+        self._nested_in_string = False
+        self._nested_escape = False
+
+    def feed(self, chunk: str) -> list:
+        """
+        Processa mais um pedaço do texto.
+
+        Returns:
+            list: Eventos produzidos por este pedaço
+        """
+        events = []
+        i = 0
+        n = len(chunk)
+
+        while i < n:
+            state = self._state
+
+            if state == _STRING or state == _KEY:
+                i = self._read_string(chunk, i, events)
+
+            elif state == _SCALAR:
+                match = _SCALAR_RUN.match(chunk, i)
+                if match:
+                    self._buffer.append(match.group())
+                    i = match.end()
+                if i < n:
+                    self._finish_value(json.loads("".join(self._buffer)), events)
+
+            elif state == _NESTED:
+                i = self._read_nested(chunk, i, events)
+
+            elif state == _BEFORE_OBJECT:
+                start = chunk.find("{", i)
+                if start < 0:
+                    break
+                self._state = _EXPECT_KEY
+                i = start + 1
+
+            elif state == _DONE:
+                break
+
+            else:
+                char = chunk[i]
+                i += 1
+                if char in _WHITESPACE:
+                    continue
+                self._read_structural(char)
+
+        if self._state == _STRING:
+            self._flush_delta(events)
+
+        return events
+
+    def _read_structural(self, char: str) -> None:
+        state = self._state
+
+        if state == _EXPECT_KEY:
+            if char == '"':
+                self._state = _KEY
+                self._buffer = []
+            elif char == "}":
+                self._finish_object()
+            elif char != ",":
+                raise ValueError(f"Esperada uma chave JSON, recebido {char!r}")
+
+        elif state == _EXPECT_COLON:
+            if char != ":":
+                raise ValueError(f"Esperado ':', recebido {char!r}")
+            self._state = _EXPECT_VALUE
+
+        elif state == _EXPECT_VALUE:
+            self._buffer = []
+            if char == '"':
+                self._state = _STRING
+                self._pending = []
+            elif char in "{[":
+                self._state = _NESTED
+                self._buffer.append(char)
+                self._depth = 1
+                self._nested_in_string = False
+                self._nested_escape = False
+            else:
+                self._state = _SCALAR
+                self._buffer.append(char)
+
+        elif state == _AFTER_VALUE:
+            if char == ",":
+                self._state = _EXPECT_KEY
+            elif char == "}":
+                self._finish_object()
+            else:
+                raise ValueError(f"Esperado ',' ou '}}', recebido {char!r}")
+
+    def _read_string(self, chunk: str, i: int, events: list) -> int:
+        n = len(chunk)
+
+        while i < n:
+            if self._escape:
+                self._escape += chunk[i]
+                i += 1
+                if (len(self._escape) == 2 and self._escape[1] != "u") or len(self._escape) == 6:
+                    decoded = json.loads(f'"{self._escape}"')
+                    self._escape = ""
+                    self._append_text(self._merge_surrogate(decoded))
+                continue
+
+            match = _STRING_RUN.match(chunk, i)
+            if match:
+                self._append_text(self._merge_surrogate(match.group()))
+                i = match.end()
+                continue
+
+            char = chunk[i]
+            i += 1
+            if char == "\\":
+                self._escape = "\\"
+                continue
+
+            # Aspas de fechamento
+            if self._high_surrogate is not None:
+                self._append_text(self._merge_surrogate(""))
+
+            if self._state == _KEY:
+                self._key = "".join(self._buffer)
+                self._state = _EXPECT_COLON
+            else:
+                self._flush_delta(events)
+                self._finish_value("".join(self._buffer), events)
+            return i
+
+        return i
+
+    def _merge_surrogate(self, text: str) -> str:
+        """
+        Junta pares substitutos UTF-16 que chegaram em escapes separados.
+        """
+        if self._high_surrogate is not None:
+            high = self._high_surrogate
+            self._high_surrogate = None
+            if text and "\udc00" <= text[0] <= "\udfff":
+                pair = chr(0x10000 + ((ord(high) - 0xD800) << 10) + (ord(text[0]) - 0xDC00))
+                return pair + text[1:]
+            text = "\ufffd" + text
+
+        if len(text) == 1 and "\ud800" <= text <= "\udbff":
+            self._high_surrogate = text
+            return ""
+        return text
+
+    def _append_text(self, text: str) -> None:
+        if not text:
+            return
+        self._buffer.append(text)
+        if self._state == _STRING:
+            self._pending.append(text)
+
+    def _flush_delta(self, events: list) -> None:
+        if self._pending:
+            events.append(("delta", self._key, "".join(self._pending)))
+            self._pending = []
+
+    def _read_nested(self, chunk: str, i: int, events: list) -> int:
+        n = len(chunk)
+        start = i
+
+        while i < n:
+            char = chunk[i]
+            i += 1
+
+            if self._nested_in_string:
+                if self._nested_escape:
+                    self._nested_escape = False
+                elif char == "\\":
+                    self._nested_escape = True
+                elif char == '"':
+                    self._nested_in_string = False
+            elif char == '"':
+                self._nested_in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._buffer.append(chunk[start:i])
+                    self._finish_value(json.loads("".join(self._buffer)), events)
+                    return i
+
+        self._buffer.append(chunk[start:i])
+        return i
+
+    def _finish_value(self, value, events: list) -> None:
+        self.result[self._key] = value
+        events.append(("value", self._key, value))
+        self._buffer = []
+        self._state = _AFTER_VALUE
+
+    def _finish_object(self) -> None:
+        self._state = _DONE
+        self.done = True
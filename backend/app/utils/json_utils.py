@@ -21,8 +21,8 @@ def clean_and_parse_json(text: str) -> dict:
         return json.loads(clean)
         
     except json.JSONDecodeError as e:
-        logger.warning(f"Erro ao fazer parse do JSON da IA: {e}")
-        logger.warning(f"Texto recebido: {text[:200]}...")
+        logger.warning("Erro ao fazer parse do JSON da IA: %s", e)
+        logger.warning("Texto recebido: %s...", text[:200])
         
         # Retorna estrutura de erro padrão
         return {
@@ -32,7 +32,7 @@ def clean_and_parse_json(text: str) -> dict:
             "resposta_sugerida": "Tente novamente. Se o erro persistir, verifique a configuração da API."
         }
     except Exception as e:
-        logger.error(f"Erro inesperado ao processar JSON: {e}")
+        logger.error("Erro inesperado ao processar JSON: %s", e)
         return {
             "categoria": "Erro",
             "confianca": 0,
@@ -0,0 +1,211 @@
+import random
+import re
+import time
+from typing import Optional
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Converte durações no formato dos cabeçalhos da OpenAI ("20ms", "6m0s", "1.5s")
+    ou em segundos ("2") para segundos.
+    """
+    if not value:
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """
+    Espera exponencial com jitter completo: uniforme entre 0 e base * 2^tentativa.
+    """
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    Balde de tokens com reposição contínua, dimensionado por minuto.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / 60.0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self.refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= amount
+
+    def sync(self, limit: Optional[float], remaining: Optional[float]) -> None:
+        """
+        Ajusta capacidade e saldo aos valores informados pelo servidor.
+        """
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.tokens = min(self.tokens, float(remaining))
+
+
+class RateLimitWaitTimeout(Exception):
+    """A espera por capacidade ultrapassaria o prazo da chamada."""
+
+
+class AdaptiveRateLimiter:
+    """
+    Limitador de requisições e tokens por minuto do lado do cliente.
+
+    Mantém dois baldes (RPM e TPM) que se ajustam aos cabeçalhos
+    `x-ratelimit-*` devolvidos pela OpenAI e pausa todas as chamadas quando o
+    servidor responde 429 com `retry-after`. Não espera sozinho: o
+    `FairScheduler` (ver `tenant_service`) consulta `wait_time` e chama
+    `consume` ao liberar cada chamada, na vez de cada tenant.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.blocked_until = 0.0
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        """
+        Segundos até haver capacidade para uma requisição com `tokens` tokens.
+        """
+        return max(
+            self.blocked_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+        )
+
+    def consume(self, tokens: int) -> None:
+        self.requests.consume(1)
+        self.tokens.consume(tokens)
+
+    def update_from_headers(self, headers) -> None:
+        """
+        Sincroniza os baldes com os cabeçalhos de rate limit da resposta.
+        """
+        def number(name):
+            value = headers.get(name)
+            try:
+                return float(value) if value is not None else None
+            except ValueError:
+                return None
+
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        self.requests.sync(number("x-ratelimit-limit-requests"), number("x-ratelimit-remaining-requests"))
+        self.tokens.sync(number("x-ratelimit-limit-tokens"), number("x-ratelimit-remaining-tokens"))
+
+    def record_usage(self, estimated: int, actual: Optional[int]) -> None:
+        """
+        Corrige o balde de tokens com o consumo real informado pela API.
+        """
+        if actual is not None:
+            self.tokens.tokens += estimated - actual
+
+    def penalize(self, retry_after: Optional[float]) -> None:
+        """
+        Bloqueia novas chamadas após um 429 pelo tempo indicado pelo servidor.
+        """
+        self.blocked_until = max(self.blocked_until, time.monotonic() + (retry_after or 1.0))
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return {
+            "requests_per_minute": self.requests.capacity,
+            "requests_available": round(self.requests.tokens, 1),
+            "tokens_per_minute": self.tokens.capacity,
+            "tokens_available": round(self.tokens.tokens, 1),
+            "blocked_for_seconds": round(max(0.0, self.blocked_until - now), 3),
+        }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker clássico (fechado, aberto, meio-aberto).
+
+    Após `failure_threshold` falhas consecutivas o circuito abre e rejeita
+    chamadas por `reset_timeout` segundos; depois disso uma única chamada de
+    teste é liberada e, se tiver sucesso, o circuito volta a fechar.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def release(self) -> None:
+        """
+        Libera a chamada de teste sem registrar resultado (ex.: cancelamento).
+        """
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "rejected": self.rejected,
+        }
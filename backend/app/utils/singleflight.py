@@ -0,0 +1,110 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """
+    Uma execução compartilhada: a task, quantos a aguardam e se o registro
+    único (ver `SingleFlight.do_claim`) já foi reivindicado.
+    """
+
+    __slots__ = ("task", "callers", "claimed")
+
+    def __init__(self, task):
+        self.task = task
+        self.callers = 0
+        self.claimed = False
+
+
+class SingleFlight:
+    """
+    Deduplicação de chamadas assíncronas em andamento.
+
+    Chamadas concorrentes com a mesma chave aguardam uma única execução
+    compartilhada e recebem o mesmo resultado (ou a mesma exceção). A execução
+    roda em uma task própria: se quem a iniciou for cancelado (ex.: cliente
+    desconectou), os demais continuam aguardando normalmente.
+
+    `counter`, se informado, é um contador do Prometheus com o rótulo
+    `result`, incrementado com "leader" (execução nova) ou "coalesced"
+    (aguardou uma em andamento).
+    """
+
+    def __init__(self, counter=None):
+        self._calls = {}
+        self._leader_count = counter.labels("leader") if counter is not None else None
+        self._coalesced_count = counter.labels("coalesced") if counter is not None else None
+        self._waiting = 0
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn):
+        """
+        Executa `fn()` uma única vez por chave entre as chamadas simultâneas.
+
+        Args:
+            key (str): Chave de deduplicação
+            fn: Função sem argumentos que retorna uma corrotina
+
+        Returns:
+            O resultado da execução compartilhada
+        """
+        result, _ = await self.do_claim(key, fn)
+        return result
+
+    async def do_claim(self, key: str, fn):
+        """
+        Como `do`, mas informa também quantas chamadas compartilharam a
+        execução, para apenas uma delas: a primeira a receber o resultado.
+        Serve para registrar a execução uma única vez, mesmo que quem a
+        iniciou tenha sido cancelado.
+
+        Returns:
+            tuple: (resultado, número de chamadas que aguardaram a execução
+            ou None para as demais)
+        """
+        flight = self._calls.get(key)
+
+        if flight is None:
+            self.leaders += 1
+            if self._leader_count is not None:
+                self._leader_count.inc()
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._calls[key] = flight
+            flight.task.add_done_callback(lambda t: self._finish(key, flight))
+        else:
+            self.coalesced += 1
+            if self._coalesced_count is not None:
+                self._coalesced_count.inc()
+            logger.debug("Chamada idêntica em andamento - aguardando resultado compartilhado (%s)", key[:12])
+
+        flight.callers += 1
+        self._waiting += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            self._waiting -= 1
+
+        # `_finish` já tirou a chave de `_calls`: o total de chamadas é final
+        if flight.claimed:
+            return result, None
+        flight.claimed = True
+        return result, flight.callers
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        task = flight.task
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+        # Marca a exceção como lida caso todos os interessados tenham sido cancelados
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "waiters": self._waiting,
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,73 @@
+import logging
+import re
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+# Aproximação de BPE: pedaços de até 4 letras/dígitos ou um símbolo por token
+_APPROX_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+class ApproximateTokenizer:
+    """
+    Contagem aproximada usada quando o tiktoken não está disponível.
+    """
+
+    name = "approximate"
+
+    def count(self, text: str) -> int:
+        return sum(1 for _ in _APPROX_TOKEN_RE.finditer(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        last = next(islice(_APPROX_TOKEN_RE.finditer(text), max_tokens - 1, None), None)
+        return text if last is None else text[:last.end()]
+
+
+class TiktokenTokenizer:
+    """
+    Tokenizador real do modelo (tiktoken), rodando localmente.
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.name = encoding.name
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.encoding.encode_ordinary(text)
+        if len(tokens) <= max_tokens:
+            return text
+        # Um caractere multibyte pode ficar dividido entre tokens: a sobra
+        # decodificada como U+FFFD é descartada
+        return self.encoding.decode(tokens[:max(0, max_tokens)]).rstrip("\ufffd")
+
+
+def load_tokenizer(model: str, encoding_name: str = None):
+    """
+    Carrega o tiktoken para o modelo (ou a codificação informada).
+
+    Sem o pacote, ou sem conseguir carregar a codificação (o arquivo BPE é
+    baixado no primeiro uso, ver `TIKTOKEN_CACHE_DIR`), cai para
+    `ApproximateTokenizer`.
+    """
+    try:
+        import tiktoken
+
+        if encoding_name:
+            encoding = tiktoken.get_encoding(encoding_name)
+        else:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+
+    except Exception as e:
+        logger.warning("tiktoken indisponível (%s): usando contagem aproximada de tokens", e)
+        return ApproximateTokenizer()
+
+    logger.info("Tokenizador carregado: %s", encoding.name)
+    return TiktokenTokenizer(encoding)
@@ -0,0 +1,145 @@
+"""
+Benchmark da subida do servidor.
+
+Para cada modo, inicia o servidor em um subprocesso e mede:
+- tempo até a primeira resposta 200 em /health;
+- tempo até todos os workers terem concluído o startup (log do lifespan);
+- memória do conjunto de processos: soma do RSS e do PSS (RSS com as páginas
+  compartilhadas divididas entre os processos; o preload reduz o PSS).
+
+Modos: `uvicorn` com um processo, `uvicorn --workers N` e `app.cli.serve`
+(gunicorn) com e sem `--preload`.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_cold_start --workers 4 --repeat 3
+"""
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+READY_MARKER = "API Classificador de Emails iniciada"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def modes(workers: int) -> dict:
+    serve = [sys.executable, "-m", "app.cli.serve", "--host", "127.0.0.1", "--workers", str(workers)]
+    return {
+        "uvicorn (1 processo)": ([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1"], 1),
+        f"uvicorn --workers {workers}": (
+            [sys.executable, "-m", "app.cli.serve", "--uvicorn", "--host", "127.0.0.1", "--workers", str(workers)],
+            workers,
+        ),
+        f"serve --workers {workers}": (serve, workers),
+        f"serve --workers {workers} --no-preload": (serve + ["--no-preload"], workers),
+    }
+
+
+def process_tree(pid: int) -> list:
+    pids = [pid]
+    for child in pids:
+        try:
+            with open(f"/proc/{child}/task/{child}/children") as f:
+                pids.extend(int(p) for p in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def memory_kb(pid: int) -> tuple:
+    rss = pss = 0
+    for child in process_tree(pid):
+        try:
+            with open(f"/proc/{child}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Rss:"):
+                        rss += int(line.split()[1])
+                    elif line.startswith("Pss:"):
+                        pss += int(line.split()[1])
+        except OSError:
+            pass
+    return rss, pss
+
+
+def measure(command: list, port: int, workers: int, timeout: float) -> dict:
+    env = dict(os.environ, PORT=str(port), LOG_LEVEL="INFO")
+    env.setdefault("OPENAI_API_KEY", "sk-fake-benchmark")
+
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryFile("w+") as log:
+        env["JOBS_DB_PATH"] = os.path.join(tmp, "jobs.sqlite3")
+        env["JOBS_SPOOL_DIR"] = os.path.join(tmp, "spool")
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+        start = time.perf_counter()
+        process = subprocess.Popen(command + ["--port", str(port)], env=env, stdout=log, stderr=subprocess.STDOUT,
+                                   start_new_session=True)
+        first_ok = all_ready = None
+        try:
+            while time.perf_counter() - start < timeout:
+                if process.poll() is not None:
+                    log.seek(0)
+                    raise RuntimeError(f"servidor encerrou: {log.read()[-2000:]}")
+                if first_ok is None:
+                    try:
+                        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                            if response.status == 200:
+                                first_ok = time.perf_counter() - start
+                    except OSError:
+                        pass
+                log.seek(0)
+                if log.read().count(READY_MARKER) >= workers:
+                    all_ready = time.perf_counter() - start
+                if first_ok is not None and all_ready is not None:
+                    break
+                time.sleep(0.02)
+
+            # Deixa os workers estabilizarem antes de medir a memória
+            time.sleep(0.5)
+            rss, pss = memory_kb(process.pid)
+        finally:
+            os.killpg(process.pid, signal.SIGTERM)
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+
+    return {"first_ok": first_ok, "all_ready": all_ready, "rss_kb": rss, "pss_kb": pss}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de subida e memória do servidor")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import app.main"], check=True, capture_output=True,
+                   env=dict(os.environ, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "sk-fake-benchmark")))
+    print(f"Importar app.main (processo novo): {time.perf_counter() - start:.2f}s\n")
+
+    print(f"{'modo':<32} {'1º 200 (s)':>11} {'todos (s)':>10} {'RSS (MB)':>9} {'PSS (MB)':>9}")
+    for name, (command, workers) in modes(args.workers).items():
+        runs = [measure(command, free_port(), workers, args.timeout) for _ in range(args.repeat)]
+
+        def median(key):
+            values = [run[key] for run in runs if run[key] is not None]
+            return statistics.median(values) if values else float("nan")
+
+        print(f"{name:<32} {median('first_ok'):>11.2f} {median('all_ready'):>10.2f} "
+              f"{median('rss_kb') / 1024:>9.0f} {median('pss_kb') / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark de concorrência do caminho de classificação.
+
+Sobe o servidor fake da OpenAI em um subprocesso e compara:
+- bloqueante: N chamadas a `analyze_with_gpt` (cliente síncrono) dentro do
+  event loop, como a rota fazia antes;
+- assincrono: N requisições concorrentes a `POST /api/v1/classify`, que
+  aguarda `analyze_with_gpt_async`.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_concurrency --requests 200 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+SAMPLE_TEXT = "Bom dia, preciso que o boleto de R$ 1.250,00 com vencimento em 10/11 seja pago hoje. Urgente."
+
+
+def start_fake_server(port: int, latency: float, *extra_args: str) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_openai", "--port", str(port), "--latency", str(latency), *extra_args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    import httpx
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=0.5)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+
+    proc.kill()
+    raise RuntimeError("Servidor fake da OpenAI não iniciou")
+
+
+async def run_blocking(n: int) -> float:
+    from app.resources import open_resources
+    from app.services.ai_service import analyze_with_gpt
+
+    open_resources(jobs=False)
+
+    async def handler():
+        # Reproduz a rota antiga: chamada síncrona dentro de uma corrotina
+        return analyze_with_gpt(SAMPLE_TEXT)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(n)))
+    return time.perf_counter() - start
+
+
+async def run_async(n: int) -> float:
+    import httpx
+    from app.main import app
+
+    # O ASGITransport não roda o lifespan, que cria os clientes e os recursos
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as http:
+            start = time.perf_counter()
+            responses = await asyncio.gather(
+                *(http.post("/api/v1/classify", data={"text": SAMPLE_TEXT}) for _ in range(n))
+            )
+            elapsed = time.perf_counter() - start
+
+    failures = sum(1 for r in responses if r.status_code != 200)
+    if failures:
+        print(f"   Aviso: {failures} requisições falharam")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concorrência da classificação")
+    parser.add_argument("--requests", type=int, default=200, help="Requisições no modo assíncrono")
+    parser.add_argument("--blocking-requests", type=int, default=10, help="Requisições no modo bloqueante")
+    parser.add_argument("--latency", type=float, default=0.5, help="Latência do servidor fake (s)")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    os.environ["OPENAI_API_KEY"] = "sk-fake-benchmark"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+
+    proc = start_fake_server(args.port, args.latency)
+    try:
+        blocking = asyncio.run(run_blocking(args.blocking_requests))
+        concurrent = asyncio.run(run_async(args.requests))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print(f"Latência simulada da OpenAI: {args.latency}s")
+    print(f"bloqueante : {args.blocking_requests:5d} req em {blocking:7.2f}s "
+          f"-> {args.blocking_requests / blocking:8.1f} req/s")
+    print(f"assincrono : {args.requests:5d} req em {concurrent:7.2f}s "
+          f"-> {args.requests / concurrent:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Microbenchmark da contagem de palavras-chave do pós-processamento.
+
+Compara a implementação anterior (um `in` por palavra sobre o texto inteiro
+e regex não compiladas) com `keyword_service.score_text`.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_keywords --sizes 4000 100000
+"""
+import argparse
+import os
+import random
+import re
+import timeit
+
+LEGACY_KEYWORDS = {
+    'acao': ['pagar', 'resolver', 'corrigir', 'implementar', 'desenvolver', 'testar',
+             'configurar', 'instalar', 'atualizar', 'revisar', 'analisar', 'verificar'],
+    'tecnico': ['api', 'bug', 'erro', 'sistema', 'código', 'deploy', 'servidor',
+                'banco', 'dados', 'endpoint', 'request', 'response', 'integração'],
+    'financeiro': ['pagar', 'fatura', 'boleto', 'pagamento', 'valor', 'r$', 'reais',
+                   'débito', 'crédito', 'cobrança', 'pendência'],
+    'urgencia': ['urgente', 'imediato', 'asap', 'prioritário', 'crítico', 'bloqueio']
+}
+
+
+def legacy_score(text: str) -> dict:
+    texto_lower = text.lower()
+    scores = {
+        name: sum(1 for word in words if word in texto_lower)
+        for name, words in LEGACY_KEYWORDS.items()
+    }
+    scores["tem_valor_monetario"] = bool(re.search(r'r\$\s*\d+|reais|\d+[.,]\d+', texto_lower))
+    scores["tem_data"] = bool(re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}/\d{1,2}', texto_lower))
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark do matcher de palavras-chave")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4000, 100000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake-benchmark")
+    os.environ["CACHE_BACKEND"] = "none"
+    from app.config import MAX_TEXT_LENGTH
+    from app.resources import open_resources
+    from app.services.keyword_service import get_matcher, score_text
+    from benchmarks.corpus import make_paragraph
+
+    open_resources(jobs=False)
+
+    rng = random.Random(0)
+    print(f"{'chars':>8} {'anterior (µs)':>14} {'compilado (µs)':>15} {'compilado s/ truncar (µs)':>26}")
+
+    for size in args.sizes:
+        text = ""
+        while len(text) < size:
+            text += make_paragraph(rng) + " "
+        text = text[:size]
+
+        legacy = timeit.timeit(lambda: legacy_score(text), number=args.repeat) / args.repeat
+        compiled = timeit.timeit(lambda: score_text(text), number=args.repeat) / args.repeat
+        matcher = get_matcher()
+        full = timeit.timeit(lambda: matcher.count(text.lower()), number=args.repeat) / args.repeat
+
+        print(f"{size:>8} {legacy * 1e6:>14.1f} {compiled * 1e6:>15.1f} {full * 1e6:>26.1f}")
+
+    print(f"(score_text analisa apenas os primeiros {MAX_TEXT_LENGTH} caracteres)")
+
+
+if __name__ == "__main__":
+    main()
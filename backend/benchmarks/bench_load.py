@@ -0,0 +1,368 @@
+"""
+Teste de carga da API contra o servidor fake da OpenAI.
+
+Sobe o servidor fake (latência, variação, erros e JSON malformado
+configuráveis, reproduzíveis com `--seed`) e a API em subprocessos separados,
+como em produção, e dispara requisições HTTP concorrentes por cenário:
+- single: `POST /api/v1/classify` com texto (emails avulsos e com respostas citadas);
+- batch: `POST /api/v1/classify/batch` em JSON, `--batch-size` emails por requisição;
+- pdf: `POST /api/v1/classify` com um PDF de `--pdf-pages` páginas;
+- thread: `POST /api/v1/classify` com um .txt de uma cadeia de `--thread-messages` respostas.
+
+Para cada cenário mede latência (p50/p95/p99), vazão, falhas HTTP,
+classificações "Erro" e o RSS do conjunto de processos da API (início, pico
+e fim). O resultado é gravado em JSON; `--baseline` compara com uma execução
+anterior e termina com código 1 se houver regressão acima de `--tolerance`.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_load --requests 200 --concurrency 20 --out resultados/atual.json
+    python -m benchmarks.bench_load --scenarios single batch --malformed-rate 0.05 --baseline resultados/main.json
+    python -m benchmarks.bench_load --compare resultados/main.json resultados/atual.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from benchmarks.bench_cold_start import free_port, memory_kb
+from benchmarks.bench_concurrency import start_fake_server
+from benchmarks.corpus import make_email_corpus, make_pdf, make_thread
+
+SCENARIOS = ("single", "batch", "pdf", "thread")
+
+# Limite do campo `text` de /classify
+MAX_FORM_TEXT = 5000
+
+# Métricas comparadas com a execução de referência: (chave, maior é melhor)
+COMPARED = (("p50_ms", False), ("p95_ms", False), ("p99_ms", False), ("throughput_rps", True), ("rss_peak_mb", False))
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """
+    Percentil pelo método do posto mais próximo (valores já ordenados).
+    """
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def build_requests(scenario: str, count: int, args) -> list:
+    """
+    Gera os argumentos de cada requisição do cenário (corpus sintético
+    determinístico a partir de `--seed`). Textos distintos: sem o cache, todo
+    email passa pela IA.
+    """
+    if scenario == "single":
+        texts = make_email_corpus(count, seed=args.seed)
+        return [{"data": {"text": f"{text[:MAX_FORM_TEXT - 20]} Pedido {i}."}} for i, text in enumerate(texts)]
+
+    if scenario == "batch":
+        texts = make_email_corpus(count * args.batch_size, seed=args.seed)
+        return [
+            {"json": {"emails": [{"id": str(j), "text": text} for j, text in enumerate(texts[i:i + args.batch_size])]}}
+            for i in range(0, len(texts), args.batch_size)
+        ]
+
+    if scenario == "pdf":
+        # Poucos PDFs distintos bastam: o cache fica desligado
+        pdfs = [make_pdf(args.pdf_pages, seed=args.seed + i) for i in range(min(count, 8))]
+        return [{"files": {"file": (f"email{i}.pdf", pdfs[i % len(pdfs)], "application/pdf")}} for i in range(count)]
+
+    if scenario == "thread":
+        rng = random.Random(args.seed)
+        threads = [make_thread(rng, args.thread_messages).encode("utf-8") for _ in range(min(count, 8))]
+        return [{"files": {"file": (f"cadeia{i}.txt", threads[i % len(threads)], "text/plain")}} for i in range(count)]
+
+    raise ValueError(f"Cenário desconhecido: {scenario}")
+
+
+class RSSSampler:
+    """
+    Amostra o RSS do conjunto de processos da API em uma thread, enquanto o
+    cenário roda.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, memory_kb(self.pid)[0])
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+async def run_scenario(base_url: str, scenario: str, args, server_pid: int) -> dict:
+    import httpx
+
+    path = "/api/v1/classify/batch" if scenario == "batch" else "/api/v1/classify"
+    requests = build_requests(scenario, args.warmup + args.requests, args)
+    items_per_request = args.batch_size if scenario == "batch" else 1
+
+    latencies = []
+    failures = 0
+    error_results = 0
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout, limits=limits) as http:
+
+        async def send(kwargs: dict, record: bool) -> None:
+            nonlocal failures, error_results
+            start = time.perf_counter()
+            try:
+                response = await http.post(path, **kwargs)
+                elapsed = time.perf_counter() - start
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                elapsed = time.perf_counter() - start
+                ok = False
+
+            if not record:
+                return
+            latencies.append(elapsed)
+            if not ok:
+                failures += 1
+                return
+
+            body = response.json()
+            results = body.get("resultados", []) if scenario == "batch" else [body]
+            error_results += sum(1 for result in results if result.get("categoria") == "Erro")
+
+        async def worker(queue: list, record: bool) -> None:
+            while queue:
+                await send(queue.pop(), record)
+
+        async def run(batch: list, record: bool) -> float:
+            queue = list(reversed(batch))
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(queue, record) for _ in range(args.concurrency)))
+            return time.perf_counter() - start
+
+        await run(requests[:args.warmup], record=False)
+
+        rss_start = memory_kb(server_pid)[0]
+        with RSSSampler(server_pid) as sampler:
+            elapsed = await run(requests[args.warmup:], record=True)
+        rss_end = memory_kb(server_pid)[0]
+
+    latencies.sort()
+    completed = len(latencies)
+    return {
+        "endpoint": path,
+        "requests": completed,
+        "items": completed * items_per_request,
+        "concurrency": args.concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(completed / elapsed, 2),
+        "items_per_s": round(completed * items_per_request / elapsed, 2),
+        "failures": failures,
+        "error_results": error_results,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+        "rss_start_mb": round(rss_start / 1024, 1),
+        "rss_peak_mb": round(max(sampler.peak_kb, rss_end) / 1024, 1),
+        "rss_end_mb": round(rss_end / 1024, 1),
+    }
+
+
+def start_api(port: int, fake_port: int, args, workdir: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="sk-fake-benchmark",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{fake_port}/v1",
+        JOBS_DB_PATH=os.path.join(workdir, "jobs.sqlite3"),
+        JOBS_SPOOL_DIR=os.path.join(workdir, "spool"),
+        LOG_LEVEL="WARNING",
+        # Limites do cliente iguais aos anunciados pelo fake: mede o backend, não a cota
+        OPENAI_TPM_LIMIT=str(args.tpm),
+        OPENAI_RPM_LIMIT="100000",
+    )
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    env.pop("AUDIT_LOG_DIR", None)
+    if not args.cache:
+        env["CACHE_BACKEND"] = "none"
+
+    if args.workers > 1:
+        command = [sys.executable, "-m", "app.cli.serve", "--workers", str(args.workers)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--log-level", "warning"]
+    process = subprocess.Popen(
+        command + ["--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+
+    import httpx
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("A API encerrou durante a inicialização")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+
+    process.kill()
+    raise RuntimeError("A API não iniciou")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """
+    Imprime a variação de cada métrica em relação à execução de referência.
+
+    Returns:
+        list: Regressões acima de `tolerance` ("cenário.métrica")
+    """
+    regressions = []
+    print(f"\nComparação com {baseline['meta'].get('git_commit') or 'referência'} "
+          f"({baseline['meta'].get('created_at', '')}), tolerância {tolerance:.0%}")
+    print(f"{'cenário':<8} {'métrica':<15} {'antes':>10} {'depois':>10} {'variação':>9}")
+
+    for scenario, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(scenario)
+        if before is None:
+            continue
+        for key, higher_is_better in COMPARED:
+            old, new = before.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = "  REGRESSÃO"
+                regressions.append(f"{scenario}.{key}")
+            print(f"{scenario:<8} {key:<15} {old:>10.1f} {new:>10.1f} {change:>+8.1%}{flag}")
+
+    return regressions
+
+
+def print_results(results: dict) -> None:
+    print(f"{'cenário':<8} {'req':>6} {'req/s':>8} {'itens/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'falhas':>7} {'Erro':>5} {'RSS pico MB':>12}")
+    for scenario, r in results["scenarios"].items():
+        print(f"{scenario:<8} {r['requests']:>6} {r['throughput_rps']:>8.1f} {r['items_per_s']:>8.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+              f"{r['failures']:>7} {r['error_results']:>5} {r['rss_peak_mb']:>12.1f}")
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API com o servidor fake da OpenAI")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Requisições medidas por cenário")
+    parser.add_argument("--warmup", type=int, default=10, help="Requisições descartadas antes de medir")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requisições simultâneas")
+    parser.add_argument("--batch-size", type=int, default=50, help="Emails por requisição no cenário batch")
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    parser.add_argument("--thread-messages", type=int, default=60, help="Mensagens da cadeia no cenário thread")
+    parser.add_argument("--workers", type=int, default=1, help="Workers da API (>1 usa app.cli.serve)")
+    parser.add_argument("--cache", action="store_true", help="Mantém o cache de classificações da configuração")
+    parser.add_argument("--latency", type=float, default=0.3, help="Latência do servidor fake (s)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Variação da latência (±s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas 429/500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fração de respostas com JSON malformado")
+    parser.add_argument("--tpm", type=int, default=10_000_000, help="Cota de tokens por minuto simulada")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do corpus e do servidor fake")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--out", metavar="PATH", help="Grava o resultado em JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="Compara com o JSON de uma execução anterior")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Piora aceita antes de acusar regressão")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DEPOIS"),
+                        help="Só compara dois resultados gravados, sem rodar a carga")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(load_results(args.compare[0]), load_results(args.compare[1]), args.tolerance)
+        if regressions:
+            print(f"\nRegressões: {', '.join(regressions)}")
+        sys.exit(1 if regressions else 0)
+
+    fake_port, api_port = free_port(), free_port()
+    fake = start_fake_server(
+        fake_port, args.latency,
+        "--jitter", str(args.jitter), "--error-rate", str(args.error_rate),
+        "--malformed-rate", str(args.malformed_rate), "--seed", str(args.seed), "--tpm", str(args.tpm),
+    )
+    results = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "args": {key: value for key, value in vars(args).items() if key not in ("out", "baseline", "compare")},
+        },
+        "scenarios": {},
+    }
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            api = start_api(api_port, fake_port, args, workdir)
+            try:
+                for scenario in args.scenarios:
+                    print(f"Cenário {scenario}...", file=sys.stderr, flush=True)
+                    results["scenarios"][scenario] = asyncio.run(
+                        run_scenario(f"http://127.0.0.1:{api_port}", scenario, args, api.pid)
+                    )
+            finally:
+                os.killpg(api.pid, 15)
+                api.wait()
+    finally:
+        fake.terminate()
+        fake.wait()
+
+    print(f"Servidor fake: latência {args.latency}s ±{args.jitter}s, erros {args.error_rate:.0%}, "
+          f"JSON malformado {args.malformed_rate:.0%}, {args.workers} worker(s)\n")
+    print_results(results)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nResultado gravado em {args.out}")
+
+    if args.baseline:
+        regressions = compare(load_results(args.baseline), results, args.tolerance)
+        if regressions:
+            print(f"\nRegressões: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
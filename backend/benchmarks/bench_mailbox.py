@@ -0,0 +1,88 @@
+"""
+Benchmark da leitura de caixas .mbox em streaming.
+
+Gera caixas com quantidades crescentes de emails (multipart, com anexo e uma
+fração de envios em massa) e, em um subprocesso separado por tamanho, mede
+tempo, vazão e pico de RSS de `mail_service.iter_mailbox`, além de quantos
+emails o pré-filtro de cabeçalhos classifica sem a IA. O RSS deve ficar
+estável: só a mensagem atual fica em memória.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_mailbox --messages 1000 10000 50000 --attachment-kb 20
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def run_worker(path: str) -> None:
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake-benchmark")
+
+    # Importa dependências antes de medir
+    from app.services.mail_service import iter_mailbox
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    messages = bulk = chars = 0
+    with open(path, "rb") as f:
+        start = time.perf_counter()
+        for message in iter_mailbox(f):
+            messages += 1
+            bulk += message.bulk_reason is not None
+            chars += len(message.text)
+        elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({
+        "seconds": elapsed,
+        "messages": messages,
+        "bulk": bulk,
+        "chars": chars,
+        "rss_delta_kb": peak_rss - baseline_rss,
+    }))
+
+
+def measure(path: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_mailbox", "--worker", path],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da leitura de caixas .mbox")
+    parser.add_argument("--messages", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--attachment-kb", type=int, default=20, help="Anexo por email (KB)")
+    parser.add_argument("--bulk-rate", type=float, default=0.3, help="Fração de envios em massa")
+    parser.add_argument("--worker", metavar="PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker)
+        return
+
+    from benchmarks.corpus import write_mbox
+
+    print(f"{'emails':>8} {'tamanho':>10} {'tempo (s)':>10} {'emails/s':>9} {'MB/s':>7} {'massa':>7} {'ΔRSS (MB)':>10}")
+    for count in args.messages:
+        with tempfile.NamedTemporaryFile(suffix=".mbox", delete=False) as tmp:
+            size = write_mbox(tmp, count, bulk_rate=args.bulk_rate, attachment_bytes=args.attachment_kb * 1024)
+            path = tmp.name
+        size_mb = size / (1024 * 1024)
+
+        try:
+            result = measure(path)
+            print(f"{result['messages']:>8} {size_mb:>8.1f}MB {result['seconds']:>10.2f} "
+                  f"{result['messages'] / result['seconds']:>9.0f} {size_mb / result['seconds']:>7.1f} "
+                  f"{result['bulk']:>7} {result['rss_delta_kb'] / 1024:>10.1f}")
+        finally:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
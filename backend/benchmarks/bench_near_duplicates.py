@@ -0,0 +1,120 @@
+"""
+Benchmark do cache de quase-duplicatas.
+
+Simula um fluxo de emails em que parte vem de modelos (faturas, boletos,
+avisos de entrega) e o restante são emails avulsos. Cada email passa pelo
+cache exato e, se não estiver nele, pelo de quase-duplicatas; nas falhas, a
+"IA" devolve o veredicto esperado e ambos os caches são alimentados. Mede:
+- taxa de acerto do cache exato x exato + quase-duplicatas;
+- acertos com categoria diferente da esperada;
+- campos reescritos e trocados pelos padrão;
+- latência de busca e gravação, memória do índice e tempo de recarga do disco.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_near_duplicates --emails 20000 --templated-rate 0.6
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.corpus import make_email, make_templated_email
+
+
+def verdict(categoria: str, text: str) -> dict:
+    # Resposta da "IA" citando os valores do email, como faz o modelo real
+    first_number = next((word for word in text.split() if word.strip("#,.").isdigit()), "")
+    return {
+        "categoria": categoria,
+        "confianca": 90,
+        "razao": f"Email sobre {first_number.strip('#,.')}.",
+        "resposta_sugerida": f"Recebemos a mensagem sobre {first_number.strip('#,.')} e retornaremos em breve.",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache de quase-duplicatas: acertos, latência e memória")
+    parser.add_argument("--emails", type=int, default=20000)
+    parser.add_argument("--templated-rate", type=float, default=0.6, help="Fração de emails gerados por modelo")
+    parser.add_argument("--max-entries", type=int, default=20000)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.services.cache_service import make_cache_key
+    from app.services.near_duplicate_cache import NearDuplicateCache
+
+    rng = random.Random(args.seed)
+    stream = []
+    for _ in range(args.emails):
+        if rng.random() < args.templated_rate:
+            _, categoria, text = make_templated_email(rng)
+        else:
+            text = make_email(rng, words=rng.randint(15, 120))
+            categoria = "Produtivo" if rng.random() < 0.5 else "Improdutivo"
+        stream.append((categoria, text))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "near_duplicates.sqlite3")
+
+        cache = NearDuplicateCache(path, args.threshold, args.max_entries)
+        exact = {}
+        stored = []
+        exact_hits = near_hits = wrong = 0
+        lookups = []
+        writes = []
+
+        for categoria, text in stream:
+            key = make_cache_key(text)
+            if key in exact:
+                exact_hits += 1
+                continue
+
+            start = time.perf_counter()
+            parsed = cache.get(text)
+            lookups.append(time.perf_counter() - start)
+            if parsed is not None:
+                near_hits += 1
+                wrong += parsed["categoria"] != categoria
+                continue
+
+            parsed = verdict(categoria, text)
+            exact[key] = parsed
+            stored.append((text, parsed))
+            start = time.perf_counter()
+            cache.set(text, parsed)
+            writes.append(time.perf_counter() - start)
+
+        stats = cache.stats()
+
+        # Memória: o mesmo conteúdo gravado em um índice novo, só em memória
+        tracemalloc.start()
+        index = NearDuplicateCache(None, args.threshold, args.max_entries)
+        for text, parsed in stored:
+            index.set(text, parsed)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        reloaded = NearDuplicateCache(path, args.threshold, args.max_entries)
+        reload_seconds = time.perf_counter() - start
+
+    total = len(stream)
+    print(f"{total} emails ({args.templated_rate:.0%} gerados por modelo), limiar {args.threshold}")
+    print(f"acerto só do cache exato        : {exact_hits / total:6.1%}")
+    print(f"acerto exato + quase-duplicatas : {(exact_hits + near_hits) / total:6.1%} "
+          f"(quase-duplicatas: {near_hits}, categoria divergente: {wrong})")
+    print(f"campos reescritos / padrão      : {stats['retemplated_fields']} / {stats['fallback_fields']}")
+    print(f"busca (µs) p50/p99              : {statistics.median(lookups) * 1e6:.0f} / "
+          f"{sorted(lookups)[int(len(lookups) * 0.99)] * 1e6:.0f}")
+    print(f"gravação (µs) p50               : {statistics.median(writes) * 1e6:.0f}")
+    print(f"entradas / memória do índice    : {stats['entries']} / {current / 1024 / 1024:.1f}MB "
+          f"({current / max(1, index.stats()['entries']) / 1024:.1f}KB por email)")
+    print(f"recarga do disco                : {reloaded.stats()['entries']} entradas em {reload_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
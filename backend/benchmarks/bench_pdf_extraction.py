@@ -0,0 +1,100 @@
+"""
+Benchmark da extração de texto de PDFs grandes.
+
+Compara a implementação anterior (todas as páginas, `text +=`) com a extração
+sob demanda de `file_service` (para ao atingir `MAX_EXTRACT_CHARS`). Cada
+medição roda em um subprocesso separado para que o pico de RSS seja isolado.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_pdf_extraction --pages 50 200 500
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def legacy_extract(stream) -> str:
+    from pypdf import PdfReader
+
+    reader = PdfReader(stream)
+    text = ""
+    for page in reader.pages:
+        content = page.extract_text()
+        if content:
+            text += content + "\n"
+    return text.strip()
+
+
+def streaming_extract(stream) -> str:
+    from app.services.file_service import collect_text, iter_pdf_text
+
+    return collect_text(iter_pdf_text(stream))
+
+
+def run_worker(mode: str, path: str) -> None:
+    os.environ.setdefault("OPENAI_API_KEY", "sk-fake-benchmark")
+    extract = legacy_extract if mode == "legacy" else streaming_extract
+
+    # Importa dependências antes de medir
+    import pypdf  # noqa: F401
+    if mode == "streaming":
+        import app.services.file_service  # noqa: F401
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(path, "rb") as f:
+        start = time.perf_counter()
+        text = extract(f)
+        elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({
+        "seconds": elapsed,
+        "chars": len(text),
+        "peak_rss_kb": peak_rss,
+        "rss_delta_kb": peak_rss - baseline_rss,
+    }))
+
+
+def measure(mode: str, path: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_pdf_extraction", "--worker", mode, path],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de extração de PDF")
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    from benchmarks.corpus import make_pdf
+
+    print(f"{'páginas':>8} {'tamanho':>9} {'modo':>10} {'tempo (s)':>10} {'chars':>9} {'ΔRSS (MB)':>10}")
+    for pages in args.pages:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            tmp.write(make_pdf(pages))
+            path = tmp.name
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+
+        try:
+            for mode in ("legacy", "streaming"):
+                result = measure(mode, path)
+                print(f"{pages:>8} {size_mb:>7.1f}MB {mode:>10} {result['seconds']:>10.3f} "
+                      f"{result['chars']:>9} {result['rss_delta_kb'] / 1024:>10.1f}")
+        finally:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark de tokens de entrada por requisição: prompt antigo x prompt_builder.
+
+Antes: prompt único montado com f-string, com as instruções indentadas e o
+email cortado em `MAX_TEXT_LENGTH` caracteres, sem limpeza.
+Depois: mensagem de sistema fixa (reaproveitável pelo cache de prompt do
+provedor) e email limpo (cadeia de respostas, assinatura, aviso legal) e
+cortado em `MAX_EMAIL_TOKENS` tokens.
+
+Usa o tiktoken se disponível; caso contrário, a contagem aproximada.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_prompt_tokens --emails 500
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake-benchmark")
+
+from benchmarks.corpus import make_email_corpus
+
+# Sobrecarga de formatação por mensagem do chat (papel e delimitadores)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def legacy_prompt(text: str, max_chars: int) -> str:
+    """
+    Prompt como era montado antes do prompt_builder.
+    """
+    truncated = text[:max_chars]
+    return f"""
+    Você é um classificador sênior de emails corporativos. Analise o texto abaixo.
+
+    TEXTO:
+    \"\"\"{truncated}\"\"\"
+
+    REGRAS DE CLASSIFICAÇÃO:
+    - "Produtivo": Requer ação, suporte, dúvidas, pagamentos, relatórios, solicitações técnicas, testes de API/sistema, desenvolvimento.
+    - "Improdutivo": Apenas saudações, spam, agradecimentos vagos ou conteúdo ilegível.
+
+    CRITÉRIOS DE CONFIANÇA APRIMORADOS (0-100%):
+
+    ALTA CONFIANÇA (85-100%):
+    - Verbos de ação claros: "Pagar", "Resolver", "Testar", "Desenvolver", "Implementar", "Corrigir"
+    - Termos técnicos específicos: "API", "código", "bug", "erro", "sistema", "banco de dados"
+    - Valores monetários ou datas específicas
+    - Solicitações explícitas mesmo que curtas
+
+    MÉDIA CONFIANÇA (60-84%):
+    - Contexto financeiro/corporativo sem ação explícita
+    - Menção a processos sem urgência clara
+    - Termos genéricos de negócio
+
+    BAIXA CONFIANÇA (0-59%):
+    - Apenas fragmentos sem contexto ("Segue anexo", "Ok")
+    - Texto ambíguo ou ilegível
+    - Saudações isoladas
+
+    IMPORTANTE:
+    - Textos curtos (menos de 50 chars) MAS com termos técnicos específicos ou ações claras DEVEM ter confiança ALTA (85%+)
+    - A brevidade não é problema se o conteúdo é claro e objetivo
+    - "Testar API", "corrigir bug", "pagar fatura" são exemplos de textos curtos mas com alta confiança
+
+    Retorne APENAS JSON:
+    {{
+      "categoria": "Produtivo" ou "Improdutivo",
+      "confianca": (inteiro 0-100),
+      "razao": "Explicação técnica e direta.",
+      "resposta_sugerida": "Resposta formal e direta."
+    }}
+    """
+
+
+def summary(values: list) -> str:
+    values = sorted(values)
+    p95 = values[int(len(values) * 0.95) - 1]
+    return f"média {statistics.mean(values):7.1f}   p50 {statistics.median(values):7.0f}   p95 {p95:7.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens de entrada por requisição, antes x depois")
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.config import MAX_EMAIL_TOKENS, MAX_TEXT_LENGTH
+    from app.services.prompt_builder import build_messages, count_tokens, get_tokenizer
+    from app.utils.email_cleaner import collapse_thread
+
+    corpus = make_email_corpus(args.emails, seed=args.seed)
+
+    before = [count_tokens(legacy_prompt(text, MAX_TEXT_LENGTH)) + MESSAGE_OVERHEAD_TOKENS for text in corpus]
+
+    start = time.perf_counter()
+    # Como na API: a cadeia é reduzida na entrada, antes do prompt
+    built = [build_messages(collapse_thread(text)) for text in corpus]
+    build_ms = (time.perf_counter() - start) / len(corpus) * 1000
+
+    system_tokens = count_tokens(built[0][0]["content"]) + MESSAGE_OVERHEAD_TOKENS
+    user_tokens = [count_tokens(messages[1]["content"]) + MESSAGE_OVERHEAD_TOKENS for messages in built]
+    after = [system_tokens + tokens for tokens in user_tokens]
+
+    print(f"Tokenizador: {get_tokenizer().name}   emails: {len(corpus)}   MAX_EMAIL_TOKENS: {MAX_EMAIL_TOKENS}")
+    print(f"antes  (prompt único)       : {summary(before)}")
+    print(f"depois (sistema + usuário)  : {summary(after)}")
+    print(f"   sistema (fixo, cacheável): {system_tokens}")
+    print(f"   usuário (email limpo)    : {summary(user_tokens)}")
+    print(f"Economia: {1 - sum(after) / sum(before):.1%} dos tokens de entrada   montagem: {build_ms:.3f} ms/email")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark da resiliência da integração com a OpenAI.
+
+Sobe o servidor fake com erros aleatórios e limite de RPM e dispara N
+classificações concorrentes (textos distintos, sem cache), contando quantas
+foram respondidas pela IA, quantas receberam a resposta provisória local e
+quantas terminaram em erro. Ao final mostra as estatísticas do gateway.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_resilience --requests 300 --error-rate 0.2 --rpm 600
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.bench_concurrency import SAMPLE_TEXT, start_fake_server
+
+
+async def run(n: int) -> tuple:
+    from app.services.ai_service import analyze_with_gpt_async
+    from app.resources import open_resources
+    from app.services.llm_gateway import llm_gateway
+
+    open_resources(jobs=False)
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(analyze_with_gpt_async(f"{SAMPLE_TEXT} Pedido {i}.") for i in range(n))
+    )
+    elapsed = time.perf_counter() - start
+
+    counts = {"ia": 0, "degradado": 0, "erro": 0}
+    for result in results:
+        if result["categoria"] == "Erro":
+            counts["erro"] += 1
+        elif "provisória" in result["razao"]:
+            counts["degradado"] += 1
+        else:
+            counts["ia"] += 1
+
+    return elapsed, counts, llm_gateway.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de resiliência da integração com a OpenAI")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.2, help="Latência do servidor fake (s)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Variação da latência (±s)")
+    parser.add_argument("--error-rate", type=float, default=0.2, help="Fração de respostas 429/500")
+    parser.add_argument("--rpm", type=int, default=600, help="Limite de requisições por minuto do servidor")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    os.environ["OPENAI_API_KEY"] = "sk-fake-benchmark"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["CACHE_BACKEND"] = "none"
+    os.environ.setdefault("OPENAI_RPM_LIMIT", str(args.rpm))
+
+    proc = start_fake_server(
+        args.port, args.latency,
+        "--jitter", str(args.jitter), "--error-rate", str(args.error_rate), "--rpm", str(args.rpm),
+    )
+    try:
+        elapsed, counts, stats = asyncio.run(run(args.requests))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print(f"{args.requests} classificações em {elapsed:.2f}s "
+          f"(erros simulados: {args.error_rate:.0%}, limite: {args.rpm} RPM)")
+    print(f"   IA: {counts['ia']}  provisórias: {counts['degradado']}  erros: {counts['erro']}")
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
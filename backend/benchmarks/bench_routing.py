@@ -0,0 +1,85 @@
+"""
+Benchmark do roteamento entre modelos: chamada única x dois níveis.
+
+Sobe o servidor fake da OpenAI (com uma fração de triagens Improdutivas) e a
+API duas vezes, com `ROUTING_MODE=single` e `ROUTING_MODE=tiered`, envia os
+mesmos textos distintos (sem cache) a `/classify` e compara latência e
+tokens por email, a partir de `/api/v1/routing/stats`.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_routing --requests 50 --latency 1.5 --improdutivo-rate 0.6
+"""
+import argparse
+import os
+import statistics
+import time
+
+from benchmarks.bench_concurrency import SAMPLE_TEXT, start_fake_server
+from benchmarks.bench_streaming import start_api
+
+
+def run_mode(mode: str, args) -> dict:
+    import httpx
+
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="sk-fake-benchmark",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{args.fake_port}/v1",
+        CACHE_BACKEND="none",
+        ROUTING_MODE=mode,
+    )
+
+    api = start_api(args.api_port, env)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.api_port}", timeout=60) as http:
+            latencies = []
+            for i in range(args.requests):
+                start = time.perf_counter()
+                http.post("/api/v1/classify", data={"text": f"{SAMPLE_TEXT} Pedido {i}."}).raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            stats = http.get("/api/v1/routing/stats").json()
+    finally:
+        api.terminate()
+        api.wait()
+
+    return {"latencies": latencies, "stats": stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do roteamento em dois níveis")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=1.5, help="Latência da resposta completa no fake (s)")
+    parser.add_argument("--improdutivo-rate", type=float, default=0.6, help="Fração de triagens Improdutivas")
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--api-port", type=int, default=9101)
+    args = parser.parse_args()
+
+    fake = start_fake_server(args.fake_port, args.latency, "--improdutivo-rate", str(args.improdutivo_rate))
+    try:
+        results = {mode: run_mode(mode, args) for mode in ("single", "tiered")}
+    finally:
+        fake.terminate()
+        fake.wait()
+
+    print(f"{args.requests} emails, {args.improdutivo_rate:.0%} Improdutivos na triagem, resposta completa em {args.latency}s")
+    for mode, result in results.items():
+        latencies = result["latencies"]
+        tiers = result["stats"]["tiers"]
+        tokens = sum(t["prompt_tokens"] + t["completion_tokens"] for t in tiers.values())
+        completion = sum(t["completion_tokens"] for t in tiers.values())
+        print(
+            f"{mode:7s}: p50 {statistics.median(latencies) * 1000:6.0f} ms   "
+            f"média {statistics.mean(latencies) * 1000:6.0f} ms   "
+            f"tokens/email {tokens / args.requests:6.1f} (saída {completion / args.requests:5.1f})"
+        )
+        for tier, summary in tiers.items():
+            if summary["calls"]:
+                print(f"   {tier:7s}: {summary['calls']} chamadas, {summary['avg_tokens_per_email']} tokens/email, "
+                      f"{summary['avg_latency_ms']} ms/chamada")
+
+    tiered = results["tiered"]["stats"]
+    print(f"Escalados: {tiered['escalated']}/{tiered['triaged']} ({tiered['escalation_rate']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark do tempo até a primeira informação útil: `/classify` x `/classify/stream`.
+
+Sobe o servidor fake da OpenAI e a API (uvicorn) em subprocessos e mede,
+para textos distintos (sem cache):
+- classify: tempo até a resposta JSON completa;
+- stream: tempo até o evento `categoria`, até `confianca` e até `result`.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_streaming --requests 20 --latency 2.0 --first-token-latency 0.2
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_concurrency import SAMPLE_TEXT, start_fake_server
+
+
+def start_api(port: int, env: dict) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    import httpx
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=0.5)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+
+    proc.kill()
+    raise RuntimeError("API não iniciou")
+
+
+def measure_classify(http, text: str) -> float:
+    start = time.perf_counter()
+    http.post("/api/v1/classify", data={"text": text}).raise_for_status()
+    return time.perf_counter() - start
+
+
+def measure_stream(http, text: str) -> dict:
+    marks = {}
+    start = time.perf_counter()
+
+    with http.stream("POST", "/api/v1/classify/stream", data={"text": text}) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                marks.setdefault(event, time.perf_counter() - start)
+
+    return marks
+
+
+def summary(values: list) -> str:
+    return f"p50 {statistics.median(values) * 1000:7.0f} ms   máx {max(values) * 1000:7.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do endpoint de classificação em streaming")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=2.0, help="Tempo total de geração no fake (s)")
+    parser.add_argument("--first-token-latency", type=float, default=0.2, help="Tempo até o primeiro trecho (s)")
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--api-port", type=int, default=9101)
+    args = parser.parse_args()
+
+    import httpx
+
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="sk-fake-benchmark",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{args.fake_port}/v1",
+        CACHE_BACKEND="none",
+    )
+
+    fake = start_fake_server(args.fake_port, args.latency, "--first-token-latency", str(args.first_token_latency))
+    api = start_api(args.api_port, env)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.api_port}", timeout=60) as http:
+            full = [measure_classify(http, f"{SAMPLE_TEXT} Pedido {i}.") for i in range(args.requests)]
+            streamed = [measure_stream(http, f"{SAMPLE_TEXT} Stream {i}.") for i in range(args.requests)]
+    finally:
+        api.terminate()
+        fake.terminate()
+        api.wait()
+        fake.wait()
+
+    print(f"Geração simulada: {args.latency}s (primeiro trecho em {args.first_token_latency}s)")
+    print(f"classify (resposta completa) : {summary(full)}")
+    for event in ("categoria", "confianca", "result"):
+        values = [marks[event] for marks in streamed if event in marks]
+        if values:
+            print(f"stream até '{event}'{' ' * (12 - len(event))}: {summary(values)}")
+
+
+if __name__ == "__main__":
+    main()
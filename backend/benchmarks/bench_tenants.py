@@ -0,0 +1,129 @@
+"""
+Benchmark do escalonamento entre tenants.
+
+Sobe o servidor fake da OpenAI e limita as chamadas simultâneas
+(LLM_MAX_CONCURRENCY) para que a capacidade seja disputada. Mede a latência
+das classificações interativas de um tenant em três cenários:
+- sozinho: só as interativas;
+- justo: outro tenant roda um backfill (prioridade bulk) ao mesmo tempo;
+- FIFO: o mesmo backfill, mas atribuído ao tenant das interativas e com a
+  mesma prioridade, que equivale a uma fila única por ordem de chegada.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_tenants --concurrency 8 --bulk 2000 --interactive 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.bench_concurrency import SAMPLE_TEXT, start_fake_server
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def interactive_load(tenant, priority: int, n: int, clients: int) -> list:
+    from app.services.ai_service import analyze_with_gpt_async
+    from app.services.tenant_service import tenant_context
+
+    latencies = []
+    counter = iter(range(n))
+
+    async def client():
+        with tenant_context(tenant, priority):
+            for i in counter:
+                start = time.perf_counter()
+                await analyze_with_gpt_async(f"{SAMPLE_TEXT} Pedido {i}.")
+                latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies
+
+
+async def bulk_load(tenant, priority: int, n: int, workers: int) -> None:
+    from app.services.ai_service import analyze_with_gpt_async
+    from app.services.tenant_service import tenant_context
+
+    counter = iter(range(n))
+
+    async def worker():
+        with tenant_context(tenant, priority):
+            for i in counter:
+                await analyze_with_gpt_async(f"{SAMPLE_TEXT} Lote {i}.")
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+async def scenario(name: str, args) -> dict:
+    from app.services.tenant_service import BULK, INTERACTIVE, Tenant
+
+    interactive = Tenant("interativo")
+    backfill = interactive if name == "fifo" else Tenant("backfill")
+    bulk_priority = INTERACTIVE if name == "fifo" else BULK
+
+    bulk_task = None
+    if name != "sozinho":
+        bulk_task = asyncio.create_task(bulk_load(backfill, bulk_priority, args.bulk, args.bulk_workers))
+        # Deixa o backfill ocupar a capacidade antes das interativas chegarem
+        await asyncio.sleep(args.latency * 2)
+
+    latencies = await interactive_load(interactive, INTERACTIVE, args.interactive, args.clients)
+
+    if bulk_task is not None:
+        bulk_task.cancel()
+        await asyncio.gather(bulk_task, return_exceptions=True)
+
+    return {
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+    }
+
+
+async def run_all(args) -> dict:
+    from app.resources import open_resources
+
+    open_resources(jobs=False)
+    # Um único event loop: o pool de conexões do cliente assíncrono fica preso a ele
+    return {name: await scenario(name, args) for name in ("sozinho", "justo", "fifo")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência interativa com backfills de outros tenants")
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--interactive", type=int, default=200, help="Classificações interativas")
+    parser.add_argument("--clients", type=int, default=4, help="Clientes interativos simultâneos")
+    parser.add_argument("--bulk", type=int, default=2000, help="Emails no backfill")
+    parser.add_argument("--bulk-workers", type=int, default=64, help="Chamadas simultâneas do backfill")
+    parser.add_argument("--latency", type=float, default=0.1, help="Latência do servidor fake (s)")
+    parser.add_argument("--port", type=int, default=9110)
+    args = parser.parse_args()
+
+    os.environ["OPENAI_API_KEY"] = "sk-fake-benchmark"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.concurrency)
+    os.environ["CACHE_BACKEND"] = "none"
+    # O limitador global não deve ser o gargalo: a disputa é pelas vagas simultâneas
+    os.environ.setdefault("OPENAI_TPM_LIMIT", "100000000")
+    os.environ.setdefault("OPENAI_RPM_LIMIT", "1000000")
+
+    proc = start_fake_server(args.port, args.latency, "--tpm", "100000000")
+    try:
+        results = asyncio.run(run_all(args))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print(f"Vagas simultâneas: {args.concurrency} | latência simulada: {args.latency}s | "
+          f"backfill com {args.bulk_workers} chamadas simultâneas")
+    print(f"{'cenário':<10} {'p50 (s)':>8} {'p99 (s)':>8} {'máx (s)':>8}")
+    for name, result in results.items():
+        print(f"{name:<10} {result['p50']:>8.3f} {result['p99']:>8.3f} {result['max']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark da redução de cadeias de emails (`collapse_thread`).
+
+Gera cadeias em que cada resposta cita a anterior inteira (tamanho quadrático
+no número de mensagens, chegando a vários MB) e mede, por tamanho:
+- tempo da redução e vazão (MB/s), que deve ficar estável: o custo é linear;
+- caracteres antes e depois;
+- tempo do `score_text` (regras de pós-processamento) no texto bruto e no reduzido.
+
+Uso (na pasta backend/):
+    python -m benchmarks.bench_thread_dedup --messages 50 150 300 450
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-fake-benchmark")
+
+from benchmarks.corpus import make_thread
+
+
+def best_of(repeat: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redução de cadeias de emails: tempo e tamanho")
+    parser.add_argument("--messages", type=int, nargs="+", default=[50, 150, 300, 450])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ["CACHE_BACKEND"] = "none"
+    from app.resources import open_resources
+    from app.services.keyword_service import score_text
+    from app.utils.email_cleaner import collapse_thread
+
+    open_resources(jobs=False)
+
+    print(f"{'msgs':>5} {'antes':>10} {'depois':>7} {'tempo':>9} {'MB/s':>7}   score_text antes/depois")
+    for messages in args.messages:
+        thread = make_thread(random.Random(args.seed), messages)
+        collapsed = collapse_thread(thread)
+
+        collapse_s = best_of(args.repeat, collapse_thread, thread)
+        score_before = best_of(args.repeat, score_text, thread)
+        score_after = best_of(args.repeat, score_text, collapsed)
+
+        print(
+            f"{messages:5d} {len(thread):10,d} {len(collapsed):7,d} {collapse_s * 1000:7.1f}ms "
+            f"{len(thread) / collapse_s / 1e6:7.1f}   {score_before * 1000:.2f}ms / {score_after * 1000:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Geradores de corpus sintético para os benchmarks.
+"""
+import random
+
+WORDS = (
+    "pagamento fatura boleto sistema erro api servidor relatório reunião prazo "
+    "solicitação suporte cliente contrato valor vencimento acesso senha projeto "
+    "equipe atualização bom dia obrigado segue anexo favor verificar urgente"
+).split()
+
+
+def make_paragraph(rng: random.Random, words: int = 60) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def make_pdf(pages: int, lines_per_page: int = 45, seed: int = 0) -> bytes:
+    """
+    Gera um PDF válido com texto selecionável em todas as páginas.
+
+    Escreve os objetos e a tabela xref à mão para não depender de bibliotecas
+    de geração de PDF.
+    """
+    rng = random.Random(seed)
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")  # preenchido depois
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    page_ids = []
+    for _ in range(pages):
+        lines = []
+        for _ in range(lines_per_page):
+            line = " ".join(rng.choice(WORDS) for _ in range(12))
+            lines.append(f"({line}) Tj T*")
+        stream = ("BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(lines) + " ET").encode("cp1252")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    return bytes(out)
+
+
+GREETINGS = ("Bom dia,", "Boa tarde,", "Olá,", "Prezados,", "Oi pessoal,")
+CLOSINGS = ("Atenciosamente,", "Abraços,", "Att.", "Cordialmente,")
+NAMES = ("Ana Souza", "Carlos Lima", "Fernanda Rocha", "João Pereira", "Mariana Alves")
+DISCLAIMER = (
+    "AVISO LEGAL: Esta mensagem e seus anexos podem conter informações confidenciais "
+    "ou privilegiadas, destinadas exclusivamente ao destinatário. Se você a recebeu por "
+    "engano, notifique o remetente e apague-a imediatamente."
+)
+
+
+def _signature(rng: random.Random, name: str) -> str:
+    return (
+        f"{rng.choice(CLOSINGS)}\n{name}\nAnalista de Operações | ACME Serviços Ltda\n"
+        f"Tel.: (11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}\n"
+        "www.acme.com.br"
+    )
+
+
+def make_email(rng: random.Random, replies: int = 0, words: int = 60) -> str:
+    """
+    Gera um email corporativo: mensagem nova, assinatura, aviso legal e,
+    com `replies`, a cadeia de respostas citadas no formato do Gmail.
+    """
+    name = rng.choice(NAMES)
+    parts = [f"{rng.choice(GREETINGS)}\n\n{make_paragraph(rng, words)}\n\n{_signature(rng, name)}\n\n{DISCLAIMER}"]
+
+    quote = ""
+    for depth in range(replies):
+        sender = rng.choice(NAMES)
+        body = f"{rng.choice(GREETINGS)}\n\n{make_paragraph(rng, words)}\n\n{_signature(rng, sender)}\n\n{DISCLAIMER}"
+        header = f"Em {rng.randint(1, 28)}/0{rng.randint(1, 9)}/2024 {rng.randint(8, 18)}:00, {sender} <{sender.split()[0].lower()}@acme.com.br> escreveu:"
+        prefix = ">" * (depth + 1) + " "
+        quote += "\n\n" + ">" * depth + (" " if depth else "") + header + "\n" + "\n".join(prefix + line for line in body.split("\n"))
+
+    return parts[0] + quote
+
+
+def make_thread(rng: random.Random, messages: int, words: int = 60) -> str:
+    """
+    Gera uma cadeia real de respostas: cada mensagem cita a anterior inteira
+    (com as citações dela), como faz o cliente de email ao responder. O
+    tamanho cresce com o quadrado de `messages` (~450 mensagens ≈ 1,7MB).
+    """
+    thread = ""
+    for _ in range(messages):
+        sender = rng.choice(NAMES)
+        body = f"{rng.choice(GREETINGS)}\n\n{make_paragraph(rng, words)}\n\n{_signature(rng, sender)}\n\n{DISCLAIMER}"
+        if thread:
+            quoted = "\n".join((">" if line.startswith(">") else "> ") + line for line in thread.split("\n"))
+            header = f"Em {rng.randint(1, 28)}/0{rng.randint(1, 9)}/2024 {rng.randint(8, 18)}:00, {sender} <{sender.split()[0].lower()}@acme.com.br> escreveu:"
+            body = f"{body}\n\n{header}\n{quoted}"
+        thread = body
+    return thread
+
+
+def make_email_corpus(count: int, seed: int = 0) -> list:
+    """
+    Mistura de emails avulsos e threads com até 6 respostas citadas.
+    """
+    rng = random.Random(seed)
+    return [make_email(rng, replies=rng.choice((0, 0, 1, 2, 3, 6)), words=rng.randint(15, 120)) for _ in range(count)]
+
+
+def make_mime_email(rng: random.Random, bulk: bool = False, attachment_bytes: int = 0) -> bytes:
+    """
+    Gera um email RFC 822 (multipart com texto, HTML e, opcionalmente, um
+    anexo de `attachment_bytes`). Com `bulk`, traz os cabeçalhos de envio em
+    massa (List-Unsubscribe, Precedence).
+    """
+    from email.message import EmailMessage
+
+    sender = rng.choice(NAMES)
+    message = EmailMessage()
+    message["From"] = f"{sender} <{sender.split()[0].lower()}@acme.com.br>"
+    message["To"] = "suporte@empresa.com.br"
+    message["Subject"] = "Novidades da semana" if bulk else f"Pedido {rng.randint(1000, 9999)}: {rng.choice(WORDS)}"
+    message["Date"] = f"Mon, {rng.randint(1, 28)} Jan 2024 10:00:00 -0300"
+    message["Message-ID"] = f"<{rng.getrandbits(64):x}@acme.com.br>"
+    if bulk:
+        message["List-Unsubscribe"] = "<https://acme.com.br/descadastrar>"
+        message["Precedence"] = "bulk"
+
+    body = make_email(rng, replies=rng.choice((0, 1, 2)), words=rng.randint(15, 120))
+    message.set_content(body)
+    message.add_alternative(f"<html><body><p>{body.replace(chr(10), '<br>')}</p></body></html>", subtype="html")
+    if attachment_bytes:
+        message.add_attachment(rng.randbytes(attachment_bytes), maintype="application", subtype="pdf", filename="anexo.pdf")
+    return bytes(message)
+
+
+def write_mbox(stream, count: int, seed: int = 0, bulk_rate: float = 0.3, attachment_bytes: int = 0) -> int:
+    """
+    Escreve uma caixa .mbox com `count` emails direto no arquivo (sem
+    montá-la em memória), escapando linhas "From " do corpo (mboxrd).
+
+    Returns:
+        int: Bytes escritos
+    """
+    rng = random.Random(seed)
+    written = 0
+    for _ in range(count):
+        raw = make_mime_email(rng, bulk=rng.random() < bulk_rate, attachment_bytes=attachment_bytes)
+        lines = [b">" + line if line.lstrip(b">").startswith(b"From ") else line for line in raw.split(b"\n")]
+        chunk = b"From remetente@acme.com.br Mon Jan  1 10:00:00 2024\n" + b"\n".join(lines).rstrip(b"\n") + b"\n\n"
+        stream.write(chunk)
+        written += len(chunk)
+    return written
+
+
+# Emails gerados por sistemas a partir de um modelo: só mudam nomes, números,
+# datas e valores. (categoria esperada, modelo)
+TEMPLATES = (
+    ("Produtivo", "Olá {nome}, segue a fatura #{numero} no valor de R$ {valor} com vencimento em {data}. "
+                  "Favor efetuar o pagamento até a data de vencimento para evitar juros e multa. "
+                  "Em caso de dúvidas, responda este email. Atenciosamente, Financeiro {empresa}."),
+    ("Produtivo", "Prezado {nome}, o chamado {numero} foi reaberto em {data} porque o erro no sistema voltou a "
+                  "ocorrer. Precisamos que a equipe de suporte verifique o servidor e retorne com uma previsão "
+                  "de correção. Obrigado, {empresa}."),
+    ("Produtivo", "Bom dia, {nome}. O boleto {numero} de R$ {valor} referente ao contrato da {empresa} vence em "
+                  "{data} e ainda consta em aberto. Pode confirmar o pagamento ou enviar o comprovante?"),
+    ("Improdutivo", "Olá {nome}! A {empresa} agradece a sua participação no evento do dia {data}. Foi um prazer "
+                    "receber você e os outros {numero} convidados. Até a próxima, equipe {empresa}."),
+    ("Improdutivo", "Oi {nome}, seu pedido {numero} saiu para entrega em {data}. Nenhuma ação é necessária: "
+                    "acompanhe o status pelo aplicativo da {empresa}. Obrigado pela preferência!"),
+)
+COMPANIES = ("ACME", "Globex", "Initech", "Umbrella", "Stark")
+
+
+def make_templated_email(rng: random.Random, template: int = None) -> tuple:
+    """
+    Preenche um dos `TEMPLATES` com nome, número, data, valor e empresa aleatórios.
+
+    Returns:
+        tuple: (índice do modelo, categoria esperada, texto)
+    """
+    index = rng.randrange(len(TEMPLATES)) if template is None else template
+    categoria, text = TEMPLATES[index]
+    valor = f"{rng.randint(50, 9999):,}".replace(",", ".") + f",{rng.randint(0, 99):02d}"
+    return index, categoria, text.format(
+        nome=rng.choice(NAMES).split()[0],
+        numero=rng.randint(1000, 999999),
+        data=f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}",
+        valor=valor,
+        empresa=rng.choice(COMPANIES),
+    )
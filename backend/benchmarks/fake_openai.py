@@ -0,0 +1,247 @@
+"""
+Servidor fake compatível com a API de Chat Completions da OpenAI.
+
+Responde com um JSON de classificação fixo após uma latência configurável,
+permitindo medir a concorrência do backend sem custo e sem rede externa.
+Também simula falhas: erros 429/500 aleatórios, limite de requisições por
+minuto e cabeçalhos `x-ratelimit-*`, para exercitar a resiliência do cliente.
+Com `"stream": true` responde em SSE: o primeiro trecho chega após
+`--first-token-latency` e o restante é distribuído até completar `--latency`.
+Requisições com `max_tokens` (a triagem do roteamento em dois níveis)
+recebem só categoria e confiança, com latência proporcional à saída menor;
+`--improdutivo-rate` define a fração delas classificada como Improdutivo.
+Prompts em lote ("EMAIL [id]:") recebem `{"resultados": [...]}` com um item
+por ID. `--malformed-rate` devolve uma fração das respostas com o JSON
+estragado (cercas de markdown, texto antes/depois, truncado, aspas simples),
+para exercitar o `clean_and_parse_json`; `--canned` troca o JSON fixo pelo
+de um arquivo. Com `--seed`, latências, erros e respostas são reproduzíveis.
+
+Uso:
+    python -m benchmarks.fake_openai --port 9100 --latency 0.5
+    python -m benchmarks.fake_openai --error-rate 0.2 --jitter 0.3 --rpm 600
+    python -m benchmarks.fake_openai --improdutivo-rate 0.6
+    python -m benchmarks.fake_openai --malformed-rate 0.1 --seed 42 --canned resposta.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY = float(os.getenv("FAKE_OPENAI_LATENCY", "0.5"))
+JITTER = float(os.getenv("FAKE_OPENAI_JITTER", "0"))
+ERROR_RATE = float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0"))
+RPM = int(os.getenv("FAKE_OPENAI_RPM", "0"))
+FIRST_TOKEN_LATENCY = float(os.getenv("FAKE_OPENAI_FIRST_TOKEN_LATENCY", "0.2"))
+IMPRODUTIVO_RATE = float(os.getenv("FAKE_OPENAI_IMPRODUTIVO_RATE", "0"))
+MALFORMED_RATE = float(os.getenv("FAKE_OPENAI_MALFORMED_RATE", "0"))
+TPM = int(os.getenv("FAKE_OPENAI_TPM", "90000"))
+
+# Gerador único: com `--seed`, a mesma sequência de requisições recebe as mesmas respostas
+_rng = random.Random()
+
+CANNED_CONTENT = {
+    "categoria": "Produtivo",
+    "confianca": 90,
+    "razao": "Solicitação explícita de ação.",
+    "resposta_sugerida": "Olá! Recebemos sua solicitação e retornaremos em breve."
+}
+
+# Tokens de saída simulados: resposta completa e triagem
+COMPLETION_TOKENS = 60
+TRIAGE_COMPLETION_TOKENS = 15
+
+_BATCH_ID_RE = re.compile(r"^EMAIL \[([^\]]+)\]", re.MULTILINE)
+
+
+def _malform(content: str) -> str:
+    """
+    Estraga o JSON como os modelos costumam fazer. Cercas de markdown são
+    aceitas pelo `clean_and_parse_json`; as demais variações não.
+    """
+    kind = _rng.choice(("fence", "prefix", "suffix", "truncated", "single_quotes"))
+    if kind == "fence":
+        return f"```json\n{content}\n```"
+    if kind == "prefix":
+        return f"Aqui está a classificação:\n{content}"
+    if kind == "suffix":
+        return f"{content}\nEspero ter ajudado!"
+    if kind == "truncated":
+        return content[:len(content) // 2]
+    return content.replace('"', "'")
+
+app = FastAPI(title="Fake OpenAI")
+
+# Janela deslizante de 60s com os instantes das requisições aceitas
+_accepted = []
+
+
+def _rate_limit_headers(remaining: int) -> dict:
+    limit = RPM or 10000
+    return {
+        "x-ratelimit-limit-requests": str(limit),
+        "x-ratelimit-remaining-requests": str(max(0, remaining)),
+        "x-ratelimit-limit-tokens": str(TPM),
+        "x-ratelimit-remaining-tokens": str(TPM),
+        "x-ratelimit-reset-requests": f"{60 / limit:.3f}s",
+    }
+
+
+def _error(status: int, message: str, kind: str, headers: dict) -> JSONResponse:
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": message, "type": kind, "param": None, "code": None}},
+        headers=headers,
+    )
+
+
+def _stream_completion(model: str, latency: float, include_usage: bool, headers: dict) -> StreamingResponse:
+    """
+    Entrega o JSON fixo em pedaços de poucos caracteres, no formato SSE da OpenAI.
+    """
+    content = json.dumps(CANNED_CONTENT, ensure_ascii=False)
+    pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    first = min(FIRST_TOKEN_LATENCY, latency)
+    per_piece = max(0.0, latency - first) / len(pieces)
+
+    def chunk(delta: dict, finish_reason=None, usage=None) -> str:
+        body = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        if usage:
+            body["usage"] = usage
+        return f"data: {json.dumps(body, ensure_ascii=False)}\n\n"
+
+    async def events():
+        await asyncio.sleep(first)
+        yield chunk({"role": "assistant", "content": ""})
+        for piece in pieces:
+            yield chunk({"content": piece})
+            await asyncio.sleep(per_piece)
+        yield chunk({}, finish_reason="stop")
+        if include_usage:
+            yield chunk({}, usage={"prompt_tokens": 400, "completion_tokens": COMPLETION_TOKENS,
+                                   "total_tokens": 400 + COMPLETION_TOKENS})
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+
+    now = time.monotonic()
+    while _accepted and now - _accepted[0] > 60:
+        _accepted.pop(0)
+
+    if RPM and len(_accepted) >= RPM:
+        retry_after = 60 - (now - _accepted[0])
+        headers = _rate_limit_headers(0)
+        headers["retry-after"] = f"{retry_after:.3f}"
+        return _error(429, "Rate limit reached for requests", "requests", headers)
+
+    _accepted.append(now)
+    headers = _rate_limit_headers((RPM or 10000) - len(_accepted))
+
+    latency = max(0.0, LATENCY + _rng.uniform(-JITTER, JITTER))
+
+    if ERROR_RATE and _rng.random() < ERROR_RATE:
+        await asyncio.sleep(latency)
+        if _rng.random() < 0.5:
+            headers["retry-after"] = "1"
+            return _error(429, "Rate limit reached for tokens", "tokens", headers)
+        return _error(500, "The server had an error while processing your request.", "server_error", headers)
+
+    if body.get("stream"):
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+        return _stream_completion(body.get("model", "gpt-3.5-turbo"), latency, include_usage, headers)
+
+    content = CANNED_CONTENT
+    completion_tokens = COMPLETION_TOKENS
+
+    if body.get("max_tokens"):
+        # Triagem: saída curta, gerada em uma fração do tempo
+        improdutivo = _rng.random() < IMPRODUTIVO_RATE
+        content = {"categoria": "Improdutivo" if improdutivo else "Produtivo", "confianca": 95 if improdutivo else 90}
+        completion_tokens = TRIAGE_COMPLETION_TOKENS
+        first = min(FIRST_TOKEN_LATENCY, latency)
+        latency = first + (latency - first) * completion_tokens / COMPLETION_TOKENS
+
+    prompt = (body.get("messages") or [{}])[-1].get("content") or ""
+    batch_ids = _BATCH_ID_RE.findall(prompt)
+    if batch_ids:
+        content = {"resultados": [{"id": item_id, **content} for item_id in batch_ids]}
+        completion_tokens *= len(batch_ids)
+
+    text = json.dumps(content, ensure_ascii=False)
+    if MALFORMED_RATE and _rng.random() < MALFORMED_RATE:
+        text = _malform(text)
+
+    await asyncio.sleep(latency)
+
+    return JSONResponse(
+        content={
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-3.5-turbo"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }
+            ],
+            "usage": {"prompt_tokens": 400, "completion_tokens": completion_tokens, "total_tokens": 400 + completion_tokens}
+        },
+        headers=headers,
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor fake da OpenAI para benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=LATENCY, help="Latência simulada em segundos")
+    parser.add_argument("--jitter", type=float, default=JITTER, help="Variação uniforme (±s) sobre a latência")
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE, help="Fração de respostas 429/500")
+    parser.add_argument("--rpm", type=int, default=RPM, help="Requisições por minuto aceitas (0 = sem limite)")
+    parser.add_argument("--first-token-latency", type=float, default=FIRST_TOKEN_LATENCY,
+                        help="Espera até o primeiro trecho em streaming (s)")
+    parser.add_argument("--improdutivo-rate", type=float, default=IMPRODUTIVO_RATE,
+                        help="Fração das triagens respondidas como Improdutivo")
+    parser.add_argument("--tpm", type=int, default=TPM, help="Tokens por minuto informados nos cabeçalhos")
+    parser.add_argument("--malformed-rate", type=float, default=MALFORMED_RATE,
+                        help="Fração das respostas com JSON malformado")
+    parser.add_argument("--canned", metavar="PATH", help="Arquivo JSON com a classificação fixa a devolver")
+    parser.add_argument("--seed", type=int, help="Semente para latências, erros e respostas reproduzíveis")
+    args = parser.parse_args()
+
+    LATENCY = args.latency
+    JITTER = args.jitter
+    ERROR_RATE = args.error_rate
+    RPM = args.rpm
+    FIRST_TOKEN_LATENCY = args.first_token_latency
+    IMPRODUTIVO_RATE = args.improdutivo_rate
+    MALFORMED_RATE = args.malformed_rate
+    TPM = args.tpm
+    if args.canned:
+        with open(args.canned, encoding="utf-8") as f:
+            CANNED_CONTENT = json.load(f)
+    if args.seed is not None:
+        _rng.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,69 @@
+"""
+Configuração comum dos testes.
+
+`app.config` lê as variáveis de ambiente na importação: elas são definidas
+aqui, antes de qualquer import da aplicação, apontando a OpenAI para o
+servidor fake de `benchmarks.fake_openai` e os arquivos para uma pasta
+temporária.
+"""
+import os
+import shutil
+import socket
+import tempfile
+
+import pytest
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+FAKE_OPENAI_PORT = _free_port()
+WORKDIR = tempfile.mkdtemp(prefix="email-classifier-tests-")
+
+os.environ.update(
+    OPENAI_API_KEY="sk-fake-tests",
+    OPENAI_BASE_URL=f"http://127.0.0.1:{FAKE_OPENAI_PORT}/v1",
+    ROUTING_MODE="single",
+    CACHE_BACKEND="memory",
+    NEAR_DUP_PATH="",
+    AUDIT_LOG_DIR="",
+    LOCAL_MODEL_PATH="",
+    TENANTS_PATH="",
+    JOBS_DB_PATH=os.path.join(WORKDIR, "jobs.sqlite3"),
+    JOBS_SPOOL_DIR=os.path.join(WORKDIR, "job_files"),
+    LOG_LEVEL="WARNING",
+)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _workdir():
+    yield WORKDIR
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def fake_openai():
+    """
+    Servidor fake da OpenAI em um subprocesso, com latência mínima.
+    """
+    from benchmarks.bench_concurrency import start_fake_server
+
+    proc = start_fake_server(FAKE_OPENAI_PORT, 0.01, "--first-token-latency", "0.01", "--seed", "0")
+    yield f"http://127.0.0.1:{FAKE_OPENAI_PORT}/v1"
+    proc.terminate()
+    proc.wait()
+
+
+@pytest.fixture(scope="session")
+def client(fake_openai):
+    """
+    Cliente da API com o lifespan rodando (clientes, caches e fila de jobs).
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
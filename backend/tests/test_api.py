@@ -0,0 +1,131 @@
+"""
+Testes de ponta a ponta: a API completa (lifespan, rotas, gateway) contra o
+servidor fake da OpenAI.
+"""
+import json
+import time
+
+import pytest
+
+EMAIL = "Bom dia, preciso da segunda via do boleto de R$ 1.250,00 com vencimento em 10/11. Urgente."
+
+EML = (
+    b"From: Loja <ofertas@loja.com>\r\n"
+    b"List-Unsubscribe: <mailto:sair@loja.com>\r\n"
+    b"Subject: Ofertas da semana\r\n"
+    b"\r\n"
+    b"Descontos em todos os produtos.\r\n"
+)
+
+
+def sse_events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        events.append((fields.get("event"), json.loads(fields["data"])))
+    return events
+
+
+def wait_for_job(client, status_url: str, timeout: float = 30) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(status_url).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.05)
+    pytest.fail(f"Job não terminou em {timeout}s: {job}")
+
+
+def test_classify_and_cache_hit(client):
+    before = client.get("/api/v1/cache/stats").json()
+
+    first = client.post("/api/v1/classify", data={"text": EMAIL})
+    assert first.status_code == 200
+    result = first.json()
+    assert result["categoria"] == "Produtivo"
+    assert 0 <= result["confianca"] <= 100
+    assert result["resposta_sugerida"]
+
+    second = client.post("/api/v1/classify", data={"text": "  " + EMAIL.replace(" ", "  ")})
+    assert second.json() == result
+
+    after = client.get("/api/v1/cache/stats").json()
+    assert after["hits"] == before["hits"] + 1
+
+
+def test_classify_rejects_missing_input(client):
+    assert client.post("/api/v1/classify", data={}).status_code == 400
+
+
+def test_classify_eml_upload_uses_header_prefilter(client):
+    calls = client.get("/api/v1/llm/stats").json()["calls"]
+
+    response = client.post("/api/v1/classify", files={"file": ("oferta.eml", EML, "message/rfc822")})
+    assert response.status_code == 200
+    assert response.json()["categoria"] == "Improdutivo"
+    assert "cabeçalhos" in response.json()["razao"]
+    assert client.get("/api/v1/llm/stats").json()["calls"] == calls
+
+
+def test_stream(client):
+    text = "Preciso alterar o endereço de entrega do pedido 4521 antes do envio, por favor."
+    with client.stream("POST", "/api/v1/classify/stream", data={"text": text}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = sse_events(body)
+    names = [name for name, _ in events]
+    assert names[0] == "categoria"
+    assert "razao" in names and "resposta_sugerida" in names
+    assert names[-1] == "result"
+
+    result = events[-1][1]
+    assert result["categoria"] == "Produtivo"
+    deltas = "".join(data["delta"] for name, data in events if name == "razao")
+    assert result["razao"].startswith(deltas)
+
+
+def test_batch_keeps_input_order(client):
+    payload = {"emails": [
+        {"id": "a", "text": "Favor enviar o contrato revisado até sexta-feira para assinatura."},
+        {"id": "b", "text": "oi"},
+        {"id": "c", "text": "Solicito o cancelamento da assinatura do plano anual a partir de março."},
+    ]}
+    response = client.post("/api/v1/classify/batch", json=payload)
+    assert response.status_code == 200
+
+    body = response.json()
+    assert body["total"] == 3
+    assert [item["id"] for item in body["resultados"]] == ["a", "b", "c"]
+    assert body["resultados"][0]["categoria"] == "Produtivo"
+    # Texto curto demais: resposta local, sem a IA
+    assert body["resultados"][1]["categoria"] != "Produtivo"
+
+
+def test_job_with_texts_and_files(client):
+    response = client.post(
+        "/api/v1/jobs",
+        params={"priority": "high"},
+        data={"texts": ["Por favor, confirme o agendamento da reunião de quinta-feira às 14h."]},
+        files=[
+            ("files", ("oferta.eml", EML, "message/rfc822")),
+            ("files", ("pedido.txt", "Preciso do relatório de vendas de fevereiro até amanhã.".encode(), "text/plain")),
+        ],
+    )
+    assert response.status_code == 202
+    created = response.json()
+    assert (created["status"], created["priority"], created["total"]) == ("queued", "high", 3)
+
+    job = wait_for_job(client, created["status_url"])
+    assert job["status"] == "completed", job
+    assert job["processed"] == 3
+    categorias = [item["categoria"] for item in job["resultados"]]
+    assert categorias == ["Produtivo", "Improdutivo", "Produtivo"]
+
+    stats = client.get("/api/v1/jobs/stats").json()
+    assert stats["completed"] >= 1
+
+
+def test_unknown_job(client):
+    assert client.get("/api/v1/jobs/nao-existe").status_code == 404
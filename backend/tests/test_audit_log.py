@@ -0,0 +1,87 @@
+import os
+import time
+
+import pytest
+
+from app.services import audit_log as audit_module
+from app.services.audit_log import MAGIC, AuditLog, iter_records, segment_paths, text_hash
+
+PARSED = {"categoria": "Produtivo", "confianca": 90, "razao": "Pedido.", "resposta_sugerida": "Ok."}
+RESULT = {**PARSED, "confianca": 85}
+
+
+def write_records(directory, texts, **kwargs) -> AuditLog:
+    options = {"segment_bytes": 1 << 20, "max_segments": 0, "text_chars": 1000, "queue_size": 100, **kwargs}
+    log = AuditLog(str(directory), **options)
+    for text in texts:
+        log.record(text, '{"categoria": "Produtivo"}', PARSED, RESULT, {"llm_call": 0.5}, batch_size=2, coalesced=1)
+    log.close()
+    return log
+
+
+@pytest.mark.parametrize("codec", ["msgpack", "json"])
+def test_round_trip(tmp_path, monkeypatch, codec):
+    if codec == "json":
+        monkeypatch.setattr(audit_module, "msgpack", None)
+    elif audit_module.msgpack is None:
+        pytest.skip("msgpack não instalado")
+
+    texts = ["Preciso da segunda via do boleto.", "Obrigado pelo retorno!"]
+    log = write_records(tmp_path, texts)
+    assert log.stats()["codec"] == codec
+    assert log.written == 2
+
+    records = list(iter_records([str(tmp_path)]))
+    assert [record["text"] for record in records] == texts
+    record = records[0]
+    assert record["hash"] == text_hash(texts[0])
+    assert record["categoria"] == "Produtivo"
+    assert (record["confianca_ia"], record["confianca_final"]) == (90, 85)
+    assert record["etapas"] == {"llm_call": 0.5}
+    assert (record["lote"], record["aguardaram"]) == (2, 1)
+
+
+def test_truncates_text_or_keeps_only_the_hash(tmp_path):
+    text = "  " + "x" * 50 + "  "
+    write_records(tmp_path / "cortado", [text], text_chars=10)
+    write_records(tmp_path / "hash", [text], hash_only=True)
+
+    (cut,) = iter_records([str(tmp_path / "cortado")])
+    (hashed,) = iter_records([str(tmp_path / "hash")])
+    assert cut["text"] == text[:10]
+    assert cut["text_len"] == 50
+    assert hashed["text"] == ""
+    assert hashed["hash"] == cut["hash"] == text_hash(text)
+
+
+def test_incomplete_trailing_frame_is_ignored(tmp_path):
+    write_records(tmp_path, ["primeiro email", "segundo email"])
+    (path,) = segment_paths([str(tmp_path)])
+    with open(path, "rb+") as f:
+        f.truncate(os.path.getsize(path) - 3)
+
+    assert [record["text"] for record in iter_records([path])] == ["primeiro email"]
+
+
+def test_rotates_and_keeps_the_newest_segments(tmp_path):
+    # Segmento pequeno: cada lote gravado abre um segmento novo
+    log = AuditLog(str(tmp_path), segment_bytes=1, max_segments=2, text_chars=1000, queue_size=100)
+    for i in range(4):
+        log.record(f"email {i}", "{}", PARSED, RESULT, {})
+        deadline = time.monotonic() + 5
+        while log.written <= i and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Os segmentos são ordenados pelo mtime
+        time.sleep(0.01)
+    log.close()
+
+    segments = segment_paths([str(tmp_path)])
+    assert len(segments) == 2
+    assert [record["text"] for record in iter_records(segments)] == ["email 2", "email 3"]
+
+
+def test_ignores_files_that_are_not_segments(tmp_path):
+    write_records(tmp_path, ["email"])
+    other = tmp_path / "audit-outro.seg"
+    other.write_bytes(b"NOTAUDIT" + MAGIC)
+    assert [record["text"] for record in iter_records([str(tmp_path)])] == ["email"]
@@ -0,0 +1,138 @@
+import pytest
+
+from app.config import MAX_EMAIL_TOKENS, MAX_TEXT_LENGTH
+from app.services import cache_service
+from app.services.cache_service import (
+    ClassificationCache,
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+    make_cache_key,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_service.time, "monotonic", fake)
+    monkeypatch.setattr(cache_service.time, "time", fake)
+    return fake
+
+
+def test_key_ignores_whitespace_and_unicode_form():
+    composed = "Preciso da segunda via do boleto de março"
+    decomposed = "Preciso  da segunda via\n do boleto de marc\u0327o"
+    assert make_cache_key(composed) == make_cache_key(decomposed)
+
+
+def test_key_uses_only_the_text_sent_to_the_model():
+    # Além do orçamento de tokens: o modelo vê o mesmo prompt
+    base = " ".join(f"palavra{i}" for i in range(MAX_EMAIL_TOKENS))
+    assert make_cache_key(base + " fim") == make_cache_key(base + " outro fim")
+    assert make_cache_key("boleto vencido") != make_cache_key("boleto pago")
+
+
+def test_key_follows_the_cleaned_prompt_past_the_raw_limit():
+    # A limpeza descarta as linhas em branco e traz o fim do texto para o prompt
+    padding = "\n" * MAX_TEXT_LENGTH
+    assert make_cache_key(padding + "boleto vencido") != make_cache_key(padding + "boleto pago")
+
+
+def test_key_changes_with_prompt_version_and_models(monkeypatch):
+    key = make_cache_key("boleto vencido")
+    monkeypatch.setattr(cache_service, "PROMPT_VERSION", "outra-versao")
+    assert make_cache_key("boleto vencido") != key
+    monkeypatch.undo()
+    monkeypatch.setattr(cache_service, "_MODELS", "outro-modelo")
+    assert make_cache_key("boleto vencido") != key
+
+
+def test_memory_lru_evicts_least_recently_used(clock):
+    backend = MemoryCacheBackend(ttl=60, max_entries=2, max_bytes=10_000)
+    backend.set("a", "1")
+    backend.set("b", "2")
+    assert backend.get("a") == "1"  # "b" passa a ser o menos usado
+    backend.set("c", "3")
+
+    assert backend.get("b") is None
+    assert backend.get("a") == "1"
+    assert backend.get("c") == "3"
+    assert backend.stats()["evictions"] == 1
+
+
+def test_memory_byte_limit_counts_utf8_bytes(clock):
+    backend = MemoryCacheBackend(ttl=60, max_entries=100, max_bytes=10)
+    backend.set("a", "çççç")  # 8 bytes
+    backend.set("b", "xx")
+    assert backend.stats()["bytes"] == 10
+
+    backend.set("c", "y")
+    assert backend.get("a") is None
+    assert backend.stats()["bytes"] == 3
+
+    backend.set("grande", "z" * 11)  # maior que o limite: não é guardado
+    assert backend.get("grande") is None
+
+
+def test_memory_entries_expire_after_ttl(clock):
+    backend = MemoryCacheBackend(ttl=60, max_entries=10, max_bytes=10_000)
+    backend.set("a", "1")
+    clock.now += 59
+    assert backend.get("a") == "1"
+    clock.now += 2
+    assert backend.get("a") is None
+    assert backend.stats() == {"entries": 0, "bytes": 0, "evictions": 1}
+
+
+def test_sqlite_expires_and_prunes_to_limits(tmp_path, clock):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), ttl=60, max_entries=2, max_bytes=10_000)
+    backend.PRUNE_EVERY = 1
+    try:
+        backend.set("a", "1")
+        clock.now += 1
+        backend.set("b", "2")
+        clock.now += 1
+        assert backend.get("a") == "1"
+        clock.now += 1
+        backend.set("c", "3")  # corte por LRU: "b" foi o menos acessado
+
+        assert backend.get("b") is None
+        assert backend.get("a") == "1"
+
+        clock.now += 61
+        assert backend.get("c") is None
+        assert backend.stats()["evictions"] == 2
+    finally:
+        backend.close()
+
+
+def test_sqlite_is_shared_between_connections(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = SQLiteCacheBackend(path, ttl=60, max_entries=10, max_bytes=10_000)
+    reader = SQLiteCacheBackend(path, ttl=60, max_entries=10, max_bytes=10_000)
+    try:
+        writer.set("a", "1")
+        assert reader.get("a") == "1"
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_classification_cache_counts_hits_and_misses(clock):
+    cache = ClassificationCache(MemoryCacheBackend(ttl=60, max_entries=10, max_bytes=10_000))
+    parsed = {"categoria": "Produtivo", "confianca": 90}
+
+    assert cache.get("Segue o boleto  vencido") is None
+    cache.set("Segue o boleto vencido", parsed)
+    assert cache.get("Segue o boleto  vencido") == parsed
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert stats["backend"] == "MemoryCacheBackend"
@@ -0,0 +1,74 @@
+from app.utils.email_cleaner import collapse_thread
+
+THREAD = """Oi Ana, pode enviar a segunda via do boleto de março até amanhã?
+
+Atenciosamente,
+Carlos
+Financeiro
+
+Em seg., 10 de mar. de 2025 às 09:00, Ana Souza <ana@empresa.com> escreveu:
+> Carlos, o boleto de março já foi emitido e enviado ao seu email.
+>
+> Em sex., 7 de mar. de 2025 às 18:00, Carlos <carlos@cliente.com> escreveu:
+>> Qual o status do boleto de março?
+
+-----Mensagem original-----
+De: Carlos <carlos@cliente.com>
+Enviado: sexta-feira, 7 de março de 2025 18:00
+Para: Ana Souza
+Assunto: Boleto
+
+Qual o status do boleto de março?
+"""
+
+
+def test_plain_email_is_returned_without_signature():
+    text = "Bom dia, preciso do relatório de vendas de fevereiro.\n\nAtenciosamente,\nJoão\nGerente"
+    assert collapse_thread(text).strip() == "Bom dia, preciso do relatório de vendas de fevereiro."
+
+
+def test_keeps_newest_message_and_summarizes_history():
+    collapsed = collapse_thread(THREAD)
+    newest, _, history = collapsed.partition("\n\nHistórico da conversa")
+
+    assert newest == "Oi Ana, pode enviar a segunda via do boleto de março até amanhã?"
+    assert history.startswith(" (mensagens anteriores: 3):")
+    assert "- seg., 10 de mar. de 2025 às 09:00, Ana Souza: Carlos, o boleto de março já foi emitido" in history
+    assert "Atenciosamente" not in collapsed
+
+
+def test_repeated_quotes_appear_once():
+    collapsed = collapse_thread(THREAD)
+    assert collapsed.count("Qual o status do boleto de março?") == 1
+
+
+def test_fully_repeated_message_is_only_counted():
+    quoted = "Em 1 de mar. de 2025 às 10:00, Ana <ana@x.com> escreveu:\nO pedido 123 foi enviado hoje."
+    thread = f"Recebi, obrigado pela confirmação do envio.\n\n{quoted}\n\n{quoted}"
+
+    collapsed = collapse_thread(thread)
+    assert "(mensagens anteriores: 2, repetidas omitidas: 1)" in collapsed
+    assert collapsed.count("O pedido 123 foi enviado hoje.") == 1
+
+
+def test_history_respects_character_limits():
+    messages = [f"Mensagem {i}: " + "conteúdo inédito da conversa " * 20 for i in range(30)]
+    thread = "Resposta final com a decisão tomada pela equipe."
+    for i, body in enumerate(messages):
+        thread += f"\n\nEm 1 de jan. de 2025 às 10:{i:02d}, Pessoa {i} <p{i}@x.com> escreveu:\n{body}"
+
+    collapsed = collapse_thread(thread, message_chars=100, history_chars=500)
+    history = collapsed.split(":\n", 1)[1]
+    assert len(history) < 500 + 30 * 60
+    assert "além do limite" in collapsed
+    assert all(len(line) < 100 + 60 for line in history.splitlines())
+
+
+def test_short_newest_message_promotes_forwarded_content():
+    body = "Contrato com as cláusulas revisadas e prazo de assinatura até sexta-feira. " * 8
+    thread = f"Segue abaixo\n\n---------- Mensagem encaminhada ---------\nDe: Jurídico <j@x.com>\nData: 3 de mar.\n\n{body}"
+
+    collapsed = collapse_thread(thread, message_chars=100, history_chars=1000)
+    assert collapsed.startswith("Segue abaixo\n\nHistórico da conversa")
+    # Mensagem nova curta: a encaminhada entra além do limite por mensagem
+    assert len(collapsed.split("\n- ", 1)[1]) > 100
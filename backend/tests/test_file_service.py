@@ -0,0 +1,22 @@
+import io
+
+from app.services.file_service import extract_message
+
+THREAD = """Oi Ana, pode enviar a segunda via do boleto de março até amanhã?
+
+Em seg., 10 de mar. de 2025 às 09:00, Ana Souza <ana@empresa.com> escreveu:
+> Carlos, o boleto de março já foi emitido e enviado ao seu email.
+"""
+
+
+def test_large_text_file_is_read_only_up_to_the_raw_limit():
+    # Cadeia no início seguida de ~2MB de histórico citado
+    raw = (THREAD + "> linha citada de uma mensagem muito antiga\n" * 50_000).encode("utf-8")
+    stream = io.BytesIO(raw)
+
+    message = extract_message(stream, "txt", "utf-8", max_chars=1000)
+
+    assert stream.tell() < len(raw) // 10
+    assert len(message.text) <= 1000
+    assert message.text.startswith("Oi Ana, pode enviar a segunda via do boleto")
+    assert "Histórico da conversa" in message.text
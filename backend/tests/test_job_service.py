@@ -0,0 +1,140 @@
+import sqlite3
+import time
+
+import pytest
+
+from app.services import job_service
+from app.services.job_service import COMPLETED, FAILED, QUEUED, RUNNING, JobItem, JobLeaseLost, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(job_service.time, "time", lambda: now[0])
+    return now
+
+
+def create(store, job_id: str, priority: int = 1, count: int = 3) -> None:
+    items = [JobItem(f"e{i}", text=f"email {i}") for i in range(count)]
+    store.create(job_id, priority, items, tenant="suporte")
+
+
+def test_claim_only_once(store):
+    create(store, "job")
+    assert store.claim("job", "worker-a")
+    assert not store.claim("job", "worker-b")
+
+    job = store.get("job")
+    assert job["status"] == RUNNING
+    assert job["tenant"] == "suporte"
+    assert job["started_at"] is not None
+
+
+def test_recover_requeues_jobs_with_expired_leases(store, clock):
+    for job_id in ("fila", "morto", "vivo", "concluido"):
+        create(store, job_id)
+        clock[0] += 0.001
+    store.claim("morto", "worker-morto", lease_seconds=60)
+    store.claim("vivo", "worker-vivo", lease_seconds=60)
+    store.claim("concluido", "worker-vivo", lease_seconds=60)
+    store.finish("concluido", COMPLETED)
+
+    clock[0] += 40
+    assert store.renew("worker-vivo", lease_seconds=60) == 1
+    clock[0] += 40
+
+    assert store.recover() == [("fila", 1), ("morto", 1)]
+    assert store.get("vivo")["status"] == RUNNING
+    # Recuperado, o job pode ser reivindicado de novo
+    assert store.claim("morto", "worker-novo")
+
+
+def test_requeue_expired_returns_only_the_jobs_it_requeued(store, clock):
+    for job_id in ("fila", "vencido"):
+        create(store, job_id)
+    store.claim("vencido", "worker-morto", lease_seconds=10)
+
+    assert store.requeue_expired() == []
+    clock[0] += 11
+    assert store.requeue_expired() == [("vencido", 1)]
+    assert store.requeue_expired() == []
+
+
+def test_release_returns_running_jobs_to_the_queue(store):
+    for job_id in ("meu", "outro"):
+        create(store, job_id)
+        store.claim(job_id, f"worker-{job_id}")
+
+    assert store.release("worker-meu") == 1
+    assert store.get("meu")["status"] == QUEUED
+    assert store.get("outro")["status"] == RUNNING
+
+
+def test_lost_lease_blocks_results_and_finish(store, clock):
+    create(store, "job", count=2)
+    store.claim("job", "worker-lento", lease_seconds=10)
+    clock[0] += 11
+    store.requeue_expired()
+    store.claim("job", "worker-novo", lease_seconds=10)
+
+    with pytest.raises(JobLeaseLost):
+        store.save_results("job", "worker-lento", [(0, {"categoria": "Produtivo"})])
+    assert not store.finish("job", COMPLETED, owner="worker-lento")
+
+    job = store.get("job")
+    assert (job["status"], job["processed"]) == (RUNNING, 0)
+    assert len(store.pending_items("job")) == 2
+
+
+def test_failed_save_rolls_back(store):
+    create(store, "job", count=2)
+    store.claim("job", "worker")
+
+    # Posição que o SQLite não aceita: falha no meio da transação
+    with pytest.raises(sqlite3.Error):
+        store.save_results("job", "worker", [(0, {"categoria": "Produtivo"}), (object(), {"categoria": "Produtivo"})])
+    assert store.get("job")["processed"] == 0
+
+    # A conexão não ficou presa na transação
+    store.save_results("job", "worker", [(0, {"categoria": "Produtivo"})])
+    assert store.get("job")["processed"] == 1
+    assert [position for position, _ in store.pending_items("job")] == [1]
+
+
+def test_results_resume_where_they_stopped(store):
+    create(store, "job", count=3)
+    store.claim("job", "worker")
+    store.save_results("job", "worker", [(0, {"categoria": "Produtivo", "confianca": 90})])
+
+    pending = store.pending_items("job")
+    assert [position for position, _ in pending] == [1, 2]
+    assert pending[0][1].text == "email 1"
+    assert store.get("job")["processed"] == 1
+
+    store.save_results("job", "worker", [(1, {"categoria": "Improdutivo"}), (2, {"categoria": "Produtivo"})])
+    assert store.finish("job", COMPLETED, owner="worker")
+
+    job = store.get("job")
+    assert job["priority"] == "normal"
+    assert [result["id"] for result in job["resultados"]] == ["e0", "e1", "e2"]
+    assert job["resultados"][0]["confianca"] == 90
+
+
+def test_prune_removes_only_old_finished_jobs(store):
+    for job_id in ("antigo", "falhou", "fila"):
+        create(store, job_id)
+    store.finish("antigo", COMPLETED)
+    store.finish("falhou", FAILED, "erro")
+    cutoff = time.time() + 1
+
+    assert sorted(store.prune(cutoff)) == ["antigo", "falhou"]
+    assert store.get("antigo") is None
+    assert store.counts() == {QUEUED: 1}
+    assert store.prune(cutoff) == []
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from app.utils.json_stream import IncrementalJSONParser
+
+RESPONSE = {
+    "categoria": "Produtivo",
+    "confianca": 92,
+    "razao": "Pedido de \"segunda via\" com ação até amanhã 😀",
+    "resposta_sugerida": "Olá!\nSegue a segunda via.",
+    "tags": ["boleto", {"nível": 1}],
+    "urgente": True,
+    "prazo": None,
+}
+
+
+def feed_all(chunks) -> tuple:
+    parser = IncrementalJSONParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return parser, events
+
+
+@pytest.mark.parametrize("ensure_ascii", [False, True])
+def test_any_split_point_gives_the_same_result(ensure_ascii):
+    text = json.dumps(RESPONSE, ensure_ascii=ensure_ascii)
+    for cut in range(1, len(text)):
+        parser, events = feed_all([text[:cut], text[cut:], " "])
+        assert parser.done
+        assert parser.result == RESPONSE, cut
+        assert [key for kind, key, _ in events if kind == "value"] == list(RESPONSE)
+
+
+def test_char_by_char_deltas_rebuild_the_strings():
+    text = json.dumps(RESPONSE, ensure_ascii=True)
+    parser, events = feed_all(text)
+
+    deltas = {}
+    for kind, key, value in events:
+        if kind == "delta":
+            deltas[key] = deltas.get(key, "") + value
+    assert deltas["razao"] == RESPONSE["razao"]
+    assert deltas["resposta_sugerida"] == RESPONSE["resposta_sugerida"]
+    assert "confianca" not in deltas
+
+
+def test_string_deltas_arrive_before_the_value_closes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"razao": "Pedido de') == [("delta", "razao", "Pedido de")]
+    assert parser.feed(' boleto"') == [("delta", "razao", " boleto"), ("value", "razao", "Pedido de boleto")]
+
+
+def test_scalar_is_emitted_only_when_complete():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"confianca": 9') == []
+    assert parser.feed("5}") == [("value", "confianca", 95)]
+    assert parser.done
+
+
+def test_text_before_the_object_is_ignored():
+    parser, _ = feed_all(["```json\n", '{"categoria": "Improdutivo"}', "\n```"])
+    assert parser.result == {"categoria": "Improdutivo"}
+
+
+def test_invalid_json_raises():
+    with pytest.raises(ValueError):
+        IncrementalJSONParser().feed('{"categoria" "Produtivo"}')
@@ -0,0 +1,76 @@
+import io
+
+from app.services import mail_service
+from app.services.mail_service import iter_mailbox, iter_mbox_messages, parse_email
+
+MBOX = (
+    b"From ana@empresa.com Mon Mar 10 09:00:00 2025\n"
+    b"From: Ana <ana@empresa.com>\n"
+    b"Subject: Boleto\n"
+    b"\n"
+    b"Segue o boleto.\n"
+    b">From the desk of Ana\n"
+    b">>From nested quote\n"
+    b"From inside a line stays\n"
+    b"\n"
+    b"From carlos@cliente.com Mon Mar 10 10:00:00 2025\n"
+    b"From: Carlos <carlos@cliente.com>\n"
+    b"Subject: Re: Boleto\n"
+    b"\n"
+    b"Recebido, obrigado.\n"
+)
+
+
+def messages(data: bytes, **kwargs) -> list:
+    return list(iter_mbox_messages(io.BytesIO(data), **kwargs))
+
+
+def test_splits_on_from_lines_after_blank_line():
+    first, second = messages(MBOX)
+    assert first.startswith(b"From: Ana")
+    assert second.startswith(b"From: Carlos")
+    assert second.endswith(b"Recebido, obrigado.\n")
+
+
+def test_unescapes_mboxrd_from_lines():
+    first, _ = messages(MBOX)
+    assert b"\nFrom the desk of Ana\n" in first
+    assert b"\n>From nested quote\n" in first
+    # "From " sem linha em branco antes não abre outra mensagem
+    assert b"\nFrom inside a line stays\n" in first
+    # A linha em branco antes do próximo "From " é o separador
+    assert first.endswith(b"From inside a line stays\n")
+
+
+def test_crlf_mailbox():
+    first, second = messages(MBOX.replace(b"\n", b"\r\n"))
+    assert first.endswith(b"From inside a line stays\r\n")
+    assert b"\r\nFrom the desk of Ana\r\n" in first
+    assert second.startswith(b"From: Carlos")
+
+
+def test_long_lines_and_message_limit(monkeypatch):
+    monkeypatch.setattr(mail_service, "_MAX_LINE_BYTES", 16)
+    body = b"x" * 100
+    data = b"From a@b.c " + b"y" * 50 + b"\nSubject: Longo\n\n" + body + b"\n\nFrom c@d.e\n\nfim\n"
+
+    first, second = messages(data, max_bytes=40)
+    assert first == (b"Subject: Longo\n\n" + body)[:40]
+    assert second == b"\nfim\n"
+
+
+def test_text_before_first_from_is_ignored():
+    assert messages(b"lixo\n\n" + MBOX)[0].startswith(b"From: Ana")
+    assert messages(b"") == []
+
+
+def test_iter_mailbox_parses_each_message():
+    parsed = list(iter_mailbox(io.BytesIO(MBOX)))
+    assert [message.text.split("\n")[0] for message in parsed] == ["Assunto: Boleto", "Assunto: Re: Boleto"]
+
+
+def test_parse_email_prefilter_identifies_bulk_mail():
+    raw = b"From: news@loja.com\nList-Unsubscribe: <mailto:sair@loja.com>\nSubject: Ofertas\n\nDescontos hoje."
+    message = parse_email(raw)
+    assert message.text == "Assunto: Ofertas\n\nDescontos hoje."
+    assert message.bulk_reason == "lista de distribuição (List-Unsubscribe/List-Id)"
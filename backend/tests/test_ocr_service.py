@@ -0,0 +1,94 @@
+import io
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+from app.services import file_service
+from app.services import ocr_service as ocr_module
+from app.services.file_service import extract_message
+from app.services.ocr_service import OcrService
+
+
+def blank_pdf(*widths) -> bytes:
+    # Larguras diferentes: páginas diferentes para o cache
+    writer = PdfWriter()
+    for width in widths:
+        writer.add_blank_page(width, 792)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def blank_pages(*widths) -> list:
+    return list(PdfReader(io.BytesIO(blank_pdf(*widths))).pages)
+
+
+@pytest.fixture
+def fake_tesseract(monkeypatch):
+    """
+    Troca a renderização + tesseract por um texto por página, registrando as chamadas.
+    """
+    calls = []
+
+    def fake_ocr_page(data, dpi, languages, command, timeout):
+        calls.append(dpi)
+        return f"página {len(calls)} " + "x" * 20
+
+    monkeypatch.setattr(ocr_module, "_ocr_page", fake_ocr_page)
+    return calls
+
+
+def available_service() -> OcrService:
+    service = OcrService(processes=1, max_entries=10)
+    service._available = True
+    return service
+
+
+def test_disabled_without_tesseract(monkeypatch, fake_tesseract):
+    monkeypatch.setattr(ocr_module, "OCR_ENABLED", True)
+    monkeypatch.setattr(ocr_module.importlib.util, "find_spec", lambda name: object())
+    monkeypatch.setattr(ocr_module.shutil, "which", lambda command: None)
+
+    service = OcrService(processes=1, max_entries=10)
+    assert not service.available
+    assert service.recognize(blank_pages(612), inline=True) == ""
+    assert fake_tesseract == []
+
+
+def test_recognizes_pages_in_order_and_caches_them(fake_tesseract):
+    service = available_service()
+    pages = blank_pages(612, 500)
+
+    text = service.recognize(pages, inline=True)
+    assert text.splitlines() == [f"página 1 {'x' * 20}", f"página 2 {'x' * 20}"]
+    assert all(ocr_module.OCR_MIN_DPI <= dpi <= ocr_module.OCR_MAX_DPI for dpi in fake_tesseract)
+
+    assert service.recognize(pages, inline=True) == text
+    assert len(fake_tesseract) == 2
+    assert service.stats()["cache_hits"] == 2
+
+
+def test_stops_at_target_chars_and_max_pages(monkeypatch, fake_tesseract):
+    service = available_service()
+    monkeypatch.setattr(ocr_module, "OCR_TARGET_CHARS", 10)
+    assert service.recognize(blank_pages(612, 500, 400), inline=True).startswith("página 1")
+    assert len(fake_tesseract) == 1
+
+    monkeypatch.setattr(ocr_module, "OCR_TARGET_CHARS", 10_000)
+    monkeypatch.setattr(ocr_module, "OCR_MAX_PAGES", 2)
+    service.recognize(blank_pages(300, 301, 302), inline=True)
+    assert len(fake_tesseract) == 3
+
+
+def test_textless_pdf_goes_through_ocr(monkeypatch):
+    seen = []
+
+    def recognize(pages, inline=False):
+        seen.append(len(pages))
+        return "Solicito o reembolso da compra 4521."
+
+    monkeypatch.setattr(file_service.ocr_service, "recognize", recognize)
+    message = extract_message(io.BytesIO(blank_pdf(612, 500)), "pdf")
+
+    assert seen == [2]
+    assert message.text == "Solicito o reembolso da compra 4521."
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.services.tenant_service import (
+    BULK,
+    INTERACTIVE,
+    FairScheduler,
+    Tenant,
+    TenantAuthError,
+    TenantQuotaExceeded,
+    load_tenants,
+)
+from app.utils.resilience import AdaptiveRateLimiter, RateLimitWaitTimeout
+
+
+def scheduler(max_concurrency: int = 1, bulk_share: float = 1.0) -> FairScheduler:
+    return FairScheduler(AdaptiveRateLimiter(1_000_000, 1_000_000_000), max_concurrency, bulk_share)
+
+
+async def grant_order(sched: FairScheduler, calls: list, tokens: int = 100) -> list:
+    """
+    Enfileira `calls` (tenant, prioridade) com a única vaga ocupada e
+    devolve a ordem em que as chamadas foram liberadas.
+    """
+    holder = await sched.acquire(Tenant("ocupante"), INTERACTIVE, tokens)
+    order = []
+
+    async def call(tenant, priority):
+        waiter = await sched.acquire(tenant, priority, tokens)
+        order.append((tenant.name, priority))
+        await asyncio.sleep(0)
+        sched.release(waiter)
+
+    tasks = [asyncio.create_task(call(tenant, priority)) for tenant, priority in calls]
+    await asyncio.sleep(0)
+    sched.release(holder)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_equal_weights_alternate_between_tenants():
+    a, b = Tenant("a"), Tenant("b")
+    # "a" chega com 6 chamadas antes de "b": mesmo assim as vagas se alternam
+    calls = [(a, INTERACTIVE)] * 6 + [(b, INTERACTIVE)] * 6
+    order = [name for name, _ in asyncio.run(grant_order(scheduler(), calls))]
+
+    for end in range(1, len(order) + 1):
+        assert abs(order[:end].count("a") - order[:end].count("b")) <= 1, order
+
+
+def test_weights_split_capacity_proportionally():
+    heavy, light = Tenant("pesado", weight=3), Tenant("leve", weight=1)
+    calls = [(light, INTERACTIVE)] * 12 + [(heavy, INTERACTIVE)] * 12
+    order = [name for name, _ in asyncio.run(grant_order(scheduler(), calls))]
+
+    assert order[:8].count("pesado") == 6
+
+
+def test_priorities_within_a_tenant():
+    tenant = Tenant("a")
+    calls = [(tenant, BULK), (tenant, BULK), (tenant, INTERACTIVE)]
+    order = asyncio.run(grant_order(scheduler(), calls))
+    assert order == [("a", INTERACTIVE), ("a", BULK), ("a", BULK)]
+
+
+def test_bulk_calls_leave_room_for_interactive():
+    async def scenario():
+        sched = scheduler(max_concurrency=4, bulk_share=0.5)
+        backfill, interactive = Tenant("backfill"), Tenant("suporte")
+        bulk = [asyncio.create_task(sched.acquire(backfill, BULK, 10)) for _ in range(4)]
+        await asyncio.sleep(0)
+        granted_bulk = sum(task.done() for task in bulk)
+
+        waiter = await asyncio.wait_for(sched.acquire(interactive, INTERACTIVE, 10), 1)
+        stats = sched.stats()
+        for task in bulk:
+            task.cancel()
+        await asyncio.gather(*bulk, return_exceptions=True)
+        sched.release(waiter)
+        return granted_bulk, stats
+
+    granted_bulk, stats = asyncio.run(scenario())
+    assert granted_bulk == 2
+    assert (stats["bulk_limit"], stats["bulk_in_flight"], stats["in_flight"]) == (2, 2, 3)
+
+
+def test_quota_throttles_only_its_tenant():
+    async def scenario():
+        sched = scheduler(max_concurrency=10)
+        limited = Tenant("limitado", tokens_per_minute=600)
+        free = Tenant("livre")
+
+        first = await sched.acquire(limited, INTERACTIVE, 600)
+        with pytest.raises(RateLimitWaitTimeout):
+            await sched.acquire(limited, INTERACTIVE, 100, deadline=time.monotonic() + 0.05)
+        other = await asyncio.wait_for(sched.acquire(free, INTERACTIVE, 100), 1)
+
+        sched.release(first)
+        sched.release(other)
+        return limited, sched.stats()
+
+    limited, stats = asyncio.run(scenario())
+    assert limited.throttled == 1
+    assert stats["in_flight"] == 0
+    assert stats["backlogged_tenants"] == []
+
+
+def test_waiting_past_the_deadline_expires():
+    async def scenario():
+        sched = scheduler()
+        holder = await sched.acquire(Tenant("a"), INTERACTIVE, 10)
+        with pytest.raises(RateLimitWaitTimeout):
+            await sched.acquire(Tenant("b"), INTERACTIVE, 10, deadline=time.monotonic() + 0.05)
+        sched.release(holder)
+        # A vaga devolvida não fica presa ao pedido expirado
+        waiter = await asyncio.wait_for(sched.acquire(Tenant("c"), INTERACTIVE, 10), 1)
+        sched.release(waiter)
+        return sched.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["expired"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_registry_authenticates_and_admits(tmp_path):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps({
+        "suporte": {"api_keys": ["chave-suporte"], "weight": 3},
+        "backfill": {"api_keys": ["chave-backfill"], "tokens_per_minute": 1000},
+    }))
+    registry = load_tenants(str(path))
+
+    assert registry.authenticate("chave-suporte").weight == 3
+    with pytest.raises(TenantAuthError):
+        registry.authenticate("outra")
+    with pytest.raises(TenantAuthError):
+        registry.authenticate(None)
+
+    backfill = registry.authenticate("chave-backfill")
+    registry.admit(backfill)
+    backfill.quota.consume(1000)
+    with pytest.raises(TenantQuotaExceeded) as excinfo:
+        registry.admit(backfill)
+    assert excinfo.value.retry_after > 0
+    assert backfill.rejected == 1
+
+
+def test_registry_without_config_uses_the_default_tenant():
+    registry = load_tenants(None)
+    assert not registry.enabled
+    assert registry.authenticate(None) is registry.default
+    assert registry.get("removido").name == "removido"
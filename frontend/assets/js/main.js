@@ -21,38 +21,48 @@ function validateInput(text, file) {
 }
 
 // COMUNICAÇÃO COM API
-async function classifyEmail(text, file) {
-    // Preparar FormData
+function buildFormData(text, file) {
     const formData = new FormData();
     if (file) formData.append('file', file);
     if (text) formData.append('text', text);
+    return formData;
+}
+
+function validateResult(data) {
+    if (!data || !data.categoria || !data.razao || !data.resposta_sugerida) {
+        throw new Error(CONFIG.MESSAGES.errors.incompleteResponse);
+    }
+    return data;
+}
 
+// Classificação em streaming: a categoria e a confiança aparecem assim que a IA
+// as gera, e a razão e a resposta são exibidas enquanto são escritas
+async function classifyEmail(text, file) {
     try {
-        console.log('Enviando para:', `${API_BASE_URL}/classify`);
-        
-        const response = await fetch(`${API_BASE_URL}/classify`, {
+        console.log('Enviando para:', `${API_BASE_URL}/classify/stream`);
+
+        const response = await fetch(`${API_BASE_URL}/classify/stream`, {
             method: 'POST',
-            body: formData
+            body: buildFormData(text, file)
         });
 
         console.log('Status:', response.status);
 
+        // Backend sem streaming ou navegador sem ReadableStream: resposta completa
+        if (response.status === 404 || !response.body) {
+            return await classifyEmailFull(text, file);
+        }
+
         // Tratar erros HTTP
         if (!response.ok) {
             const errorMessage = await handleAPIError(response);
             throw new Error(errorMessage);
         }
 
-        // Parse da resposta
-        const data = await response.json();
+        const data = await readClassificationStream(response.body);
         console.log('Resposta recebida:', data);
-        
-        // Validar resposta
-        if (!data.categoria || !data.razao || !data.resposta_sugerida) {
-            throw new Error(CONFIG.MESSAGES.errors.incompleteResponse);
-        }
-        
-        return data;
+
+        return validateResult(data);
 
     } catch (error) {
         console.error('Erro na requisição:', error);
@@ -60,6 +70,85 @@ async function classifyEmail(text, file) {
     }
 }
 
+async function classifyEmailFull(text, file) {
+    console.log('Enviando para:', `${API_BASE_URL}/classify`);
+
+    const response = await fetch(`${API_BASE_URL}/classify`, {
+        method: 'POST',
+        body: buildFormData(text, file)
+    });
+
+    if (!response.ok) {
+        const errorMessage = await handleAPIError(response);
+        throw new Error(errorMessage);
+    }
+
+    return validateResult(await response.json());
+}
+
+// Lê os server-sent events e atualiza a tela a cada evento
+async function readClassificationStream(body) {
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+
+        let separator;
+        while ((separator = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, separator);
+            buffer = buffer.slice(separator + 2);
+
+            const event = parseSSEBlock(block);
+            if (event) {
+                result = handleStreamEvent(event.name, event.data) || result;
+            }
+        }
+    }
+
+    return result;
+}
+
+function parseSSEBlock(block) {
+    let name = 'message';
+    const dataLines = [];
+
+    for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) name = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+    }
+
+    if (!dataLines.length) return null;
+    return { name, data: JSON.parse(dataLines.join('\n')) };
+}
+
+function handleStreamEvent(name, data) {
+    switch (name) {
+        case 'categoria':
+            UI.startStreamingResult();
+            UI.renderCategory(data.categoria);
+            break;
+        case 'confianca':
+            UI.startStreamingResult();
+            UI.renderConfidence(data.confianca);
+            break;
+        case 'razao':
+            UI.appendStreamingText('razao', data.delta);
+            break;
+        case 'resposta_sugerida':
+            UI.appendStreamingText('resposta', data.delta);
+            break;
+        case 'result':
+            return data;
+    }
+    return null;
+}
+
 async function handleAPIError(response) {
     let errorMessage = `Erro ${response.status}`;
     
@@ -181,6 +270,7 @@ if (document.readyState === 'loading') {
 // Exportar para debug (opcional)
 window.APP = {
     classifyEmail,
+    classifyEmailFull,
     validateInput,
     handleError
 };
\ No newline at end of file
@@ -65,6 +65,23 @@ function renderResult(data) {
     console.log('Resultado renderizado:', data);
 }
 
+// RENDERIZAÇÃO PROGRESSIVA (STREAMING)
+function startStreamingResult() {
+    // Só limpa na primeira parte recebida
+    if (!elements.result.classList.contains('hidden')) return;
+
+    hideLoading();
+    showResult();
+
+    elements.razao.textContent = '';
+    elements.resposta.textContent = '';
+}
+
+function appendStreamingText(field, delta) {
+    startStreamingResult();
+    elements[field].textContent += delta;
+}
+
 function renderCategory(categoria) {
     elements.catBadge.textContent = categoria;
     
@@ -130,7 +147,7 @@ function handleFileUpload(file) {
 
 function resetFileLabel() {
     elements.fileInput.value = '';
-    elements.fileLabel.innerHTML = '<span class="block text-2xl mb-2">📄</span><span class="text-sm">Clique ou arraste um arquivo (.txt/.pdf)</span>';
+    elements.fileLabel.innerHTML = '<span class="block text-2xl mb-2">📄</span><span class="text-sm">Clique ou arraste um arquivo (.txt/.pdf/.eml)</span>';
     elements.fileLabel.classList.remove('text-blue-600', 'font-bold');
 }
 
@@ -164,6 +181,10 @@ window.UI = {
     showInitialState,
     showResult,
     renderResult,
+    startStreamingResult,
+    appendStreamingText,
+    renderCategory,
+    renderConfidence,
     updateCharCount,
     handleFileUpload,
     resetFileLabel,